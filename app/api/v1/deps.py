@@ -2,17 +2,21 @@
 API依赖注入
 """
 
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal, SessionLocal
 from app.config import settings
 from app.models.user import User
+from app.services.base import Cursor, decode_cursor
 
 # HTTP Bearer认证
 security = HTTPBearer()
+# 不携带token时不报错 (get_optional_user)
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_db() -> Generator:
@@ -26,12 +30,30 @@ def get_db() -> Generator:
         db.close()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)
-) -> User:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    获取当前认证用户
+    获取异步数据库Session (async def的接口使用)
     """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+) -> Optional[Cursor]:
+    """
+    一覧のカーソルを解析
+    """
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+
+
+def _authenticate(token: str, db: Session) -> User:
+    """解析JWT token并获取用户"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="認証情報が無効です",
@@ -40,7 +62,6 @@ async def get_current_user(
 
     try:
         # 解析JWT token
-        token = credentials.credentials
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
@@ -59,6 +80,29 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)
+) -> User:
+    """
+    获取当前认证用户
+    """
+    return _authenticate(credentials.credentials, db)
+
+
+async def get_optional_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db),
+) -> Optional[User]:
+    """
+    获取当前认证用户, 未携带token时返回None
+
+    认证接口尚未启用, 创建实验/sweep时不强制要求token; 携带token时与get_current_user相同。
+    """
+    if credentials is None:
+        return None
+    return _authenticate(credentials.credentials, db)
+
+
 def get_current_active_superuser(current_user: User = Depends(get_current_user)) -> User:
     """
     获取当前管理员用户
@@ -1,311 +1,423 @@
 """
-Experiments API endpoints (with mock data)
+Experiments API endpoints
 """
 
-from typing import Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    Query,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from uuid import uuid4
-from datetime import datetime, timedelta
-import random
+from uuid import UUID
+from datetime import datetime
 
-from app.api.v1.deps import get_db
+from app.api.v1.deps import get_async_db, get_cursor, get_db, get_optional_user
 from app.schemas.experiment import (
     Experiment,
     ExperimentDetail,
     ExperimentCreate,
+    ExperimentConfig,
     ExperimentProgress,
     LogEntry,
+    MetricSeriesResponse,
+    PipelineExplain,
+    SchedulerStatus,
+    StartExperimentRequest,
 )
 from app.schemas.common import PaginatedResponse, TaskResponse
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.core.progress import broadcaster
+from app.core.json_response import TrustedJSONResponse
+from app.core.log_store import ExperimentLogReader, parse_line
+from app.models.experiment import Experiment as ExperimentModel
+from app.models.user import User
+from app.services.base import Cursor
+from app.services.experiment_service import ExperimentService
+from app.services.metrics_service import MetricsService, DEFAULT_SERIES
+from app.services.pipeline_service import explain_pipeline
+from app.services.scheduler_service import ExperimentScheduler, Resources
+from app.tasks import pipeline as pipeline_tasks
+from app.tasks import scheduler as scheduler_tasks
 
 router = APIRouter()
 
 
-# 假数据生成器
-def generate_mock_experiments(count: int = 15) -> list:
-    """生成模拟实验"""
-    experiments = []
-    statuses = ["pending", "running", "completed", "failed"]
-    directions = ["ja-en", "en-ja"]
-
-    for i in range(count):
-        status = random.choice(statuses)
-        created_time = datetime.utcnow() - timedelta(days=random.randint(1, 30))
-
-        experiment = {
-            "id": str(uuid4()),
-            "name": f"exp-{random.choice(directions)}-{random.randint(1000, 9999)}",
-            "task": "translation",
-            "direction": random.choice(directions),
-            "dataset_id": str(uuid4()),
-            "base_model_id": str(uuid4()),
-            "adapter_id": str(uuid4()) if random.random() > 0.5 else None,
-            "status": status,
-            "best_score": round(random.uniform(0.4, 0.85), 2) if status == "completed" else None,
-            "celery_task_id": str(uuid4()) if status in ["running", "completed"] else None,
-            "created_at": created_time.isoformat(),
-            "updated_at": (created_time + timedelta(hours=random.randint(1, 48))).isoformat(),
-            "started_at": (
-                (created_time + timedelta(minutes=5)).isoformat()
-                if status in ["running", "completed", "failed"]
-                else None
-            ),
-            "completed_at": (
-                (created_time + timedelta(hours=random.randint(2, 12))).isoformat()
-                if status == "completed"
-                else None
-            ),
-        }
-        experiments.append(experiment)
-
-    return experiments
-
-
-# 全局模拟数据
-MOCK_EXPERIMENTS = generate_mock_experiments(15)
-
-
 @router.get("", response_model=PaginatedResponse[Experiment])
 async def get_experiments(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     status: Optional[str] = None,
-    model_id: Optional[str] = None,
+    model_id: Optional[UUID] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    learning_rate_min: Optional[float] = None,
+    learning_rate_max: Optional[float] = None,
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    count: Optional[str] = Query(None, regex="^(exact|estimated|none)$"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     実験一覧を取得
+
+    - learning_rate_min / learning_rate_max: 学習率 (training_recipe.learning_rate) の範囲で絞り込み
+    - cursor: 前のページのnext_cursorを指定すると続きを取得 (深いページでも一定時間、pageは無視)
+    - count: exact (件数を集計) / estimated (統計情報からの推定) / none、
+      省略時はpage指定ならexact、cursor指定ならnone
     """
-    # 过滤
-    filtered = MOCK_EXPERIMENTS.copy()
-
-    if status:
-        filtered = [e for e in filtered if e["status"] == status]
-    if model_id:
-        filtered = [
-            e for e in filtered if e["base_model_id"] == model_id or e["adapter_id"] == model_id
-        ]
-    if search:
-        filtered = [e for e in filtered if search.lower() in e["name"].lower()]
-
-    # 分页
-    total = len(filtered)
-    start = (page - 1) * page_size
-    end = start + page_size
-    items = filtered[start:end]
-
-    total_pages = (total + page_size - 1) // page_size
-
-    return PaginatedResponse(
-        items=items, total=total, page=page, page_size=page_size, total_pages=total_pages
+    return await ExperimentService(db).get_experiments(
+        page,
+        page_size,
+        status,
+        model_id,
+        search,
+        cursor,
+        count,
+        learning_rate_min=learning_rate_min,
+        learning_rate_max=learning_rate_max,
     )
 
 
+@router.get("/scheduler/status", response_model=SchedulerStatus)
+def get_scheduler_status(db: Session = Depends(get_db)):
+    """
+    スケジューラの容量・使用量・待ち行列を取得
+    """
+    return ExperimentScheduler(db).status()
+
+
 @router.get("/{experiment_id}", response_model=ExperimentDetail)
 async def get_experiment_detail(
-    experiment_id: str,
-    db: Session = Depends(get_db),
+    experiment_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     実験詳細を取得
     """
-    # 查找实验
-    experiment = next((e for e in MOCK_EXPERIMENTS if e["id"] == experiment_id), None)
+    service = ExperimentService(db)
+    experiment = await service.get_detail(experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="実験が見つかりません")
 
-    # 生成详细信息
-    detail = {
-        **experiment,
-        "config": {
-            "dataset_version": 1,
-            "prompt_contract_id": str(uuid4()),
-            "training_recipe": {
-                "lora_config": {
-                    "r": 8,
-                    "alpha": 16,
-                    "dropout": 0.1,
-                    "target_modules": ["q_proj", "v_proj"],
-                },
-                "batch_size": 16,
-                "learning_rate": 1e-4,
-                "epochs": 10,
-                "warmup_steps": 100,
-                "optimizer": "adamw",
-            },
-            "seed": 42,
-            "environment": {},
-        },
-        "progress": (
-            {
-                "current_epoch": random.randint(1, 10),
-                "total_epochs": 10,
-                "current_step": random.randint(100, 1000),
-                "total_steps": 1000,
-                "loss": round(random.uniform(0.3, 1.5), 3),
-                "gpu_utilization": round(random.uniform(70.0, 95.0), 1),
-                "eta": f"{random.randint(10, 120)}分",
-                "last_update": datetime.utcnow().isoformat(),
-            }
-            if experiment["status"] == "running"
-            else None
-        ),
-        "logs": [
-            {
-                "timestamp": (datetime.utcnow() - timedelta(minutes=i * 5)).isoformat(),
-                "level": random.choice(["info", "info", "info", "warning"]),
-                "message": random.choice(
-                    [
-                        "Training started",
-                        f"Epoch {i+1}/10 completed",
-                        f"Loss: {random.uniform(0.3, 1.5):.3f}",
-                        "Checkpoint saved",
-                        "GPU utilization: 85%",
-                    ]
-                ),
-            }
-            for i in range(10)
-        ],
-        "metrics": (
-            {
-                "final_loss": round(random.uniform(0.2, 0.5), 3),
-                "best_bleu": round(random.uniform(0.4, 0.8), 2),
-                "training_time": f"{random.randint(2, 12)}時間",
-            }
-            if experiment["status"] == "completed"
-            else None
-        ),
-    }
-
-    return detail
+    progress = None
+    if experiment.status == "running":
+        progress = await service.get_progress(experiment_id)
+
+    return ExperimentDetail(
+        **Experiment.model_validate(experiment).model_dump(),
+        dataset=experiment.dataset,
+        base_model=experiment.base_model,
+        adapter=experiment.adapter,
+        evaluations=experiment.evaluations,
+        config=experiment.config,
+        progress=progress,
+        logs=await service.recent_logs(experiment_id),
+        metrics=experiment.metrics,
+        pipeline=experiment.pipeline,
+    )
+
+
+def _with_training_defaults(config: ExperimentConfig) -> dict:
+    """未在配方中指定的checkpoint/早停设置取默认值 (app.config的DEFAULT_*)"""
+    data = config.model_dump(mode="json")
+    recipe = data["training_recipe"]
+
+    if "auto_save_checkpoints" not in config.training_recipe.model_fields_set:
+        recipe["auto_save_checkpoints"] = settings.DEFAULT_AUTO_SAVE_CHECKPOINTS
+    if recipe.get("checkpoint_interval") is None:
+        recipe["checkpoint_interval"] = settings.DEFAULT_CHECKPOINT_INTERVAL
+    if recipe.get("early_stopping_patience") is None and settings.DEFAULT_EARLY_STOPPING_PATIENCE:
+        recipe["early_stopping_patience"] = settings.DEFAULT_EARLY_STOPPING_PATIENCE
+    return data
 
 
 @router.post("", response_model=Experiment, status_code=201)
 async def create_experiment(
     experiment_data: ExperimentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_optional_user),
 ):
     """
     実験を作成
+
+    実験の所有者 (スケジューラの公平性の単位) は認証ユーザー、トークンがない場合は owner_id
     """
-    new_experiment = {
-        "id": str(uuid4()),
-        "name": experiment_data.name,
-        "task": experiment_data.task,
-        "direction": experiment_data.direction,
-        "dataset_id": str(experiment_data.dataset_id),
-        "base_model_id": str(experiment_data.base_model_id),
-        "adapter_id": str(experiment_data.adapter_id) if experiment_data.adapter_id else None,
-        "status": "pending",
-        "best_score": None,
-        "celery_task_id": None,
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
-        "started_at": None,
-        "completed_at": None,
-    }
-
-    MOCK_EXPERIMENTS.insert(0, new_experiment)
-    return new_experiment
-
-
-@router.post("/{experiment_id}/start", response_model=TaskResponse)
+    owner_id = current_user.id if current_user else experiment_data.owner_id
+    if owner_id and not await db.get(User, owner_id):
+        raise HTTPException(status_code=400, detail="ユーザーが見つかりません")
+
+    resources = (
+        experiment_data.resources.model_dump(exclude_none=True)
+        if experiment_data.resources
+        else None
+    )
+    if not Resources.requested(resources).fits(Resources.capacity()):
+        raise HTTPException(status_code=400, detail="要求リソースがワーカーの容量を超えています")
+
+    return await ExperimentService(db).create_experiment(
+        name=experiment_data.name,
+        task=experiment_data.task,
+        direction=experiment_data.direction,
+        dataset_id=experiment_data.dataset_id,
+        base_model_id=experiment_data.base_model_id,
+        adapter_id=experiment_data.adapter_id,
+        config=_with_training_defaults(experiment_data.config),
+        priority=experiment_data.priority,
+        resources=resources,
+        owner_id=owner_id,
+    )
+
+
+@router.post("/{experiment_id}/start", response_model=TaskResponse, status_code=202)
 async def start_experiment(
-    experiment_id: str,
-    db: Session = Depends(get_db),
+    experiment_id: UUID,
+    request: StartExperimentRequest = StartExperimentRequest(),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    実験を開始
+    実験をスケジューラの待ち行列に追加
+
+    リソースに空きがあり次第、優先度と公平性に基づいて学習ワーカーに割り当てられる
     """
-    experiment = next((e for e in MOCK_EXPERIMENTS if e["id"] == experiment_id), None)
+    experiment = await ExperimentService(db).get(experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="実験が見つかりません")
 
-    if experiment["status"] != "pending":
+    if experiment.status != "pending":
         raise HTTPException(status_code=400, detail="この実験は既に開始されています")
 
-    # 更新状态
-    experiment["status"] = "running"
-    experiment["started_at"] = datetime.utcnow().isoformat()
-    experiment["celery_task_id"] = str(uuid4())
+    task = scheduler_tasks.submit_experiment.delay(str(experiment_id), request.priority)
+
+    return TaskResponse(
+        task_id=task.id,
+        status="queued",
+        message="実験が待ち行列に追加されました",
+    )
+
+
+@router.post("/{experiment_id}/pipeline", response_model=TaskResponse, status_code=202)
+async def run_experiment_pipeline(
+    experiment_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    パイプラインを実行 (品質ゲート → 学習 → 評価 (spoken/written 並列) → レポート生成)
+
+    入力が前回の実行から変わっていない段階はスキップされる。
+    評価段階は現在指標を計算しないため、レポートは API で登録された評価がある場合のみ生成される
+    """
+    experiment = await ExperimentService(db).get(experiment_id)
+    if not experiment:
+        raise HTTPException(status_code=404, detail="実験が見つかりません")
+
+    if experiment.status not in ("pending", "completed"):
+        raise HTTPException(status_code=400, detail="実行中または終了した実験です")
+
+    result = pipeline_tasks.build_pipeline(str(experiment_id)).apply_async()
 
     return TaskResponse(
-        task_id=experiment["celery_task_id"],
-        status="started",
-        message="実験が開始されました",
+        task_id=result.id,
+        status="pending",
+        message="パイプラインを開始しました",
     )
 
 
+@router.get("/{experiment_id}/pipeline/explain", response_model=PipelineExplain)
+def explain_experiment_pipeline(
+    experiment_id: UUID,
+    db: Session = Depends(get_db),
+):
+    """
+    パイプラインの各段階のキャッシュ状況を取得 (段階は実行しない)
+
+    - skip: この実験で同じ入力の実行が完了済み
+    - reuse: 同じ入力の他の実験の結果を再利用
+    - run: 実行が必要
+    """
+    try:
+        return explain_pipeline(db, experiment_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="実験が見つかりません")
+
+
 @router.post("/{experiment_id}/stop", response_model=Experiment)
-async def stop_experiment(
-    experiment_id: str,
+def stop_experiment(
+    experiment_id: UUID,
     db: Session = Depends(get_db),
 ):
     """
     実験を停止
+
+    実行中の実験はcheckpointを保存してから停止する (stopping -> stopped)。
+    STOP_GRACE_SECONDS以内に停止しない場合はタスクを強制終了する
     """
-    experiment = next((e for e in MOCK_EXPERIMENTS if e["id"] == experiment_id), None)
+    experiment = db.get(ExperimentModel, experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="実験が見つかりません")
 
-    if experiment["status"] != "running":
-        raise HTTPException(status_code=400, detail="実行中の実験ではありません")
+    if experiment.status not in ("pending", "queued", "starting", "running"):
+        raise HTTPException(status_code=400, detail="停止できる状態の実験ではありません")
 
-    # 更新状态
-    experiment["status"] = "stopped"
-    experiment["completed_at"] = datetime.utcnow().isoformat()
+    # 取消标志立即生效, 宽限期后的强制终止由enforce_stop任务处理
+    if ExperimentScheduler(db).stop(experiment_id) == "stopping":
+        scheduler_tasks.enforce_stop.apply_async(
+            args=[str(experiment_id)], countdown=settings.STOP_GRACE_SECONDS
+        )
 
+    db.refresh(experiment)
     return experiment
 
 
 @router.get("/{experiment_id}/logs")
 async def get_experiment_logs(
-    experiment_id: str,
+    experiment_id: UUID,
+    request: Request,
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    offset: Optional[int] = Query(None, ge=0),
+    since: Optional[datetime] = None,
+    follow: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     実験ログを取得
+
+    - offset/limit: 行番号で指定 (索引でseekするため深いページでも一定時間)
+    - since: 指定時刻以降のログから読み込む
+    - follow=true: SSEで新しいログを追跡配信
     """
-    experiment = next((e for e in MOCK_EXPERIMENTS if e["id"] == experiment_id), None)
+    experiment = await ExperimentService(db).get(experiment_id)
     if not experiment:
         raise HTTPException(status_code=404, detail="実験が見つかりません")
 
-    # 生成日志
-    logs = [
-        {
-            "timestamp": (datetime.utcnow() - timedelta(minutes=i * 5)).isoformat(),
-            "level": random.choice(["info", "info", "info", "warning", "error"]),
-            "message": random.choice(
-                [
-                    "Training initialization started",
-                    "Loading dataset...",
-                    "Loading model weights...",
-                    f"Epoch {i%10 + 1}/10, Step {i*10 + 1}/1000",
-                    f"Loss: {random.uniform(0.3, 1.5):.3f}",
-                    "Saving checkpoint...",
-                    f"GPU Memory: {random.randint(8000, 12000)}MB / 16384MB",
-                    "Validation started",
-                    f"Validation BLEU: {random.uniform(0.3, 0.7):.2f}",
-                ]
-            ),
-        }
-        for i in range(limit)
-    ]
-
-    return {"logs": logs[offset : offset + limit], "total": len(logs)}
+    reader = ExperimentLogReader(str(experiment_id))
+    total = await run_in_threadpool(reader.total)
+
+    # 起始行: Last-Event-ID(重连) > since > offset > 最后limit行
+    last_event_id = request.headers.get("last-event-id")
+    if follow and last_event_id and last_event_id.isdigit():
+        start = int(last_event_id) + 1
+    elif since is not None:
+        start = await run_in_threadpool(reader.line_at_time, since)
+    elif offset is not None:
+        start = offset
+    else:
+        start = max(total - limit, 0) if follow else 0
+
+    if not follow:
+        logs = await run_in_threadpool(reader.read, start, limit)
+        return TrustedJSONResponse({"logs": logs, "total": total, "offset": start})
+
+    return StreamingResponse(
+        _follow_logs(request, reader, start, limit),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _follow_logs(request: Request, reader: ExperimentLogReader, start: int, limit: int):
+    """SSE: 先输出start之后的已有日志, 之后轮询新追加的行"""
+    cursor = None
+    while not await request.is_disconnected():
+        if cursor is None:
+            cursor = await run_in_threadpool(reader.cursor_at, start)
+            if cursor is not None and cursor.line != start:
+                cursor = None
+        if cursor is not None:
+            lines, cursor = await run_in_threadpool(reader.read_from, cursor, limit)
+            for line_no, raw in lines:
+                entry = parse_line(line_no, raw)
+                yield f"id: {line_no}\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+            if lines:
+                continue
+        await asyncio.sleep(settings.LOG_FOLLOW_POLL_INTERVAL)
+
+
+@router.get("/{experiment_id}/metrics", response_model=MetricSeriesResponse)
+def get_experiment_metrics(
+    experiment_id: UUID,
+    series: Optional[List[str]] = Query(None),
+    width: int = Query(1000, ge=10, le=10000),
+    method: str = Query("lttb", regex="^(lttb|minmax)$"),
+    start_step: Optional[int] = Query(None, ge=0),
+    end_step: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    step単位のトレーニング指標を取得 (チャート幅に合わせてダウンサンプリング)
+    """
+    items = MetricsService(db).get_series(
+        experiment_id,
+        names=series or DEFAULT_SERIES,
+        width=width,
+        method=method,
+        start_step=start_step,
+        end_step=end_step,
+    )
+
+    return MetricSeriesResponse(
+        experiment_id=experiment_id, width=width, method=method, series=items
+    )
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """读取客户端消息直到断开连接"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/{experiment_id}/ws")
+async def experiment_progress_ws(websocket: WebSocket, experiment_id: str):
+    """
+    実験進捗をWebSocketでリアルタイム配信
+
+    同一実験の全クライアントでRedis購読を1つ共有する
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            experiment = await ExperimentService(db).get(UUID(experiment_id))
+        except ValueError:
+            experiment = None
+    if not experiment:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    queue = await broadcaster.subscribe(experiment_id)
+    receiver = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            await websocket.send_text(getter.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        await broadcaster.unsubscribe(experiment_id, queue)
 
 
 @router.delete("/{experiment_id}", status_code=204)
 async def delete_experiment(
-    experiment_id: str,
-    db: Session = Depends(get_db),
+    experiment_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     実験を削除
     """
-    global MOCK_EXPERIMENTS
-    MOCK_EXPERIMENTS = [e for e in MOCK_EXPERIMENTS if e["id"] != experiment_id]
+    if not await ExperimentService(db).delete(experiment_id):
+        raise HTTPException(status_code=404, detail="実験が見つかりません")
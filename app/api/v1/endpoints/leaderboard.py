@@ -0,0 +1,32 @@
+"""
+Leaderboard API endpoints
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.api.v1.deps import get_async_db
+from app.schemas.leaderboard import LeaderboardEntry
+from app.services.leaderboard_service import SORT_COLUMNS, LeaderboardService
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    track: Optional[str] = None,
+    dataset_id: Optional[UUID] = None,
+    model_id: Optional[UUID] = None,
+    sort_by: str = Query("bleu", regex=f"^({'|'.join(SORT_COLUMNS)})$"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    リーダーボードを取得 (モデル × データセット × trackごとの最高スコア)
+
+    - sort_by: bleu / rouge_l / ribes / mqm の降順 (スコアのないものは末尾)
+    - track / dataset_id / model_id: 絞り込み
+    """
+    return await LeaderboardService(db).get_leaderboard(track, dataset_id, model_id, sort_by, limit)
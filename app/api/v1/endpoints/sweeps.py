@@ -0,0 +1,158 @@
+"""
+Sweeps API endpoints
+"""
+
+from collections import Counter
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import redis
+
+from app.api.v1.deps import get_cursor, get_db, get_optional_user
+from app.api.v1.endpoints.experiments import _with_training_defaults
+from app.models.experiment import Experiment as ExperimentModel
+from app.models.sweep import Sweep as SweepModel
+from app.models.user import User
+from app.schemas.common import PaginatedResponse
+from app.schemas.sweep import Sweep, SweepCreate, SweepDetail
+from app.services.base import Cursor
+from app.services.scheduler_service import Resources
+from app.services.sweep_service import SweepService
+from app.tasks import sweep as sweep_tasks
+from app.training.pruning import load_rungs
+
+router = APIRouter()
+
+
+@router.get("", response_model=PaginatedResponse[Sweep])
+def get_sweeps(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    status: Optional[str] = None,
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    count: Optional[str] = Query(None, regex="^(exact|estimated|none)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    スイープ一覧を取得
+
+    - cursor: 前のページのnext_cursorを指定すると続きを取得 (深いページでも一定時間、pageは無視)
+    - count: exact (件数を集計) / estimated (統計情報からの推定) / none、
+      省略時はpage指定ならexact、cursor指定ならnone
+    """
+    return SweepService(db).get_sweeps(page, page_size, status, cursor, count)
+
+
+@router.post("", response_model=Sweep, status_code=201)
+def create_sweep(
+    sweep_data: SweepCreate,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user),
+):
+    """
+    ハイパーパラメータ探索 (スイープ) を作成
+
+    探索空間を子実験に展開し、max_parallel件ずつスケジューラに投入する。
+    pruner を指定すると、学習途中の指標で劣る子実験を ASHA で早期終了する。
+    子実験の所有者は認証ユーザー、トークンがない場合は owner_id
+    """
+    owner_id = current_user.id if current_user else sweep_data.owner_id
+    if owner_id and not db.get(User, owner_id):
+        raise HTTPException(status_code=400, detail="ユーザーが見つかりません")
+
+    resources = sweep_data.resources.model_dump(exclude_none=True) if sweep_data.resources else None
+    if not Resources.requested(resources).fits(Resources.capacity()):
+        raise HTTPException(status_code=400, detail="要求リソースがワーカーの容量を超えています")
+
+    template = {
+        "task": sweep_data.task,
+        "direction": sweep_data.direction,
+        "dataset_id": str(sweep_data.dataset_id),
+        "base_model_id": str(sweep_data.base_model_id),
+        "adapter_id": str(sweep_data.adapter_id) if sweep_data.adapter_id else None,
+        "config": _with_training_defaults(sweep_data.config),
+        "priority": sweep_data.priority,
+        "resources": resources,
+    }
+    try:
+        sweep = SweepService(db).create(
+            sweep_data.name,
+            template,
+            {k: v.model_dump(exclude_none=True) for k, v in sweep_data.search_space.items()},
+            strategy=sweep_data.strategy,
+            num_trials=sweep_data.num_trials,
+            max_parallel=sweep_data.max_parallel,
+            pruner=sweep_data.pruner.model_dump() if sweep_data.pruner else None,
+            objective=sweep_data.objective,
+            owner_id=owner_id,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"探索空間が不正です: {e}")
+
+    sweep_tasks.advance_sweep.delay(str(sweep.id))
+    return sweep
+
+
+@router.get("/{sweep_id}", response_model=SweepDetail)
+def get_sweep_detail(
+    sweep_id: UUID,
+    db: Session = Depends(get_db),
+):
+    """
+    スイープ詳細を取得 (子実験・ASHA の各段階の結果)
+    """
+    sweep = db.query(SweepModel).filter(SweepModel.id == sweep_id).first()
+    if not sweep:
+        raise HTTPException(status_code=404, detail="スイープが見つかりません")
+
+    trials = (
+        db.query(ExperimentModel)
+        .filter(ExperimentModel.sweep_id == sweep_id)
+        .order_by(ExperimentModel.name)
+        .all()
+    )
+    try:
+        rungs = load_rungs(str(sweep_id))
+    except redis.RedisError:
+        rungs = {}
+
+    return SweepDetail(
+        **Sweep.model_validate(sweep).model_dump(),
+        template=sweep.template,
+        trials=[
+            {
+                "experiment_id": e.id,
+                "name": e.name,
+                "status": e.status,
+                "hyperparameters": e.hyperparameters or {},
+                "metrics": e.metrics,
+            }
+            for e in trials
+        ],
+        status_counts=Counter(e.status for e in trials),
+        rungs=rungs,
+        steps_completed=sum((e.metrics or {}).get("steps_completed", 0) for e in trials),
+    )
+
+
+@router.post("/{sweep_id}/stop", response_model=Sweep)
+def stop_sweep(
+    sweep_id: UUID,
+    db: Session = Depends(get_db),
+):
+    """
+    スイープを停止
+
+    未開始の子実験は取り消し、実行中の子実験は checkpoint を保存してから停止する
+    """
+    sweep = db.query(SweepModel).filter(SweepModel.id == sweep_id).first()
+    if not sweep:
+        raise HTTPException(status_code=404, detail="スイープが見つかりません")
+    if sweep.status != "running":
+        raise HTTPException(status_code=400, detail="実行中のスイープではありません")
+
+    sweep_tasks.stop_sweep.delay(str(sweep_id))
+    return sweep
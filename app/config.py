@@ -16,10 +16,80 @@ class Settings(BaseSettings):
 
     # 数据库
     DATABASE_URL: str
+    # 连接池 (每个进程独立): API进程的同步/异步引擎各一个
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800  # 连接使用超过此时间(秒)后重建, 避免被服务端/代理断开
+    DB_POOL_TIMEOUT: float = 30.0  # 池满时等待空闲连接的最长时间(秒)
+    DB_POOL_SLOW_CHECKOUT: float = 0.5  # 获取连接等待超过此时间(秒)时输出警告
+    # Celery prefork子进程 (每个子进程同时只执行一个任务)
+    DB_WORKER_POOL_SIZE: int = 2
+    DB_WORKER_MAX_OVERFLOW: int = 2
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # HTTP响应缓存 (数据集/模型/评测/报告的GET, 写入时按资源标签失效)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 300
+
+    # NDJSON批量写入 (/bulk)
+    BULK_BATCH_SIZE: int = 1000  # 每批的行数 (一条多行INSERT / 一个SAVEPOINT)
+    BULK_MAX_ROWS: int = 100000  # 单个请求的行数上限
+
+    # 训练进度推送
+    PROGRESS_PUBLISH_INTERVAL: float = 1.0  # 同一实验两次推送的最小间隔(秒)
+    PROGRESS_SNAPSHOT_TTL: int = 86400
+
+    # 训练指标时序存储
+    METRICS_CHUNK_SIZE: int = 1024  # 每个数据块的step数
+
+    # 训练
+    DEFAULT_AUTO_SAVE_CHECKPOINTS: bool = True  # 实验未指定时是否定期保存checkpoint
+    DEFAULT_CHECKPOINT_INTERVAL: int = 500  # 实验未指定时的checkpoint间隔(step)
+    DEFAULT_EARLY_STOPPING_PATIENCE: int = 3  # 实验未指定时的早停patience, 0表示不早停
+    TRAINING_MAX_RETRIES: int = 3
+    CHECKPOINT_KEEP_LAST: int = 3  # 保留最近N个checkpoint
+    CHECKPOINT_KEEP_BEST: int = 1  # 另外保留验证指标最好的K个
+    TRAINING_DEVICE: str = "auto"  # auto: 有CUDA时使用GPU, 否则CPU
+    TRAINING_LEASE_TTL: int = 900  # 训练租约的有效期(秒), 进程被杀后重新投递的任务最多等待这么久
+
+    # 实验调度 (训练worker的总容量与实验的默认资源需求)
+    SCHEDULER_CAPACITY_MEMORY_MB: int = 32768
+    SCHEDULER_CAPACITY_CPU_CORES: int = 8
+    SCHEDULER_CAPACITY_ACCELERATORS: int = 1
+    SCHEDULER_DEFAULT_MEMORY_MB: int = 8192
+    SCHEDULER_DEFAULT_CPU_CORES: int = 2
+    SCHEDULER_DEFAULT_ACCELERATORS: int = 0
+    SCHEDULER_TICK_INTERVAL: float = 15.0  # 定期调度间隔(秒)
+    SCHEDULER_AGING_SECONDS: int = 3600  # 每等待这么久优先级+1, 防止饿死
+    SCHEDULER_RESERVE_AFTER_SECONDS: int = 1800  # 队首等待超过此时间后停止回填小任务
+
+    # 实验停止
+    CANCEL_POLL_INTERVAL: float = 1.0  # 训练循环检查取消标志的最小间隔(秒)
+    CANCEL_FLAG_TTL: int = 86400
+    STOP_GRACE_SECONDS: int = 120  # 超过此时间仍未停止则revoke并终止任务进程
+
+    # 超参数搜索 (sweep)
+    SWEEP_MAX_TRIALS: int = 100  # 单个sweep展开的子实验上限
+    SWEEP_PRUNER_MIN_STEPS: int = 50  # 第一个rung的step数
+    SWEEP_PRUNER_REDUCTION_FACTOR: int = 3  # 每个rung只保留前1/3
+    SWEEP_RUNG_TTL: int = 86400 * 7
+    SWEEP_TICK_INTERVAL: float = 60.0  # 定期推进sweep的间隔(秒), 兜底子实验结束时的触发
+
+    # 训练数据加载
+    DATALOADER_MAX_TOKENS: int = 8192  # 每个batch的token预算 (含padding)
+    DATALOADER_MAX_SEQ_LEN: int = 512
+    DATALOADER_SHUFFLE_BUFFER: int = 10000
+    DATALOADER_NUM_WORKERS: int = 2  # 分词进程数, 0表示在加载线程中分词
+    DATALOADER_WORKER_CHUNK: int = 64
+    DATALOADER_PREFETCH: int = 4  # 预取batch数
+
+    # 预分词缓存
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_DIR: str = "./token_cache"  # api与各worker挂载同一目录共用
+    TOKEN_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024  # 超过后按LRU淘汰
+
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
@@ -47,12 +117,21 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     CHECKPOINT_DIR: str = "./checkpoints"
     DATASET_DIR: str = "./datasets"
+    LOG_DIR: str = "./logs"
+
+    # 实验日志
+    LOG_SEGMENT_MAX_BYTES: int = 16 * 1024 * 1024
+    LOG_INDEX_INTERVAL: int = 256  # 每隔多少行写一条稀疏索引
+    LOG_FOLLOW_POLL_INTERVAL: float = 0.5
 
     # Quality Gate阈值
     QUALITY_GATE_ALIGNMENT_RATE: float = 0.8
     QUALITY_GATE_DUPLICATE_RATE: float = 0.2
     QUALITY_GATE_LANGUAGE_CONSISTENCY: float = 0.9
 
+    # Baseline Probe
+    PROBE_MAX_CONCURRENCY: int = 8
+
     class Config:
         env_file = ".env"
         case_sensitive = True
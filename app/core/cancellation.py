@@ -0,0 +1,76 @@
+"""
+实验取消标志 - Redis
+
+API端设置 experiment:{id}:cancel, 训练循环在step之间轮询该标志,
+发现后保存checkpoint并以stopped状态结束, 不需要强制终止worker进程。
+"""
+
+import time
+from typing import Optional
+
+import redis
+import structlog
+
+from app.config import settings
+from app.core.redis import get_redis
+
+logger = structlog.get_logger()
+
+
+def cancel_key(experiment_id: str) -> str:
+    """取消标志的key"""
+    return f"experiment:{experiment_id}:cancel"
+
+
+def request_cancel(experiment_id: str, reason: str = "user") -> None:
+    """设置取消标志"""
+    get_redis().set(cancel_key(experiment_id), reason, ex=settings.CANCEL_FLAG_TTL)
+
+
+def clear_cancel(experiment_id: str) -> None:
+    """清除取消标志"""
+    try:
+        get_redis().delete(cancel_key(experiment_id))
+    except redis.RedisError as e:
+        logger.warning("cancel_flag_clear_failed", experiment_id=experiment_id, error=str(e))
+
+
+class CancellationToken:
+    """
+    训练循环使用的取消检查
+
+    每次调用is_set()最多每poll_interval秒访问一次Redis, 可以在每个step调用;
+    标志一旦被发现就保持为True。
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        poll_interval: Optional[float] = None,
+        client: Optional[redis.Redis] = None,
+    ):
+        self.experiment_id = experiment_id
+        self.key = cancel_key(experiment_id)
+        self.poll_interval = (
+            settings.CANCEL_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self.client = client or get_redis()
+        self.reason: Optional[str] = None
+        self._last_poll = 0.0
+
+    def is_set(self) -> bool:
+        if self.reason is not None:
+            return True
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return False
+        self._last_poll = now
+        try:
+            self.reason = self.client.get(self.key)
+        except redis.RedisError as e:
+            # Redis不可用时继续训练, 由revoke兜底
+            logger.warning(
+                "cancel_flag_poll_failed", experiment_id=self.experiment_id, error=str(e)
+            )
+            return False
+        return self.reason is not None
@@ -0,0 +1,110 @@
+"""
+数据库连接池监控
+
+InstrumentedQueuePool / InstrumentedAsyncQueuePool 在获取连接 (checkout) 时记录等待时间,
+池满等待超时也会计数; 与连接池当前的使用量一起通过 pool_metrics() 提供,
+用于判断连接池是否饱和。超过DB_POOL_SLOW_CHECKOUT的等待会输出警告日志 (Celery worker中没有HTTP接口)。
+
+统计按连接池类在进程内累计: 每个进程只有一个同步引擎和一个异步引擎。
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+import structlog
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+
+class PoolStats:
+    """checkout等待时间的累计值"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": (
+                    round(self.wait_seconds_total / attempts, 6) if attempts else 0.0
+                ),
+            }
+
+
+class _InstrumentedMixin:
+    """Pool.connect() 的耗时 = 等待空闲连接 (或新建连接) 的时间"""
+
+    stats: PoolStats
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.observe(time.perf_counter() - start, timed_out=True)
+            logger.warning("db_pool_checkout_timeout", pool=type(self).__name__, **_usage(self))
+            raise
+        waited = time.perf_counter() - start
+        self.stats.observe(waited)
+        if waited >= settings.DB_POOL_SLOW_CHECKOUT:
+            logger.warning(
+                "db_pool_checkout_slow",
+                pool=type(self).__name__,
+                wait_seconds=round(waited, 3),
+                **_usage(self),
+            )
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    """同步引擎 (psycopg2) 的连接池"""
+
+    stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    """异步引擎 (asyncpg) 的连接池"""
+
+    stats = PoolStats()
+
+
+def _usage(pool: Pool) -> Dict[str, Any]:
+    """连接池当前的使用量"""
+    return {
+        "pool_size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+def pool_metrics(pool: Pool) -> Dict[str, Any]:
+    """使用量 + checkout等待统计"""
+    metrics = _usage(pool)
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        metrics.update(stats.snapshot())
+    return metrics
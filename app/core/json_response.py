@@ -0,0 +1,52 @@
+"""
+JSON响应 - orjson
+
+应用的默认响应类为ORJSONResponse (app.main), 声明了response_model的接口仍先经过Pydantic校验与序列化。
+对数据来自数据库、写入时已校验过的大响应 (评测详情的样本、报告详情、日志页),
+接口直接返回TrustedJSONResponse: FastAPI对Response实例不再按response_model校验,
+由orjson把ORM属性/字典直接编码为bytes。response_model仍保留, 用于OpenAPI文档。
+"""
+
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """orjson不支持的类型: 嵌套的Pydantic模型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class TrustedJSONResponse(ORJSONResponse):
+    """不经过response_model校验, 直接用orjson编码的响应"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def trusted_payload(
+    schema: Type[BaseModel], obj: Optional[Any] = None, **values: Any
+) -> Dict[str, Any]:
+    """
+    按schema的顶层字段组装响应 (不校验)
+
+    字段值依次取values、obj的同名属性 (ORM对象), 都没有时取schema的默认值;
+    与response_model的输出字段一致 (不含schema以外的键)。
+    """
+    payload = {}
+    for name, field in schema.model_fields.items():
+        if name in values:
+            payload[name] = values[name]
+        elif obj is not None and hasattr(obj, name):
+            payload[name] = getattr(obj, name)
+        elif not field.is_required():
+            payload[name] = field.get_default(call_default_factory=True)
+    return payload
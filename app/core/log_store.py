@@ -0,0 +1,293 @@
+"""
+实验日志存储
+
+Worker通过structlog将JSON日志逐行追加到 LOG_DIR/{experiment_id}/ 下的分段文件,
+每个分段 {seq}.log 配有稀疏索引 {seq}.idx, 每隔 LOG_INDEX_INTERVAL 行记录一条
+(行号, 时间戳, 字节偏移)。读取时二分查找索引后直接seek, 不需要从头扫描。
+"""
+
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.config import settings
+
+# 索引记录: 行号(int64) 时间戳(float64) 字节偏移(int64)
+_INDEX_RECORD = struct.Struct("<qdq")
+
+
+def _log_dir(experiment_id: str) -> Path:
+    return Path(settings.LOG_DIR) / str(experiment_id)
+
+
+def _segment_path(directory: Path, seq: int) -> Path:
+    return directory / f"{seq:06d}.log"
+
+
+def _index_path(directory: Path, seq: int) -> Path:
+    return directory / f"{seq:06d}.idx"
+
+
+def _list_segments(directory: Path) -> List[int]:
+    if not directory.is_dir():
+        return []
+    return sorted(int(p.stem) for p in directory.glob("*.log"))
+
+
+def _read_index(directory: Path, seq: int) -> List[Tuple[int, float, int]]:
+    try:
+        data = _index_path(directory, seq).read_bytes()
+    except FileNotFoundError:
+        return []
+    usable = len(data) - len(data) % _INDEX_RECORD.size
+    return list(_INDEX_RECORD.iter_unpack(data[:usable]))
+
+
+def _truncate_partial_line(path: Path) -> None:
+    """删除进程崩溃时留下的未写完的末行"""
+    size = path.stat().st_size
+    if size == 0:
+        return
+    with open(path, "rb+") as f:
+        tail_start = max(size - 65536, 0)
+        f.seek(tail_start)
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        f.truncate(tail_start + tail.rfind(b"\n") + 1)
+
+
+def parse_line(line_no: int, raw: bytes) -> Dict[str, Any]:
+    """将一行JSON日志转换为LogEntry格式"""
+    try:
+        record = json.loads(raw)
+    except ValueError:
+        return {
+            "line": line_no,
+            "timestamp": "",
+            "level": "info",
+            "message": raw.decode(errors="replace"),
+        }
+
+    timestamp = record.pop("timestamp", "")
+    level = record.pop("level", "info")
+    message = record.pop("event", "")
+    return {
+        "line": line_no,
+        "timestamp": timestamp,
+        "level": level,
+        "message": message,
+        "fields": record,
+    }
+
+
+class ExperimentLogWriter:
+    """
+    分段日志写入器
+
+    实现structlog所需的日志方法, 每条记录写入一行并立即flush,
+    以便tail读取方尽快看到新日志。
+    """
+
+    def __init__(self, experiment_id: str):
+        self.directory = _log_dir(experiment_id)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = settings.LOG_SEGMENT_MAX_BYTES
+        self.index_interval = settings.LOG_INDEX_INTERVAL
+        self._lock = threading.Lock()
+
+        segments = _list_segments(self.directory)
+        if segments:
+            self.seq = segments[-1]
+            _truncate_partial_line(_segment_path(self.directory, self.seq))
+            self.next_line = ExperimentLogReader(experiment_id).total()
+        else:
+            self.seq, self.next_line = 0, 0
+        self._open()
+
+    def _open(self) -> None:
+        self._file = open(_segment_path(self.directory, self.seq), "ab")
+        self._index = open(_index_path(self.directory, self.seq), "ab")
+        self._segment_empty = self._file.tell() == 0
+
+    def _rotate(self) -> None:
+        self.close()
+        self.seq += 1
+        self._open()
+
+    def msg(self, message: str) -> None:
+        """写入一行已渲染的日志"""
+        data = message.encode() + b"\n"
+        with self._lock:
+            if not self._segment_empty and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+
+            # 分段首行必须写索引, 读取方据此确定分段的起始行号
+            if self._segment_empty or self.next_line % self.index_interval == 0:
+                record = _INDEX_RECORD.pack(self.next_line, time.time(), self._file.tell())
+                self._index.write(record)
+                self._index.flush()
+
+            self._file.write(data)
+            self._file.flush()
+            self._segment_empty = False
+            self.next_line += 1
+
+    log = debug = info = warning = warn = error = critical = exception = fatal = msg
+
+    def close(self) -> None:
+        self._file.close()
+        self._index.close()
+
+
+def get_experiment_logger(experiment_id: str) -> Tuple[Any, ExperimentLogWriter]:
+    """
+    获取写入实验日志文件的structlog logger
+
+    返回 (logger, writer), 调用方在任务结束时负责 writer.close()
+    """
+    writer = ExperimentLogWriter(experiment_id)
+    log = structlog.wrap_logger(
+        writer,
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+        experiment_id=str(experiment_id),
+    )
+    return log, writer
+
+
+@dataclass
+class LogCursor:
+    """tail读取位置"""
+
+    seq: int
+    position: int
+    line: int
+
+
+class ExperimentLogReader:
+    """基于稀疏索引的日志读取器"""
+
+    def __init__(self, experiment_id: str):
+        self.directory = _log_dir(experiment_id)
+
+    def _segment_starts(self) -> Tuple[List[int], List[int]]:
+        """各分段的序号与起始行号"""
+        seqs, starts = [], []
+        for seq in _list_segments(self.directory):
+            index = _read_index(self.directory, seq)
+            if index:
+                seqs.append(seq)
+                starts.append(index[0][0])
+        return seqs, starts
+
+    def _locate(self, line: int) -> Optional[LogCursor]:
+        """找到包含指定行的分段, 返回其前方最近索引点的位置"""
+        seqs, starts = self._segment_starts()
+        if not seqs:
+            return None
+        i = max(bisect.bisect_right(starts, line) - 1, 0)
+        index = _read_index(self.directory, seqs[i])
+        j = bisect.bisect_right([entry[0] for entry in index], line) - 1
+        line_no, _, position = index[max(j, 0)]
+        return LogCursor(seq=seqs[i], position=position, line=line_no)
+
+    def total(self) -> int:
+        """日志总行数 (只扫描最后一个索引点之后的内容)"""
+        seqs, _ = self._segment_starts()
+        if not seqs:
+            return 0
+        line_no, _, position = _read_index(self.directory, seqs[-1])[-1]
+        with open(_segment_path(self.directory, seqs[-1]), "rb") as f:
+            f.seek(position)
+            return line_no + sum(1 for raw in f if raw.endswith(b"\n"))
+
+    def line_at_time(self, since: datetime) -> int:
+        """时间戳不早于since的第一行的行号"""
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        since_ts = since.timestamp()
+        cursor = None
+        for seq in _list_segments(self.directory):
+            for line_no, ts, position in _read_index(self.directory, seq):
+                if ts >= since_ts:
+                    break
+                cursor = LogCursor(seq=seq, position=position, line=line_no)
+            else:
+                continue
+            break
+        if cursor is None:
+            return 0
+
+        # 从索引点向后扫描, 索引时间为写入时间, 与记录中的时间戳一致
+        since_iso = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        while True:
+            lines, cursor = self.read_from(cursor, settings.LOG_INDEX_INTERVAL)
+            for line_no, raw in lines:
+                if parse_line(line_no, raw)["timestamp"] >= since_iso:
+                    return line_no
+            if not lines:
+                return cursor.line
+
+    def read_from(self, cursor: LogCursor, limit: int) -> Tuple[List[Tuple[int, bytes]], LogCursor]:
+        """
+        从cursor开始读取至多limit行完整日志, 必要时切换到下一个分段
+
+        返回 (行列表, 新cursor); 末尾未写完的行不会被读取。
+        """
+        lines: List[Tuple[int, bytes]] = []
+        seq, position, line_no = cursor.seq, cursor.position, cursor.line
+
+        while len(lines) < limit:
+            path = _segment_path(self.directory, seq)
+            if not path.exists():
+                break
+            with open(path, "rb") as f:
+                f.seek(position)
+                while len(lines) < limit:
+                    raw = f.readline()
+                    if not raw.endswith(b"\n"):
+                        break
+                    lines.append((line_no, raw[:-1]))
+                    position += len(raw)
+                    line_no += 1
+
+            if len(lines) >= limit or not _segment_path(self.directory, seq + 1).exists():
+                break
+            # 当前分段已读完且存在下一分段
+            if position >= os.path.getsize(path):
+                seq, position = seq + 1, 0
+            else:
+                break
+
+        return lines, LogCursor(seq=seq, position=position, line=line_no)
+
+    def cursor_at(self, line: int) -> Optional[LogCursor]:
+        """定位到指定行"""
+        cursor = self._locate(line)
+        if cursor is None:
+            return None
+        if cursor.line < line:
+            # 从索引点向前跳过不足LOG_INDEX_INTERVAL行
+            _, cursor = self.read_from(cursor, line - cursor.line)
+        return cursor
+
+    def read(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """按行号offset/limit读取日志"""
+        cursor = self.cursor_at(offset)
+        if cursor is None or cursor.line != offset:
+            return []
+        lines, _ = self.read_from(cursor, limit)
+        return [parse_line(line_no, raw) for line_no, raw in lines]
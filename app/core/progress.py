@@ -0,0 +1,174 @@
+"""
+实验进度推送 - Redis pub/sub
+
+Worker端通过 ProgressPublisher 发布进度(合并+限流),
+API端通过 ProgressBroadcaster 为每个实验只保持一个Redis订阅,
+再分发给所有WebSocket客户端。
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Set
+
+import redis
+import structlog
+
+from app.config import settings
+from app.core.redis import get_async_redis, get_redis
+
+logger = structlog.get_logger()
+
+
+def progress_channel(experiment_id: str) -> str:
+    """实验进度频道名"""
+    return f"experiment:{experiment_id}"
+
+
+def progress_snapshot_key(experiment_id: str) -> str:
+    """最新进度快照的key, 供新连接的客户端立即获取当前状态"""
+    return f"experiment:{experiment_id}:progress"
+
+
+class ProgressPublisher:
+    """
+    进度发布器 (Worker端)
+
+    高频的step级事件先合并到pending中, 距上次发送超过min_interval才真正发布;
+    状态变更等事件使用 force=True 立即发送。
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        min_interval: Optional[float] = None,
+        client: Optional[redis.Redis] = None,
+    ):
+        self.experiment_id = experiment_id
+        self.channel = progress_channel(experiment_id)
+        self.snapshot_key = progress_snapshot_key(experiment_id)
+        self.min_interval = (
+            settings.PROGRESS_PUBLISH_INTERVAL if min_interval is None else min_interval
+        )
+        self.client = client or get_redis()
+        self._pending: Dict[str, Any] = {}
+        self._last_sent = 0.0
+
+    def publish(self, event: Dict[str, Any], force: bool = False) -> bool:
+        """合并事件, 满足限流条件时发布; 返回是否实际发送"""
+        self._pending.update(event)
+        if not force and time.monotonic() - self._last_sent < self.min_interval:
+            return False
+        return self.flush()
+
+    def flush(self) -> bool:
+        """发送合并后的事件"""
+        if not self._pending:
+            return False
+
+        message = json.dumps(
+            {"experiment_id": self.experiment_id, "ts": time.time(), **self._pending}
+        )
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(self.snapshot_key, message, ex=settings.PROGRESS_SNAPSHOT_TTL)
+            pipe.publish(self.channel, message)
+            pipe.execute()
+        except redis.RedisError as e:
+            # 推送失败不影响训练本身
+            logger.warning(
+                "progress_publish_failed", experiment_id=self.experiment_id, error=str(e)
+            )
+            return False
+
+        self._pending = {}
+        self._last_sent = time.monotonic()
+        return True
+
+
+class ProgressBroadcaster:
+    """
+    进度广播器 (API端)
+
+    每个频道只建立一个Redis订阅, 消息分发给该频道的所有客户端队列。
+    客户端队列长度为1, 慢客户端只会收到最新一条消息。
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, Set[asyncio.Queue]] = {}
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, experiment_id: str) -> asyncio.Queue:
+        """注册客户端, 返回接收消息的队列"""
+        channel = progress_channel(experiment_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async with self._lock:
+            self._clients.setdefault(channel, set()).add(queue)
+            if channel not in self._readers:
+                self._readers[channel] = asyncio.create_task(self._read(channel))
+
+        # 先推送最新快照
+        snapshot = await get_async_redis().get(progress_snapshot_key(experiment_id))
+        if snapshot:
+            self._offer(queue, snapshot)
+
+        return queue
+
+    async def unsubscribe(self, experiment_id: str, queue: asyncio.Queue) -> None:
+        """注销客户端, 最后一个客户端离开时取消Redis订阅"""
+        channel = progress_channel(experiment_id)
+        async with self._lock:
+            clients = self._clients.get(channel)
+            if clients is None:
+                return
+            clients.discard(queue)
+            if not clients:
+                del self._clients[channel]
+                reader = self._readers.pop(channel, None)
+                if reader:
+                    reader.cancel()
+
+    async def close(self) -> None:
+        """关闭所有订阅"""
+        async with self._lock:
+            for reader in self._readers.values():
+                reader.cancel()
+            self._readers.clear()
+            self._clients.clear()
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str) -> None:
+        """写入队列, 队列已满时丢弃旧消息"""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message)
+
+    async def _read(self, channel: str) -> None:
+        """从Redis读取消息并分发"""
+        pubsub = get_async_redis().pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                for queue in list(self._clients.get(channel, ())):
+                    self._offer(queue, message["data"])
+        except asyncio.CancelledError:
+            pass
+        except redis.RedisError as e:
+            logger.error("progress_subscription_failed", channel=channel, error=str(e))
+        finally:
+            # 异常退出时移除reader, 下一个订阅者会重新建立订阅
+            if self._readers.get(channel) is asyncio.current_task():
+                del self._readers[channel]
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+
+# 全局广播器实例
+broadcaster = ProgressBroadcaster()
@@ -0,0 +1,20 @@
+"""
+Redis客户端
+"""
+
+from functools import lru_cache
+import redis
+import redis.asyncio as aioredis
+from app.config import settings
+
+
+@lru_cache
+def get_redis() -> redis.Redis:
+    """同步客户端 (Celery worker使用)"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+@lru_cache
+def get_async_redis() -> aioredis.Redis:
+    """异步客户端 (FastAPI使用)"""
+    return aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
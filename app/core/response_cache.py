@@ -0,0 +1,171 @@
+"""
+HTTP响应缓存 - Redis
+
+读多写少的资源 (数据集/模型/评测/报告) 的GET响应按 (路径, 查询参数, 用户) 缓存在Redis中,
+响应带ETag和Last-Modified, 请求的If-None-Match与ETag一致时返回304 (不返回body)。
+
+失效按资源标签: 每个标签在Redis中有一个版本号, 缓存key包含响应所依赖标签的当前版本,
+写入时INCR版本号即可使旧缓存全部失效 (旧key随TTL过期), 不需要枚举删除。
+- API的写请求 (POST/PUT/PATCH/DELETE) 成功后由中间件递增路径对应资源的标签
+- Celery任务直接写数据库, 写入后调用 invalidate_tags()
+
+Redis不可用时跳过缓存, 不影响接口本身。
+"""
+
+import hashlib
+import json
+import time
+from email.utils import formatdate
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import redis
+import structlog
+from fastapi import Request, Response
+
+from app.config import settings
+from app.core.redis import get_async_redis, get_redis
+
+logger = structlog.get_logger()
+
+# 缓存的资源 -> 其响应依赖的标签 (详情中含有实验名、评测汇总等)
+CACHED_RESOURCES: Dict[str, Tuple[str, ...]] = {
+    "datasets": ("datasets", "experiments", "evaluations"),
+    "models": ("models", "experiments", "evaluations"),
+    "evaluations": ("evaluations", "experiments", "models", "datasets"),
+    "reports": ("reports", "experiments", "evaluations", "models"),
+}
+
+# 写请求的资源 -> 递增的标签 (默认为资源本身)
+WRITE_TAGS: Dict[str, Tuple[str, ...]] = {
+    "sweeps": ("sweeps", "experiments"),
+}
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def tag_key(tag: str) -> str:
+    """标签版本号的key"""
+    return f"response_cache:tag:{tag}"
+
+
+def resource_of(path: str) -> Optional[str]:
+    """/api/v1/{resource}/... 中的resource"""
+    prefix = settings.API_V1_PREFIX + "/"
+    if not path.startswith(prefix):
+        return None
+    return path[len(prefix) :].split("/", 1)[0] or None
+
+
+def user_of(request: Request) -> str:
+    """缓存按用户区分: Authorization头的哈希, 无认证时为anonymous"""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return "anonymous"
+    return hashlib.sha256(authorization.encode()).hexdigest()[:16]
+
+
+def cache_key(request: Request, versions: Sequence[Optional[str]]) -> str:
+    """路径 + 排序后的查询参数 + 用户 + 依赖标签的版本"""
+    params = sorted(request.query_params.multi_items())
+    raw = json.dumps(
+        [request.url.path, params, user_of(request), [v or "0" for v in versions]],
+        separators=(",", ":"),
+    )
+    return "response_cache:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match (可以是多个ETag或*; 弱比较)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates
+
+
+def _cached_response(request: Request, entry: Dict[str, str], hit: bool) -> Response:
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        "Cache-Control": "no-cache",  # 客户端每次都用If-None-Match重新验证
+        "X-Cache": "HIT" if hit else "MISS",
+    }
+    if etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type=entry["media_type"], headers=headers)
+
+
+async def cache_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """响应缓存中间件 (app.main中注册)"""
+    resource = resource_of(request.url.path)
+    if not settings.RESPONSE_CACHE_ENABLED or resource is None:
+        return await call_next(request)
+
+    if request.method in WRITE_METHODS:
+        response = await call_next(request)
+        if response.status_code < 400:
+            await invalidate_tags_async(WRITE_TAGS.get(resource, (resource,)))
+        return response
+
+    if request.method != "GET" or resource not in CACHED_RESOURCES:
+        return await call_next(request)
+
+    client = get_async_redis()
+    key = None
+    try:
+        versions = await client.mget([tag_key(tag) for tag in CACHED_RESOURCES[resource]])
+        key = cache_key(request, versions)
+        raw = await client.get(key)
+    except redis.RedisError as e:
+        logger.warning("response_cache_read_failed", path=request.url.path, error=str(e))
+        raw = None
+    if raw:
+        return _cached_response(request, json.loads(raw), hit=True)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    entry = {
+        "body": body.decode(),
+        "media_type": response.media_type or response.headers.get("content-type"),
+        "etag": make_etag(body),
+        "last_modified": formatdate(time.time(), usegmt=True),
+    }
+    if key is not None:
+        try:
+            await client.set(key, json.dumps(entry), ex=settings.RESPONSE_CACHE_TTL)
+        except redis.RedisError as e:
+            logger.warning("response_cache_write_failed", path=request.url.path, error=str(e))
+    return _cached_response(request, entry, hit=False)
+
+
+async def invalidate_tags_async(tags: Iterable[str]) -> None:
+    """递增标签版本 (API端)"""
+    try:
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(tag_key(tag))
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("response_cache_invalidate_failed", tags=list(tags), error=str(e))
+
+
+def invalidate_tags(*tags: str) -> None:
+    """递增标签版本 (Celery worker端, 任务写入数据库后调用)"""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(tag_key(tag))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("response_cache_invalidate_failed", tags=list(tags), error=str(e))
@@ -0,0 +1,121 @@
+"""
+训练租约 - Redis
+
+同一实验同时只允许一个train_model执行。acks_late的训练消息在超过broker的visibility_timeout、
+或worker失联后会被重新投递 (task id不变), 第二个副本如果照常执行, 会与第一个副本争用同一组
+checkpoint/日志/指标目录和experiment.status。
+
+执行者在开始前以 SET NX 取得 experiment:{id}:training_lease (值为 task id + 主机 + 进程),
+训练循环中定期续期; 进程被杀时租约在TTL后过期, 重新投递的消息即可接手并从checkpoint恢复。
+"""
+
+import os
+import socket
+import time
+from typing import Optional
+
+import redis
+import structlog
+
+from app.config import settings
+from app.core.redis import get_redis
+
+logger = structlog.get_logger()
+
+# 值一致时才续期/释放 (不影响其他执行者取得的租约)
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseLost(Exception):
+    """租约已被其他执行者取得"""
+
+
+def lease_key(experiment_id: str) -> str:
+    """训练租约的key"""
+    return f"experiment:{experiment_id}:training_lease"
+
+
+class TrainingLease:
+    """
+    一个train_model执行的租约
+
+    renew()最多每TTL/3秒访问一次Redis, 可以在每个step调用。
+    Redis不可用时不阻止训练 (与取消标志相同), 只输出警告。
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        task_id: Optional[str],
+        ttl: Optional[int] = None,
+        client: Optional[redis.Redis] = None,
+    ):
+        self.experiment_id = experiment_id
+        self.key = lease_key(experiment_id)
+        self.owner = f"{task_id}:{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl or settings.TRAINING_LEASE_TTL
+        self.client = client or get_redis()
+        self.holder: Optional[str] = None
+        self._acquired = False
+        self._last_renew = 0.0
+
+    def acquire(self) -> bool:
+        """取得租约; 其他执行者持有时返回False (holder为其值)"""
+        try:
+            if self.client.set(self.key, self.owner, nx=True, ex=self.ttl):
+                self._acquired = True
+                self._last_renew = time.monotonic()
+                return True
+            self.holder = self.client.get(self.key)
+            return False
+        except redis.RedisError as e:
+            logger.warning(
+                "training_lease_unavailable", experiment_id=self.experiment_id, error=str(e)
+            )
+            return True
+
+    def renew(self) -> None:
+        """续期; 租约已属于其他执行者时抛出LeaseLost"""
+        if not self._acquired:
+            return
+        now = time.monotonic()
+        if now - self._last_renew < self.ttl / 3:
+            return
+        self._last_renew = now
+        try:
+            renewed = self.client.eval(_RENEW, 1, self.key, self.owner, self.ttl)
+            if not renewed and self.client.set(self.key, self.owner, nx=True, ex=self.ttl):
+                # 过期后无人接手 (例如Redis重启), 重新取得
+                renewed = 1
+            if not renewed:
+                self.holder = self.client.get(self.key)
+        except redis.RedisError as e:
+            logger.warning(
+                "training_lease_renew_failed", experiment_id=self.experiment_id, error=str(e)
+            )
+            return
+        if not renewed:
+            self._acquired = False
+            raise LeaseLost(self.holder)
+
+    def release(self) -> None:
+        if not self._acquired:
+            return
+        self._acquired = False
+        try:
+            self.client.eval(_RELEASE, 1, self.key, self.owner)
+        except redis.RedisError as e:
+            logger.warning(
+                "training_lease_release_failed", experiment_id=self.experiment_id, error=str(e)
+            )
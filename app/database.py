@@ -3,20 +3,77 @@
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.core.db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    """连接池参数 (每个进程独立的连接池)"""
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,  # 连接池预检测
+        "echo": settings.DEBUG,  # SQL日志
+    }
+
+
+def create_sync_engine(
+    pool_size: int = settings.DB_POOL_SIZE, max_overflow: int = settings.DB_MAX_OVERFLOW
+):
+    """同步引擎 (psycopg2)"""
+    return create_engine(
+        settings.DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        **_pool_options(pool_size, max_overflow),
+    )
+
 
 # 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # 连接池预检测
-    echo=settings.DEBUG,  # SQL日志
-)
+engine = create_sync_engine()
 
 # Session工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """同一数据库的asyncpg连接URL"""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+# 异步引擎 (API接口使用, 查询不阻塞事件循环)
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW),
+)
+
+# 异步Session工厂; commit后不过期, 返回的ORM对象在序列化时不会再触发查询
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def configure_worker_engine() -> None:
+    """
+    Celery prefork子进程启动时调用 (worker_process_init)
+
+    fork继承的连接池中的连接与父进程共享socket, 不能在子进程中使用:
+    丢弃继承的连接 (close=False, 不关闭父进程仍在使用的连接), 再按worker的池大小重建同步引擎。
+    worker不使用异步引擎, 同样只丢弃继承的连接。
+    """
+    global engine
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    engine = create_sync_engine(settings.DB_WORKER_POOL_SIZE, settings.DB_WORKER_MAX_OVERFLOW)
+    SessionLocal.configure(bind=engine)
+
+
 # 声明式基类
 Base = declarative_base()
 
@@ -31,3 +88,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    异步数据库Session依赖注入
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
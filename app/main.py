@@ -3,9 +3,14 @@ FastAPI应用入口
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.api.v1.router import api_router
+from app.core.progress import broadcaster
+from app.core.response_cache import cache_middleware
+from app.core.db_pool import pool_metrics
+from app.database import async_engine, engine
 import structlog
 
 # 配置结构化日志
@@ -24,8 +29,12 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
+    default_response_class=ORJSONResponse,
 )
 
+# 响应缓存 (先注册, CORS在其外层, 缓存命中的响应同样带CORS头)
+app.middleware("http")(cache_middleware)
+
 # CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +54,8 @@ async def startup_event():
 # 关闭事件
 @app.on_event("shutdown")
 async def shutdown_event():
+    await broadcaster.close()
+    await async_engine.dispose()
     logger.info("application_shutdown")
 
 
@@ -54,6 +65,15 @@ async def health_check():
     return {"status": "healthy", "service": settings.PROJECT_NAME}
 
 
+# 数据库连接池指标 (本进程): 使用中的连接数与获取连接的等待时间
+@app.get("/health/db-pool")
+async def db_pool_metrics():
+    return {
+        "sync": pool_metrics(engine.pool),
+        "async": pool_metrics(async_engine.pool),
+    }
+
+
 # 注册API路由
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
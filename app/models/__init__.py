@@ -6,8 +6,12 @@ from app.models.base import Base
 from app.models.model import Model, PromptContract
 from app.models.dataset import Dataset
 from app.models.experiment import Experiment
+from app.models.sweep import Sweep
+from app.models.stage_cache import StageCacheEntry
+from app.models.metric import ExperimentMetricChunk
 from app.models.evaluation import Evaluation
 from app.models.report import Report
+from app.models.leaderboard import LeaderboardEntry
 from app.models.user import User
 
 __all__ = [
@@ -16,7 +20,11 @@ __all__ = [
     "PromptContract",
     "Dataset",
     "Experiment",
+    "Sweep",
+    "StageCacheEntry",
+    "ExperimentMetricChunk",
     "Evaluation",
     "Report",
+    "LeaderboardEntry",
     "User",
 ]
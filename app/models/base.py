@@ -4,11 +4,27 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, DateTime
+from typing import Union
+from sqlalchemy import Column, DateTime, Float, Text, cast, literal_column
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base as SQLAlchemyBase
 
 
+def jsonb_number(column: Union[Column, str], *path: str):
+    """
+    JSONB中的数值: CAST(column -> 'a' ->> 'b' AS FLOAT)
+
+    键名以字面量写入SQL (不作为绑定参数), 查询条件与表达式索引的表达式完全一致才能使用索引;
+    asyncpg使用服务端参数, 绑定参数形式的键名无法匹配。path只能是代码中的固定键名。
+    在__table_args__中声明索引时column传列名。
+    """
+    expression = literal_column(column) if isinstance(column, str) else column
+    for key in path[:-1]:
+        expression = expression.op("->")(literal_column(f"'{key}'"))
+    expression = expression.op("->>", return_type=Text)(literal_column(f"'{path[-1]}'"))
+    return cast(expression, Float)
+
+
 class Base(SQLAlchemyBase):
     """抽象基类,所有模型继承此类"""
 
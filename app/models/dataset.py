@@ -2,9 +2,9 @@
 Dataset相关数据库模型
 """
 
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import backref, relationship
 from app.models.base import Base
 
 
@@ -12,6 +12,28 @@ class Dataset(Base):
     """数据集表"""
 
     __tablename__ = "datasets"
+    __table_args__ = (
+        # 列表: 按各过滤列 + 创建时间倒序分页
+        Index("ix_datasets_created_at", "created_at", "id"),
+        Index("ix_datasets_status_created_at", "status", "created_at", "id"),
+        Index("ix_datasets_type_created_at", "type", "created_at", "id"),
+        Index("ix_datasets_scene_created_at", "scene", "created_at", "id"),
+        Index("ix_datasets_direction_created_at", "language_direction", "created_at", "id"),
+        # 名称部分匹配搜索 (ILIKE '%...%', 需要pg_trgm扩展)
+        Index(
+            "ix_datasets_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # Quality Gate结果的包含查询 (quality_gate_result @> '{"status": "passed"}')
+        Index(
+            "ix_datasets_quality_gate_result",
+            "quality_gate_result",
+            postgresql_using="gin",
+            postgresql_ops={"quality_gate_result": "jsonb_path_ops"},
+        ),
+    )
 
     name = Column(String(255), nullable=False, index=True)
     version = Column(Integer, default=1)
@@ -49,5 +71,9 @@ class Dataset(Base):
     file_path = Column(String(500), nullable=True)
 
     # 关系
-    parent = relationship("Dataset", remote_side="Dataset.id", backref="versions")
+    parent = relationship(
+        "Dataset",
+        remote_side="Dataset.id",
+        backref=backref("versions", order_by="Dataset.version"),
+    )
     experiments = relationship("Experiment", back_populates="dataset")
@@ -2,16 +2,30 @@
 Evaluation相关数据库模型
 """
 
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from app.models.base import Base
+from app.models.base import Base, jsonb_number
+
+# 可按阈值/范围过滤的评测指标 (metrics中的数值, 各有表达式索引)
+FILTERABLE_METRICS = ("bleu", "rouge_l", "ribes")
 
 
 class Evaluation(Base):
     """评测表"""
 
     __tablename__ = "evaluations"
+    __table_args__ = (
+        Index("ix_evaluations_created_at", "created_at", "id"),
+        Index("ix_evaluations_track_created_at", "track", "created_at", "id"),
+        Index("ix_evaluations_experiment_created_at", "experiment_id", "created_at", "id"),
+        Index("ix_evaluations_experiment_track", "experiment_id", "track"),
+        # 指标阈值/范围过滤: CAST(metrics ->> 'bleu' AS FLOAT)
+        *(
+            Index(f"ix_evaluations_metrics_{name}", jsonb_number("metrics", name))
+            for name in FILTERABLE_METRICS
+        ),
+    )
 
     experiment_id = Column(UUID(as_uuid=True), ForeignKey("experiments.id"), nullable=False)
     track = Column(String(50), nullable=False)  # 'spoken' | 'written'
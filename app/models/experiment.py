@@ -2,16 +2,34 @@
 Experiment相关数据库模型
 """
 
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from app.models.base import Base
+from app.models.base import Base, jsonb_number
 
 
 class Experiment(Base):
     """实验表"""
 
     __tablename__ = "experiments"
+    __table_args__ = (
+        Index("ix_experiments_created_at", "created_at", "id"),
+        Index("ix_experiments_status_created_at", "status", "created_at", "id"),
+        Index("ix_experiments_base_model_created_at", "base_model_id", "created_at", "id"),
+        Index("ix_experiments_adapter_created_at", "adapter_id", "created_at", "id"),
+        Index("ix_experiments_dataset_created_at", "dataset_id", "created_at", "id"),
+        Index(
+            "ix_experiments_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # 学习率范围过滤: CAST(config -> 'training_recipe' ->> 'learning_rate' AS FLOAT)
+        Index(
+            "ix_experiments_learning_rate",
+            jsonb_number("config", "training_recipe", "learning_rate"),
+        ),
+    )
 
     name = Column(String(255), nullable=False, index=True)
     task = Column(String(50), default="translation")
@@ -41,12 +59,27 @@ class Experiment(Base):
 
     # 状态
     status = Column(String(50), default="pending")
-    # 'pending' | 'running' | 'completed' | 'failed' | 'stopped'
+    # 'pending' | 'queued' | 'starting' | 'running' | 'stopping'
+    # | 'completed' | 'failed' | 'stopped' | 'pruned'
+
+    # 调度
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+    priority = Column(Integer, default=0, nullable=False)  # 越大越优先
+    resources = Column(JSONB, nullable=True)
+    # {"memory_mb": 8192, "cpu_cores": 2, "accelerators": 1}, 未指定的项取系统默认值
+    queued_at = Column(DateTime, nullable=True)
+
+    # 超参数搜索 (sweep的子实验)
+    sweep_id = Column(UUID(as_uuid=True), ForeignKey("sweeps.id"), nullable=True, index=True)
+    hyperparameters = Column(JSONB, nullable=True)  # 本实验在搜索空间中的取值
 
     # 结果
     metrics = Column(JSONB, nullable=True)
     best_checkpoint_path = Column(String(500), nullable=True)
 
+    # 流水线各阶段的幂等键、状态与耗时 (app.services.pipeline_service)
+    pipeline = Column(JSONB, nullable=True)
+
     # Celery任务ID
     celery_task_id = Column(String(255), nullable=True)
 
@@ -58,4 +91,7 @@ class Experiment(Base):
     dataset = relationship("Dataset", back_populates="experiments")
     base_model = relationship("Model", foreign_keys=[base_model_id])
     adapter = relationship("Model", foreign_keys=[adapter_id])
-    evaluations = relationship("Evaluation", back_populates="experiment")
+    evaluations = relationship(
+        "Evaluation", back_populates="experiment", order_by="Evaluation.created_at.desc()"
+    )
+    sweep = relationship("Sweep", back_populates="experiments")
@@ -0,0 +1,209 @@
+"""
+排行榜相关数据库模型
+
+leaderboard_entries是evaluations的汇总表: 每个 (模型, 数据集, track) 一行, 保存各指标的最好值。
+模型为实验使用的适配器 (无则为基座模型)。排行榜接口只读这张表, 不再连接实验/评测并解析JSONB。
+
+汇总表在写入评测的同一事务中维护: Session flush时 (after_flush) 若有评测被新增、修改或删除,
+重新汇总受影响的 (模型, 数据集, track) 的所有评测 (行数与该组合的评测数成正比, 与评测总数无关)。
+同一 (模型, 数据集) 的汇总由事务级advisory锁串行, 并行写入的事务不会互相覆盖。
+"""
+
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    delete,
+    event,
+    func,
+    inspect,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, aggregate_order_by, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.base import Base, jsonb_number
+from app.models.evaluation import Evaluation
+from app.models.experiment import Experiment
+
+
+class LeaderboardEntry(Base):
+    """排行榜汇总表"""
+
+    __tablename__ = "leaderboard_entries"
+    __table_args__ = (
+        UniqueConstraint("model_id", "dataset_id", "track", name="uq_leaderboard_entry"),
+        Index("ix_leaderboard_dataset_track", "dataset_id", "track"),
+        Index("ix_leaderboard_track_bleu", "track", "best_bleu"),
+    )
+
+    model_id = Column(
+        PG_UUID(as_uuid=True), ForeignKey("models.id", ondelete="CASCADE"), nullable=False
+    )
+    dataset_id = Column(
+        PG_UUID(as_uuid=True), ForeignKey("datasets.id", ondelete="CASCADE"), nullable=False
+    )
+    track = Column(String(50), nullable=False)
+
+    # 各指标的最好值 (越大越好), 没有该指标的评测时为NULL
+    best_bleu = Column(Float, nullable=True)
+    best_rouge_l = Column(Float, nullable=True)
+    best_ribes = Column(Float, nullable=True)
+    best_mqm = Column(Float, nullable=True)  # metrics.gpt_eval_2.mqm_score
+
+    # BLEU最好的实验
+    best_experiment_id = Column(
+        PG_UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="SET NULL"), nullable=True
+    )
+    evaluation_count = Column(Integer, nullable=False, default=0)
+
+
+# 评测的模型: 适配器, 无则为基座模型
+_model_id = func.coalesce(Experiment.adapter_id, Experiment.base_model_id)
+
+
+def _lock_pairs(connection: Connection, pairs: Iterable[Tuple[UUID, UUID]]) -> None:
+    """
+    事务级advisory锁 (提交/回滚时释放), 同一 (模型, 数据集) 的汇总串行执行
+
+    并行写入评测的事务 (如流水线中spoken/written两个track的评测) 各自汇总时,
+    后提交的一方会用自己快照中的旧汇总覆盖先提交的一方; 取得锁之后再汇总,
+    READ COMMITTED下汇总语句能看到先持有锁的事务已提交的评测。按固定顺序加锁, 避免死锁。
+    """
+    for model_id, dataset_id in sorted(pairs, key=lambda pair: (str(pair[0]), str(pair[1]))):
+        connection.execute(
+            select(
+                func.pg_advisory_xact_lock(
+                    func.hashtextextended(f"leaderboard:{model_id}:{dataset_id}", 0)
+                )
+            )
+        )
+
+
+def refresh_leaderboard(
+    connection: Connection, evaluations: Optional[Iterable[Tuple[UUID, str]]] = None
+):
+    """
+    重新汇总写入的评测所属的排行榜行, evaluations为None时重建整张表
+
+    evaluations为写入 (新增/修改/删除) 的评测的 (实验ID, track);
+    只upsert对应的 (模型, 数据集, track) 行, 已没有评测的行删除。
+    """
+    triples = None
+    if evaluations is not None:
+        evaluations = set(evaluations)
+        keys = {
+            experiment_id: (model_id, dataset_id)
+            for experiment_id, model_id, dataset_id in connection.execute(
+                select(Experiment.id, _model_id, Experiment.dataset_id).where(
+                    Experiment.id.in_({experiment_id for experiment_id, _ in evaluations})
+                )
+            )
+        }
+        triples = {
+            (*keys[experiment_id], track)
+            for experiment_id, track in evaluations
+            if experiment_id in keys
+        }
+        if not triples:
+            return
+        _lock_pairs(connection, {(model_id, dataset_id) for model_id, dataset_id, _ in triples})
+
+    bleu = jsonb_number(Evaluation.metrics, "bleu")
+    summary = (
+        select(
+            func.gen_random_uuid(),
+            _model_id,
+            Experiment.dataset_id,
+            Evaluation.track,
+            func.max(bleu),
+            func.max(jsonb_number(Evaluation.metrics, "rouge_l")),
+            func.max(jsonb_number(Evaluation.metrics, "ribes")),
+            func.max(jsonb_number(Evaluation.metrics, "gpt_eval_2", "mqm_score")),
+            func.array_agg(aggregate_order_by(Experiment.id, bleu.desc().nulls_last()))[1],
+            func.count(),
+            func.timezone("utc", func.now()),
+            func.timezone("utc", func.now()),
+        )
+        .select_from(Evaluation)
+        .join(Experiment, Evaluation.experiment_id == Experiment.id)
+        .group_by(_model_id, Experiment.dataset_id, Evaluation.track)
+    )
+    if triples is not None:
+        summary = summary.where(
+            tuple_(_model_id, Experiment.dataset_id, Evaluation.track).in_(list(triples))
+        )
+
+    table = LeaderboardEntry.__table__
+    upsert = insert(table).from_select(
+        [
+            "id",
+            "model_id",
+            "dataset_id",
+            "track",
+            "best_bleu",
+            "best_rouge_l",
+            "best_ribes",
+            "best_mqm",
+            "best_experiment_id",
+            "evaluation_count",
+            "created_at",
+            "updated_at",
+        ],
+        summary,
+    )
+    upsert = upsert.on_conflict_do_update(
+        constraint="uq_leaderboard_entry",
+        set_={
+            name: upsert.excluded[name]
+            for name in (
+                "best_bleu",
+                "best_rouge_l",
+                "best_ribes",
+                "best_mqm",
+                "best_experiment_id",
+                "evaluation_count",
+                "updated_at",
+            )
+        },
+    ).returning(table.c.model_id, table.c.dataset_id, table.c.track)
+    current = {tuple(row) for row in connection.execute(upsert)}
+
+    key = tuple_(table.c.model_id, table.c.dataset_id, table.c.track)
+    if triples is None:
+        connection.execute(delete(table).where(key.not_in(list(current))))
+    elif triples - current:
+        connection.execute(delete(table).where(key.in_(list(triples - current))))
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_on_evaluation_write(session: Session, flush_context) -> None:
+    """
+    flush中有评测被写入或删除时, 在同一事务中更新排行榜 (AsyncSession同样经过这里)
+
+    修改了实验或track的评测, 修改前所属的行也需要重新汇总。
+    """
+    evaluations = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Evaluation):
+            continue
+        attrs = inspect(obj).attrs
+        experiment_ids = {obj.experiment_id, *attrs.experiment_id.history.deleted}
+        tracks = {obj.track, *attrs.track.history.deleted}
+        evaluations |= {
+            (experiment_id, track)
+            for experiment_id in experiment_ids
+            for track in tracks
+            if experiment_id is not None and track is not None
+        }
+    if evaluations:
+        refresh_leaderboard(session.connection(), evaluations)
@@ -0,0 +1,42 @@
+"""
+训练指标时序相关数据库模型
+"""
+
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, LargeBinary, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+
+class ExperimentMetricChunk(Base):
+    """
+    训练指标数据块表
+
+    每行保存一个指标序列中连续的一段step (列式存储):
+    steps为相对start_step的uint32数组, values为float32数组, 均以原始字节保存。
+    """
+
+    __tablename__ = "experiment_metric_chunks"
+    __table_args__ = (
+        Index(
+            "ix_metric_chunks_experiment_series_step",
+            "experiment_id",
+            "series",
+            "start_step",
+        ),
+    )
+
+    experiment_id = Column(
+        UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False
+    )
+    series = Column(String(50), nullable=False)  # 'loss' | 'learning_rate' | 'tokens_per_sec' ...
+
+    start_step = Column(Integer, nullable=False)
+    end_step = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    # 数据块内的极值, 便于粗粒度查询
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+
+    steps = Column(LargeBinary, nullable=False)
+    values = Column(LargeBinary, nullable=False)
@@ -2,7 +2,7 @@
 Model相关数据库模型
 """
 
-from sqlalchemy import Column, String, ForeignKey, Integer
+from sqlalchemy import Column, String, ForeignKey, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.models.base import Base
@@ -12,6 +12,17 @@ class Model(Base):
     """模型表"""
 
     __tablename__ = "models"
+    __table_args__ = (
+        Index("ix_models_created_at", "created_at", "id"),
+        Index("ix_models_status_created_at", "status", "created_at", "id"),
+        Index("ix_models_type_created_at", "type", "created_at", "id"),
+        Index(
+            "ix_models_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     name = Column(String(255), nullable=False, index=True)
     type = Column(String(50), nullable=False)  # 'base' | 'adapter'
@@ -29,17 +40,22 @@ class Model(Base):
 
     # 关系
     base_model = relationship("Model", remote_side="Model.id", backref="adapters")
-    prompt_contracts = relationship("PromptContract", back_populates="model")
+    prompt_contracts = relationship(
+        "PromptContract", back_populates="model", order_by="PromptContract.version.desc()"
+    )
 
 
 class PromptContract(Base):
     """Prompt契约表"""
 
     __tablename__ = "prompt_contracts"
+    __table_args__ = (Index("ix_prompt_contracts_model_id", "model_id"),)
 
     name = Column(String(255), nullable=False)
     version = Column(Integer, default=1)
     template = Column(String, nullable=False)
+    # 输出契约: 期望的输出结构, 见 app.utils.prompt_template.ContractValidator
+    output_spec = Column(JSONB, nullable=True)
     model_id = Column(UUID(as_uuid=True), ForeignKey("models.id"), nullable=False)
 
     # 关系
@@ -2,7 +2,7 @@
 Report相关数据库模型
 """
 
-from sqlalchemy import Column, String, ForeignKey, DateTime
+from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.models.base import Base
@@ -12,10 +12,27 @@ class Report(Base):
     """报告表"""
 
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_created_at", "created_at", "id"),
+        Index("ix_reports_type_created_at", "type", "created_at", "id"),
+        Index("ix_reports_status_created_at", "status", "created_at", "id"),
+        Index("ix_reports_experiment_id", "experiment_id"),
+        Index(
+            "ix_reports_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
 
     experiment_id = Column(UUID(as_uuid=True), ForeignKey("experiments.id"), nullable=False)
     title = Column(String(255), nullable=False)
-    status = Column(String(50), default="draft")  # 'draft' | 'published'
+    description = Column(Text, nullable=False, default="")
+    type = Column(String(50), nullable=False, default="summary")
+    # 'performance' | 'comparison' | 'analysis' | 'summary'
+    status = Column(String(50), default="draft")  # 'draft' | 'published' | 'generating'
+    tags = Column(JSONB, nullable=False, default=list)
+    created_by = Column(String(255), nullable=True)
 
     # 报告内容(JSONB格式)
     summary = Column(JSONB, default=dict)
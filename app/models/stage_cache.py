@@ -0,0 +1,29 @@
+"""
+流水线阶段缓存相关数据库模型
+"""
+
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.models.base import Base
+
+
+class StageCacheEntry(Base):
+    """
+    流水线阶段缓存表
+
+    key为阶段输入的规范化哈希 (与实验无关), 输入相同的其他实验可以直接复用result。
+    """
+
+    __tablename__ = "stage_cache"
+
+    key = Column(String(64), nullable=False, unique=True, index=True)
+    stage = Column(String(50), nullable=False)  # 'gate' | 'train'
+    result = Column(JSONB, nullable=False, default=dict)
+
+    # 产生该结果的实验
+    source_experiment_id = Column(
+        UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=True
+    )
+
+    hits = Column(Integer, default=0, nullable=False)
+    last_hit_at = Column(DateTime, nullable=True)
@@ -0,0 +1,53 @@
+"""
+Sweep相关数据库模型
+"""
+
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+from app.models.base import Base
+
+
+class Sweep(Base):
+    """超参数搜索表 (每个组合对应一个子实验)"""
+
+    __tablename__ = "sweeps"
+    __table_args__ = (
+        Index("ix_sweeps_created_at", "created_at", "id"),
+        Index("ix_sweeps_status_created_at", "status", "created_at", "id"),
+    )
+
+    name = Column(String(255), nullable=False, index=True)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
+
+    # 子实验的模板 (与创建实验的请求相同, training_recipe中的搜索参数被逐个覆盖)
+    template = Column(JSONB, nullable=False)
+    # {"task": "translation", "direction": "ja-en", "dataset_id": ..., "base_model_id": ...,
+    #  "config": {...}, "priority": 0, "resources": {...}}
+
+    # 搜索空间
+    search_space = Column(JSONB, nullable=False)
+    # {
+    #   "learning_rate": {"min": 1e-5, "max": 1e-3, "log": true},
+    #   "batch_size": {"values": [8, 16, 32]},
+    #   "lora_config.r": {"values": [8, 16]}
+    # }
+    strategy = Column(String(20), default="grid")  # 'grid' | 'random'
+    num_trials = Column(Integer, nullable=False)
+    max_parallel = Column(Integer, default=2, nullable=False)
+
+    # 剪枝 (ASHA) 与目标
+    pruner = Column(JSONB, nullable=True)
+    # {"metric": "loss", "min_steps": 50, "reduction_factor": 3}, null表示不剪枝
+    objective = Column(String(50), default="best_val_loss")  # 子实验metrics中越小越好的指标
+
+    # 状态
+    status = Column(String(50), default="running")
+    # 'running' | 'completed' | 'stopped'
+    best_experiment_id = Column(UUID(as_uuid=True), nullable=True)
+    best_value = Column(JSONB, nullable=True)
+
+    completed_at = Column(DateTime, nullable=True)
+
+    # 关系
+    experiments = relationship("Experiment", back_populates="sweep")
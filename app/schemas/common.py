@@ -2,7 +2,7 @@
 通用Schema定义
 """
 
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from uuid import UUID
@@ -20,13 +20,14 @@ T = TypeVar("T")
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
-    """分页响应"""
+    """分页响应 (count=none时total/total_pages为None; next_cursor为None表示没有下一页)"""
 
     items: List[T]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class BaseSchema(BaseModel):
@@ -40,9 +41,39 @@ class BaseSchema(BaseModel):
         from_attributes = True
 
 
+class ResourceRef(BaseModel):
+    """详情中的关联资源"""
+
+    id: UUID
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
 class TaskResponse(BaseModel):
     """异步任务响应"""
 
     task_id: str
     status: str = "started"
     message: str = "タスクが開始されました"
+
+
+class BulkRowResult(BaseModel):
+    """批量写入中一行的结果"""
+
+    line: int  # NDJSON中的行号 (从1开始)
+    op: Optional[str] = None  # 'create' | 'update' | 'delete'
+    status: str  # 'created' | 'updated' | 'deleted' | 'failed'
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class BulkWriteResponse(BaseModel):
+    """批量写入响应"""
+
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: List[BulkRowResult] = []
@@ -5,7 +5,7 @@ Dataset相关Schema定义
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from uuid import UUID
-from app.schemas.common import BaseSchema
+from app.schemas.common import BaseSchema, ResourceRef
 
 
 class DatasetOverview(BaseModel):
@@ -61,6 +61,16 @@ class DatasetCreate(DatasetBase):
     parent_id: Optional[UUID] = None
 
 
+class DatasetUpdate(BaseModel):
+    """更新Dataset (只更新给出的字段)"""
+
+    name: Optional[str] = None
+    type: Optional[str] = None
+    language_direction: Optional[str] = None
+    scene: Optional[str] = None
+    version: Optional[int] = None
+
+
 class Dataset(DatasetBase, BaseSchema):
     """Dataset完整信息"""
 
@@ -69,9 +79,23 @@ class Dataset(DatasetBase, BaseSchema):
     file_path: Optional[str] = None
 
 
+class DatasetVersion(BaseModel):
+    """派生版本 (以该数据集为父数据集)"""
+
+    id: UUID
+    name: str
+    version: int
+    status: str
+
+    class Config:
+        from_attributes = True
+
+
 class DatasetDetail(Dataset):
     """Dataset详情"""
 
+    parent: Optional[ResourceRef] = None
+    versions: List[DatasetVersion] = []
     overview: Optional[DatasetOverview] = None
     quality_gate_result: Optional[QualityGateResult] = None
     usage_history: List[Dict[str, Any]] = []
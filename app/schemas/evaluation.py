@@ -55,6 +55,14 @@ class EvaluationCreate(EvaluationBase):
     error_analysis: Optional[ErrorAnalysis] = None
 
 
+class EvaluationUpdate(BaseModel):
+    """更新Evaluation (只更新给出的字段, 不能移动到其他实验)"""
+
+    track: Optional[str] = None
+    metrics: Optional[EvaluationMetrics] = None
+    error_analysis: Optional[ErrorAnalysis] = None
+
+
 class Evaluation(EvaluationBase, BaseSchema):
     """Evaluation完整信息"""
 
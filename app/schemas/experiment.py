@@ -6,7 +6,7 @@ from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from app.schemas.common import BaseSchema
+from app.schemas.common import BaseSchema, ResourceRef
 
 
 class TrainingRecipe(BaseModel):
@@ -18,6 +18,15 @@ class TrainingRecipe(BaseModel):
     epochs: int = 10
     warmup_steps: int = 100
     optimizer: str = "adamw"
+    auto_save_checkpoints: bool = True
+    checkpoint_interval: Optional[int] = None  # step数, 默认取DEFAULT_CHECKPOINT_INTERVAL
+    max_tokens_per_batch: Optional[int] = None  # batch的token预算, 默认取DATALOADER_MAX_TOKENS
+    max_seq_len: Optional[int] = None  # 超长样本截断长度, 默认取DATALOADER_MAX_SEQ_LEN
+    gradient_accumulation_steps: int = 1
+    mixed_precision: bool = True  # 仅在CUDA上生效
+    max_grad_norm: float = 1.0
+    validation_split: float = 0.05  # 用于早停和选择最优checkpoint的验证集比例
+    early_stopping_patience: Optional[int] = None  # 默认取DEFAULT_EARLY_STOPPING_PATIENCE
 
 
 class ExperimentConfig(BaseModel):
@@ -30,6 +39,14 @@ class ExperimentConfig(BaseModel):
     environment: Dict[str, Any] = {}
 
 
+class ExperimentResources(BaseModel):
+    """实验声明的资源需求, 未指定时取系统默认值"""
+
+    memory_mb: Optional[int] = None
+    cpu_cores: Optional[int] = None
+    accelerators: Optional[int] = None
+
+
 class ExperimentBase(BaseModel):
     """Experiment基础"""
 
@@ -45,14 +62,46 @@ class ExperimentCreate(ExperimentBase):
     """创建Experiment"""
 
     config: ExperimentConfig
+    priority: int = 0
+    resources: Optional[ExperimentResources] = None
+    owner_id: Optional[UUID] = None  # 公平调度的用户; 携带token时以认证用户为准
+
+
+class StartExperimentRequest(BaseModel):
+    """开始实验请求 (加入调度队列)"""
+
+    priority: Optional[int] = None  # 覆盖创建时的优先级
+
+
+class SchedulerQueueItem(BaseModel):
+    """调度队列中的实验"""
+
+    experiment_id: UUID
+    owner_id: Optional[UUID] = None
+    priority: int
+    effective_priority: int
+    resources: Dict[str, int]
+    queued_at: Optional[datetime] = None
+
+
+class SchedulerStatus(BaseModel):
+    """调度器状态"""
+
+    capacity: Dict[str, int]
+    used: Dict[str, int]
+    running: List[UUID]
+    queue: List[SchedulerQueueItem]
 
 
 class Experiment(ExperimentBase, BaseSchema):
     """Experiment完整信息"""
 
     status: str = "pending"
+    priority: int = 0
+    resources: Optional[Dict[str, Any]] = None
     best_score: Optional[float] = None
     celery_task_id: Optional[str] = None
+    queued_at: Optional[datetime] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
@@ -65,23 +114,81 @@ class ExperimentProgress(BaseModel):
     current_step: int
     total_steps: int
     loss: float
-    gpu_utilization: float
-    eta: str
+    gpu_utilization: Optional[float] = None
+    eta: Optional[str] = None
     last_update: str
 
 
+class MetricSeries(BaseModel):
+    """降采样后的指标序列"""
+
+    name: str
+    steps: List[int]
+    values: List[float]
+    total_points: int
+
+
+class MetricSeriesResponse(BaseModel):
+    """指标序列响应"""
+
+    experiment_id: UUID
+    width: int
+    method: str
+    series: List[MetricSeries]
+
+
 class LogEntry(BaseModel):
     """日志条目"""
 
     timestamp: str
     level: str  # 'info' | 'warning' | 'error'
     message: str
+    line: Optional[int] = None
+    fields: Dict[str, Any] = {}
+
+
+class PipelineStageExplain(BaseModel):
+    """流水线阶段的缓存情况"""
+
+    stage: str
+    key: str
+    action: str  # 'skip' | 'reuse' | 'run'
+    status: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    last_cache_hit: Optional[Dict[str, Any]] = None  # 上次执行是否复用了其他实验的结果
+    cached: bool = False
+    source_experiment_id: Optional[UUID] = None
+    hits: int = 0
+
+
+class PipelineExplain(BaseModel):
+    """流水线下次执行时各阶段的动作"""
+
+    experiment_id: UUID
+    stages: List[PipelineStageExplain]
+
+
+class ExperimentEvaluation(BaseModel):
+    """实验详情中的评测 (不含错误分析)"""
+
+    id: UUID
+    track: str
+    metrics: Dict[str, Any]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
 
 
 class ExperimentDetail(Experiment):
     """Experiment详情"""
 
+    dataset: Optional[ResourceRef] = None
+    base_model: Optional[ResourceRef] = None
+    adapter: Optional[ResourceRef] = None
+    evaluations: List[ExperimentEvaluation] = []
     config: Optional[Dict[str, Any]] = None
     progress: Optional[ExperimentProgress] = None
     logs: List[LogEntry] = []
     metrics: Optional[Dict[str, Any]] = None
+    pipeline: Optional[Dict[str, Any]] = None  # 流水线各阶段的状态与耗时
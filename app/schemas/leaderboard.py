@@ -0,0 +1,25 @@
+"""
+Leaderboard相关Schema定义
+"""
+
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class LeaderboardEntry(BaseModel):
+    """排行榜的一行: (模型, 数据集, track) 的最好指标"""
+
+    model_id: UUID
+    model_name: str
+    dataset_id: UUID
+    dataset_name: str
+    track: str
+    best_bleu: Optional[float] = None
+    best_rouge_l: Optional[float] = None
+    best_ribes: Optional[float] = None
+    best_mqm: Optional[float] = None
+    best_experiment_id: Optional[UUID] = None
+    evaluation_count: int
+    updated_at: datetime
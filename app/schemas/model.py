@@ -6,7 +6,7 @@ from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from app.schemas.common import BaseSchema
+from app.schemas.common import BaseSchema, ResourceRef
 
 
 class BaselineProbe(BaseModel):
@@ -25,6 +25,7 @@ class PromptContractBase(BaseModel):
     name: str
     version: int = 1
     template: str
+    output_spec: Optional[Dict[str, Any]] = None
 
 
 class PromptContract(PromptContractBase, BaseSchema):
@@ -57,6 +58,15 @@ class ModelCreate(ModelBase):
     metadata: Optional[ModelMetadata] = None
 
 
+class ModelUpdate(BaseModel):
+    """更新Model (只更新给出的字段)"""
+
+    name: Optional[str] = None
+    status: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    metadata: Optional[ModelMetadata] = None
+
+
 class Model(ModelBase, BaseSchema):
     """Model完整信息"""
 
@@ -68,6 +78,7 @@ class ModelDetail(Model):
     """Model详情"""
 
     prompt_contracts: List[PromptContract] = []
+    adapters: List[ResourceRef] = []
     evaluation_summary: Optional[Dict[str, Any]] = None
 
 
@@ -75,3 +86,4 @@ class RunProbeRequest(BaseModel):
     """运行探测请求"""
 
     test_cases: Optional[List[Dict[str, Any]]] = None
+    prompt_contract_id: Optional[UUID] = None
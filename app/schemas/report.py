@@ -32,9 +32,9 @@ class ReportRegression(BaseModel):
 
 
 class ReportSummary(BaseModel):
-    changes: List[str]
-    improvements: List[ReportImprovement]
-    regressions: List[ReportRegression]
+    changes: List[str] = []
+    improvements: List[ReportImprovement] = []
+    regressions: List[ReportRegression] = []
 
 
 class ComparisonAnalysis(BaseModel):
@@ -66,14 +66,14 @@ class ChartData(BaseModel):
 
 
 class ReportDetail(Report):
-    summary: ReportSummary
-    comparison: ComparisonAnalysis
-    syntheticDataAnalysis: SyntheticDataImpact
-    metricsSummary: MetricsSummary
-    charts: List[ChartData]
-    conclusions: List[str]
-    recommendations: List[str]
-    nextSteps: List[str]
+    summary: Optional[ReportSummary] = None
+    comparison: Optional[ComparisonAnalysis] = None
+    syntheticDataAnalysis: Optional[SyntheticDataImpact] = None
+    metricsSummary: MetricsSummary = MetricsSummary()
+    charts: List[ChartData] = []
+    conclusions: List[str] = []
+    recommendations: List[str] = []
+    nextSteps: List[str] = []
 
 
 class ReportCreate(BaseModel):
@@ -0,0 +1,82 @@
+"""
+Sweep相关Schema定义
+"""
+
+from typing import Optional, Dict, Any, List, Literal
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import datetime
+from app.schemas.common import BaseSchema
+from app.schemas.experiment import ExperimentBase, ExperimentConfig, ExperimentResources
+
+
+class SearchParameter(BaseModel):
+    """单个参数的搜索范围: values枚举, 或min/max区间 (仅random)"""
+
+    values: Optional[List[Any]] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    log: bool = False  # 对数均匀采样 (learning_rate等)
+
+
+class PrunerConfig(BaseModel):
+    """ASHA剪枝配置, 未指定时取系统默认值"""
+
+    metric: Literal["loss", "val_loss"] = "loss"
+    min_steps: Optional[int] = Field(None, ge=1)
+    reduction_factor: Optional[int] = Field(None, ge=2)
+
+
+class SweepCreate(ExperimentBase):
+    """创建Sweep (name以外的实验字段作为子实验的模板)"""
+
+    config: ExperimentConfig
+    priority: int = 0
+    resources: Optional[ExperimentResources] = None
+    owner_id: Optional[UUID] = None  # 公平调度的用户; 携带token时以认证用户为准
+
+    search_space: Dict[str, SearchParameter]
+    # {"learning_rate": {"min": 1e-5, "max": 1e-3, "log": true},
+    #  "lora_config.r": {"values": [8, 16]}}
+    strategy: Literal["grid", "random"] = "grid"
+    num_trials: Optional[int] = Field(None, ge=1)
+    max_parallel: int = Field(2, ge=1)
+    pruner: Optional[PrunerConfig] = PrunerConfig()  # null表示不剪枝
+    objective: str = "best_val_loss"
+
+
+class SweepTrial(BaseModel):
+    """Sweep的子实验"""
+
+    experiment_id: UUID
+    name: str
+    status: str
+    hyperparameters: Dict[str, Any]
+    metrics: Optional[Dict[str, Any]] = None
+
+
+class Sweep(BaseSchema):
+    """Sweep完整信息"""
+
+    name: str
+    owner_id: Optional[UUID] = None
+    search_space: Dict[str, Any]
+    strategy: str
+    num_trials: int
+    max_parallel: int
+    pruner: Optional[Dict[str, Any]] = None
+    objective: str
+    status: str
+    best_experiment_id: Optional[UUID] = None
+    best_value: Optional[float] = None
+    completed_at: Optional[datetime] = None
+
+
+class SweepDetail(Sweep):
+    """Sweep详情"""
+
+    template: Dict[str, Any]
+    trials: List[SweepTrial] = []
+    status_counts: Dict[str, int] = {}
+    rungs: Dict[int, Dict[str, float]] = {}  # ASHA各rung的结果 {rung: {experiment_id: value}}
+    steps_completed: int = 0  # 全部子实验已执行的step数 (剪枝节省的计算量可由此比较)
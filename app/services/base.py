@@ -0,0 +1,311 @@
+"""
+Service基类 - 列表查询的公共部分
+
+过滤、搜索、排序和分页都在SQL中完成:
+- 等值过滤 + (created_at, id)倒序, 由各表上 (过滤列, created_at, id) 的复合索引支持
+- 名称/标题的部分匹配使用ILIKE, 由pg_trgm的GIN索引支持
+- JSONB字段的阈值/范围过滤 (where_range + models.base.jsonb_number), 由表达式索引支持
+- 分页: cursor (keyset, 深度无关) 或 page (OFFSET, 兼容旧客户端)
+- 总数: exact (COUNT(*)) / estimated (统计信息) / none
+
+BaseService使用同步Session (Celery任务与调度相关的接口),
+AsyncBaseService使用AsyncSession (API的资源接口), 两者共用语句的构造。
+AsyncBaseService另外声明NDJSON批量写入 (services.bulk) 所需的schema与钩子。
+"""
+
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, Generic, Optional, Sequence, Set, Tuple, Type, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models.base import Base
+from app.schemas.common import PaginatedResponse
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+# 列表游标: 上一页最后一行的 (created_at, id)
+Cursor = Tuple[datetime, UUID]
+
+
+def like_pattern(search: str) -> str:
+    """ILIKE的包含匹配模式, 转义用户输入中的通配符"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def where_range(
+    statement: Select, expression, minimum: Optional[float], maximum: Optional[float]
+) -> Select:
+    """minimum <= expression <= maximum, 为None的一侧不限制"""
+    if minimum is not None:
+        statement = statement.where(expression >= minimum)
+    if maximum is not None:
+        statement = statement.where(expression <= maximum)
+    return statement
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, 参数照常绑定"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """(created_at, id) -> 不透明的游标字符串"""
+    raw = json.dumps([created_at.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """游标字符串 -> (created_at, id), 格式不正确时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(item_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+class _ListStatements(Generic[ModelT]):
+    """列表查询的语句构造 (与Session类型无关)"""
+
+    model: Type[ModelT]
+    # 列表项的响应schema (from_attributes), 为None时items保留ORM对象
+    schema: Optional[Type[BaseModel]] = None
+    # search参数匹配的列
+    search_columns: Sequence[str] = ("name",)
+
+    def query(
+        self, filters: Optional[Dict[str, Any]] = None, search: Optional[str] = None
+    ) -> Select:
+        """等值过滤 (值为None的条件忽略) + 部分匹配搜索"""
+        statement = select(self.model)
+        for column, value in (filters or {}).items():
+            if value is not None:
+                statement = statement.where(getattr(self.model, column) == value)
+        if search:
+            pattern = like_pattern(search)
+            statement = statement.where(
+                or_(
+                    *(
+                        getattr(self.model, column).ilike(pattern, escape="\\")
+                        for column in self.search_columns
+                    )
+                )
+            )
+        return statement
+
+    def _count_statement(self, statement: Select, mode: str):
+        """
+        总行数的查询语句, mode=none时为None
+
+        - exact: COUNT(*), 与匹配的行数成正比
+        - estimated: 无过滤条件时取pg_class.reltuples, 否则取查询计划的估计行数
+        """
+        if mode == "none":
+            return None
+        if mode == "exact":
+            return select(func.count()).select_from(statement.order_by(None).subquery())
+        if statement.whereclause is None:
+            return text(
+                "SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"
+            ).bindparams(table=self.model.__tablename__)
+        return _Explain(statement.order_by(None))
+
+    @staticmethod
+    def _count_result(mode: str, value: Any) -> Optional[int]:
+        if mode == "exact":
+            return value
+        if isinstance(value, str):
+            # asyncpg不解码json类型的EXPLAIN结果
+            value = json.loads(value)
+        if isinstance(value, list):
+            value = value[0]["Plan"]["Plan Rows"]
+        # 从未ANALYZE的表reltuples为-1
+        return max(int(value or 0), 0)
+
+    def _page_statement(
+        self, statement: Select, page: int, page_size: int, cursor: Optional[Cursor]
+    ) -> Select:
+        """
+        按 (created_at, id) 倒序取一页, 多取一行用于判断是否还有下一页
+
+        指定cursor时从游标之后读取 (keyset, 忽略page), 否则按page使用OFFSET。
+        """
+        if cursor:
+            key = tuple_(self.model.created_at, self.model.id)
+            statement = statement.where(key < tuple_(*cursor))
+        statement = statement.order_by(self.model.created_at.desc(), self.model.id.desc())
+        if not cursor:
+            statement = statement.offset((page - 1) * page_size)
+        return statement.limit(page_size + 1)
+
+    def _page_response(
+        self, rows: Sequence[ModelT], page: int, page_size: int, total: Optional[int]
+    ) -> PaginatedResponse:
+        items = list(rows[:page_size])
+        next_cursor = (
+            encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > page_size else None
+        )
+        total_pages = math.ceil(total / page_size) if total is not None else None
+        response = PaginatedResponse[self.schema] if self.schema else PaginatedResponse
+        return response(
+            items=items,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+        )
+
+
+class BaseService(_ListStatements[ModelT]):
+    """单表资源的通用查询 (同步Session)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, item_id: UUID, *options: ORMOption) -> Optional[ModelT]:
+        """根据主键获取, options为关联的加载策略 (selectinload/joinedload)"""
+        return self.db.get(self.model, item_id, options=options)
+
+    def count(self, statement: Select, mode: str = "exact") -> Optional[int]:
+        """查询的总行数"""
+        count_statement = self._count_statement(statement, mode)
+        if count_statement is None:
+            return None
+        return self._count_result(mode, self.db.execute(count_statement).scalar())
+
+    def paginate(
+        self,
+        statement: Select,
+        page: int,
+        page_size: int,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        """分页; count默认: page分页为exact, 游标分页为none"""
+        total = self.count(statement, count or ("none" if cursor else "exact"))
+        page_statement = self._page_statement(statement, page, page_size, cursor)
+        rows = self.db.execute(page_statement).scalars().all()
+        return self._page_response(rows, page, page_size, total)
+
+    def list(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        return self.paginate(self.query(filters, search), page, page_size, cursor, count)
+
+    def delete(self, item_id: UUID) -> bool:
+        """删除, 不存在时返回False"""
+        item = self.get(item_id)
+        if item is None:
+            return False
+        self.db.delete(item)
+        self.db.commit()
+        return True
+
+
+class AsyncBaseService(_ListStatements[ModelT]):
+    """单表资源的通用查询 (AsyncSession)"""
+
+    # NDJSON批量写入 (services.bulk): 每行的校验schema, 为None时不支持该操作
+    create_schema: Optional[Type[BaseModel]] = None
+    update_schema: Optional[Type[BaseModel]] = None
+    # 外键属性 -> (引用的模型, 不存在时的错误信息), 每批一条SELECT检查
+    references: Dict[str, Tuple[Type[Base], str]] = {}
+    # 更新/删除的行不存在时的错误信息
+    not_found_detail: str = "見つかりません"
+    # 传给after_bulk_write的写入行的属性
+    bulk_scope: Sequence[str] = ()
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def create_values(self, data: BaseModel) -> Dict[str, Any]:
+        """创建时的属性值 (单条创建与批量创建共用)"""
+        return data.model_dump()
+
+    def update_values(self, data: BaseModel) -> Dict[str, Any]:
+        """更新时的属性值, 只含给出的字段"""
+        return data.model_dump(exclude_none=True)
+
+    async def after_bulk_write(self, scope: Set[Tuple]) -> None:
+        """
+        批量写入提交前的处理, scope为写入 (创建/更新/删除) 的行的bulk_scope属性值
+
+        批量语句不经过ORM的flush, 依赖flush事件的维护 (如排行榜) 在这里完成。
+        """
+
+    async def get(self, item_id: UUID, *options: ORMOption) -> Optional[ModelT]:
+        """
+        根据主键获取, options为关联的加载策略 (selectinload/joinedload)
+
+        AsyncSession不能延迟加载关联, 详情需要的关联必须在这里指定。
+        """
+        return await self.db.get(self.model, item_id, options=options)
+
+    async def count(self, statement: Select, mode: str = "exact") -> Optional[int]:
+        """查询的总行数"""
+        count_statement = self._count_statement(statement, mode)
+        if count_statement is None:
+            return None
+        return self._count_result(mode, (await self.db.execute(count_statement)).scalar())
+
+    async def paginate(
+        self,
+        statement: Select,
+        page: int,
+        page_size: int,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        """分页; count默认: page分页为exact, 游标分页为none"""
+        total = await self.count(statement, count or ("none" if cursor else "exact"))
+        page_statement = self._page_statement(statement, page, page_size, cursor)
+        rows = (await self.db.execute(page_statement)).scalars().all()
+        return self._page_response(rows, page, page_size, total)
+
+    async def list(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        return await self.paginate(self.query(filters, search), page, page_size, cursor, count)
+
+    async def delete(self, item_id: UUID) -> bool:
+        """删除, 不存在时返回False"""
+        item = await self.get(item_id)
+        if item is None:
+            return False
+        await self.db.delete(item)
+        await self.db.commit()
+        return True
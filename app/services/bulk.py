@@ -0,0 +1,316 @@
+"""
+NDJSON批量写入 - 数据集/模型/评测的 /bulk 接口
+
+请求体每行一个JSON对象, op为 create (省略时) / update / delete, 更新和删除需要id:
+    {"name": "adapter-1", "type": "adapter", "base_model_id": "..."}
+    {"op": "update", "id": "...", "status": "deprecated"}
+    {"op": "delete", "id": "..."}
+
+整个请求在一个事务中写入, 按BULK_BATCH_SIZE行分批:
+- 每行按服务的create_schema/update_schema校验, 外键 (references) 每批一条SELECT检查
+- 创建为多行INSERT ... RETURNING (insertmanyvalues), 更新为按主键的executemany,
+  删除为一条DELETE ... WHERE id IN; 同一批内按 创建 -> 更新 -> 删除 的顺序执行
+- 每种操作在一个SAVEPOINT中执行, 数据库报错 (唯一约束、仍被引用的行等) 时回滚并逐行重试,
+  只有出错的行失败
+每行的结果按行号返回。批量语句不触发ORM的flush事件, 由服务的after_bulk_write补上;
+响应缓存的标签由中间件在请求成功后递增。
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import orjson
+import structlog
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.services.base import AsyncBaseService
+
+logger = structlog.get_logger()
+
+OPS = ("create", "update", "delete")
+
+# 操作 -> 成功时的status
+STATUSES = {"create": "created", "update": "updated", "delete": "deleted"}
+
+
+@dataclass
+class BulkRow:
+    """校验通过的一行"""
+
+    line: int
+    op: str
+    id: Optional[UUID] = None
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+# 写入一组同类操作的行, 返回 (每行的结果, 写入行的bulk_scope属性值)
+WriteRows = Callable[[List[BulkRow]], Awaitable[Tuple[List[Dict[str, Any]], Set[Tuple]]]]
+
+
+async def read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """按行切分请求体, 返回 (行号, 内容), 跳过空行"""
+    buffer = b""
+    line = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line += 1
+            if raw.strip():
+                yield line, raw
+    if buffer.strip():
+        yield line + 1, buffer
+
+
+def validation_message(error: ValidationError) -> str:
+    """校验错误 -> 一行的错误信息"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def database_message(error: DBAPIError) -> str:
+    """数据库错误 -> 一行的错误信息 (驱动异常的第一行)"""
+    message = str(error.orig if error.orig is not None else error).strip()
+    return message.splitlines()[0] if message else type(error).__name__
+
+
+class BulkWriter:
+    """一个批量写入请求"""
+
+    def __init__(self, service: AsyncBaseService):
+        self.service = service
+        self.db = service.db
+        self.model = service.model
+        self.results: List[Dict[str, Any]] = []
+        # 写入的行的bulk_scope属性值
+        self.scope: Set[Tuple] = set()
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """读取NDJSON, 分批写入并提交, 返回BulkWriteResponse"""
+        batch: List[BulkRow] = []
+        rows = 0
+        async for line, raw in read_ndjson(chunks):
+            rows += 1
+            if rows > settings.BULK_MAX_ROWS:
+                raise ValueError(f"Too many rows (max {settings.BULK_MAX_ROWS})")
+            row = self.parse(line, raw)
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= settings.BULK_BATCH_SIZE:
+                await self.write_batch(batch)
+                batch = []
+        if batch:
+            await self.write_batch(batch)
+
+        await self.service.after_bulk_write(self.scope)
+        await self.db.commit()
+
+        self.results.sort(key=lambda result: result["line"])
+        counts = Counter(result["status"] for result in self.results)
+        logger.info(
+            "bulk_write_completed",
+            table=self.model.__tablename__,
+            rows=rows,
+            **{status: counts[status] for status in (*STATUSES.values(), "failed")},
+        )
+        return {
+            "created": counts["created"],
+            "updated": counts["updated"],
+            "deleted": counts["deleted"],
+            "failed": counts["failed"],
+            "results": self.results,
+        }
+
+    def reject(
+        self, line: int, op: Optional[str], error: str, item_id: Optional[UUID] = None
+    ) -> None:
+        """校验未通过的行"""
+        self.results.append(
+            {"line": line, "op": op, "status": "failed", "id": item_id, "error": error}
+        )
+
+    def parse(self, line: int, raw: bytes) -> Optional[BulkRow]:
+        """解析并校验一行, 不合法时记录失败并返回None"""
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            self.reject(line, None, "JSONの形式が正しくありません")
+            return None
+        if not isinstance(data, dict):
+            self.reject(line, None, "各行はJSONオブジェクトである必要があります")
+            return None
+
+        op = data.pop("op", "create")
+        schema = {"create": self.service.create_schema, "update": self.service.update_schema}
+        if op not in OPS or (op != "delete" and schema[op] is None):
+            self.reject(line, None, f"未対応の操作です: {op}")
+            return None
+
+        item_id = None
+        if op != "create":
+            if "id" not in data:
+                self.reject(line, op, "idが指定されていません")
+                return None
+            try:
+                item_id = UUID(str(data.pop("id")))
+            except ValueError:
+                self.reject(line, op, "idの形式が正しくありません")
+                return None
+
+        values: Dict[str, Any] = {}
+        try:
+            if op == "create":
+                values = self.service.create_values(schema[op].model_validate(data))
+            elif op == "update":
+                values = self.service.update_values(schema[op].model_validate(data))
+        except ValidationError as e:
+            self.reject(line, op, validation_message(e), item_id)
+            return None
+        if op == "update" and not values:
+            self.reject(line, op, "更新する項目がありません", item_id)
+            return None
+        return BulkRow(line, op, item_id, values)
+
+    async def write_batch(self, batch: List[BulkRow]) -> None:
+        """一批: 检查外键后按操作分别写入"""
+        batch = await self.check_references(batch)
+        writers: Dict[str, WriteRows] = {
+            "create": self.create,
+            "update": self.update,
+            "delete": self.delete,
+        }
+        for op, write in writers.items():
+            rows = [row for row in batch if row.op == op]
+            if not rows:
+                continue
+            try:
+                async with self.db.begin_nested():
+                    results, scope = await write(rows)
+            except DBAPIError as e:
+                # 回滚到SAVEPOINT后逐行重试, 找出出错的行
+                logger.warning(
+                    "bulk_write_batch_failed",
+                    table=self.model.__tablename__,
+                    op=op,
+                    rows=len(rows),
+                    error=database_message(e),
+                )
+                results, scope = await self.write_rows(write, rows)
+            self.results.extend(results)
+            self.scope |= scope
+
+    async def write_rows(self, write: WriteRows, rows: List[BulkRow]) -> Tuple[list, set]:
+        """每行一个SAVEPOINT"""
+        results, scope = [], set()
+        for row in rows:
+            try:
+                async with self.db.begin_nested():
+                    row_results, row_scope = await write([row])
+            except DBAPIError as e:
+                row_results, row_scope = [self.failed(row, database_message(e))], set()
+            results.extend(row_results)
+            scope |= row_scope
+        return results, scope
+
+    async def check_references(self, batch: List[BulkRow]) -> List[BulkRow]:
+        """外键引用的行不存在的行记为失败, 返回其余的行"""
+        for attribute, (target, message) in self.service.references.items():
+            ids = {row.values[attribute] for row in batch if row.values.get(attribute)}
+            if not ids:
+                continue
+            existing = set(
+                (await self.db.execute(select(target.id).where(target.id.in_(ids)))).scalars()
+            )
+            kept = []
+            for row in batch:
+                if row.values.get(attribute) and row.values[attribute] not in existing:
+                    self.results.append(self.failed(row, message))
+                else:
+                    kept.append(row)
+            batch = kept
+        return batch
+
+    @staticmethod
+    def succeeded(row: BulkRow, item_id: UUID) -> Dict[str, Any]:
+        return {"line": row.line, "op": row.op, "status": STATUSES[row.op], "id": item_id}
+
+    @staticmethod
+    def failed(row: BulkRow, error: str) -> Dict[str, Any]:
+        return {"line": row.line, "op": row.op, "status": "failed", "id": row.id, "error": error}
+
+    async def existing(self, ids: List[UUID]) -> Dict[UUID, Tuple]:
+        """存在的行: id -> bulk_scope属性值"""
+        columns = [getattr(self.model, name) for name in self.service.bulk_scope]
+        rows = await self.db.execute(
+            select(self.model.id, *columns).where(self.model.id.in_(set(ids)))
+        )
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    async def create(self, rows: List[BulkRow]) -> Tuple[list, set]:
+        """多行INSERT, RETURNING的id与行的顺序一致"""
+        statement = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+        ids = (await self.db.execute(statement, [row.values for row in rows])).scalars().all()
+        scope = {tuple(row.values.get(name) for name in self.service.bulk_scope) for row in rows}
+        return [self.succeeded(row, item_id) for row, item_id in zip(rows, ids)], scope
+
+    async def update(self, rows: List[BulkRow]) -> Tuple[list, set]:
+        """按主键的批量UPDATE (相同字段的行合并为一次executemany)"""
+        existing = await self.existing([row.id for row in rows])
+        found = [row for row in rows if row.id in existing]
+        if found:
+            await self.db.execute(
+                update(self.model), [{"id": row.id, **row.values} for row in found]
+            )
+        results = [
+            (
+                self.succeeded(row, row.id)
+                if row.id in existing
+                else self.failed(row, self.service.not_found_detail)
+            )
+            for row in rows
+        ]
+        # 修改前后的值 (如track被修改时两者所属的汇总都受影响)
+        scope = set(existing.values())
+        for row in found:
+            old = existing[row.id]
+            scope.add(
+                tuple(
+                    row.values.get(name, value) for name, value in zip(self.service.bulk_scope, old)
+                )
+            )
+        return results, scope
+
+    async def delete(self, rows: List[BulkRow]) -> Tuple[list, set]:
+        """DELETE ... WHERE id IN"""
+        existing = await self.existing([row.id for row in rows])
+        if existing:
+            await self.db.execute(
+                delete(self.model)
+                .where(self.model.id.in_(list(existing)))
+                .execution_options(synchronize_session=False)
+            )
+        results = [
+            (
+                self.succeeded(row, row.id)
+                if row.id in existing
+                else self.failed(row, self.service.not_found_detail)
+            )
+            for row in rows
+        ]
+        return results, set(existing.values())
+
+
+async def bulk_write(service: AsyncBaseService, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    NDJSON批量写入并提交, 返回每行的结果 (BulkWriteResponse)
+
+    行数超过BULK_MAX_ROWS时抛出ValueError (不提交)。
+    """
+    return await BulkWriter(service).run(chunks)
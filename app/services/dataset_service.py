@@ -0,0 +1,163 @@
+"""
+Dataset Service - 数据集业务逻辑层
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Float, func, select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql import Select
+import structlog
+
+from app.config import settings
+from app.models.dataset import Dataset
+from app.models.evaluation import Evaluation
+from app.models.experiment import Experiment
+from app.schemas.common import PaginatedResponse
+from app.schemas.dataset import Dataset as DatasetSchema, DatasetCreate, DatasetUpdate
+from app.services.base import AsyncBaseService, Cursor
+from app.training import token_cache
+
+logger = structlog.get_logger()
+
+# 没有可参考的预分词缓存时, 假设每条样本的token数
+DEFAULT_TOKENS_PER_EXAMPLE = 200
+
+
+class DatasetService(AsyncBaseService[Dataset]):
+    """数据集服务类"""
+
+    model = Dataset
+    schema = DatasetSchema
+    create_schema = DatasetCreate
+    update_schema = DatasetUpdate
+    references = {"parent_id": (Dataset, "親データセットが見つかりません")}
+    not_found_detail = "データセットが見つかりません"
+
+    def datasets_query(
+        self,
+        status: Optional[str] = None,
+        dataset_type: Optional[str] = None,
+        scene: Optional[str] = None,
+        direction: Optional[str] = None,
+        search: Optional[str] = None,
+        quality_gate_status: Optional[str] = None,
+    ) -> Select:
+        """数据集列表的查询, quality_gate_status匹配Quality Gate结果中的status"""
+        filters = {
+            "status": status,
+            "type": dataset_type,
+            "scene": scene,
+            "language_direction": direction,
+        }
+        query = self.query(filters, search)
+        if quality_gate_status:
+            query = query.where(
+                Dataset.quality_gate_result.contains({"status": quality_gate_status})
+            )
+        return query
+
+    async def get_datasets(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        status: Optional[str] = None,
+        dataset_type: Optional[str] = None,
+        scene: Optional[str] = None,
+        direction: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+        quality_gate_status: Optional[str] = None,
+    ) -> PaginatedResponse:
+        """获取数据集列表(分页)"""
+        query = self.datasets_query(
+            status, dataset_type, scene, direction, search, quality_gate_status
+        )
+        return await self.paginate(query, page, page_size, cursor, count)
+
+    async def get_dataset(self, dataset_id: UUID) -> Optional[Dataset]:
+        """获取数据集"""
+        return await self.get(dataset_id)
+
+    async def get_dataset_detail(self, dataset_id: UUID) -> Optional[Dataset]:
+        """
+        数据集及其父数据集 (JOIN) 和派生版本 (SELECT ... IN)
+
+        使用该数据集的实验可能很多, 不整体加载, 由usage_history取最近的若干个。
+        """
+        return await self.get(
+            dataset_id, joinedload(Dataset.parent), selectinload(Dataset.versions)
+        )
+
+    def create_values(self, data: DatasetCreate) -> Dict[str, Any]:
+        """文件上传前为draft"""
+        return {
+            **data.model_dump(),
+            "status": "draft",
+            "file_path": os.path.join(settings.DATASET_DIR, f"{uuid4()}.jsonl"),
+        }
+
+    async def create_dataset(self, dataset_data: DatasetCreate) -> Dataset:
+        """创建数据集 (文件上传前为draft)"""
+        dataset = Dataset(**self.create_values(dataset_data))
+        self.db.add(dataset)
+        await self.db.commit()
+        await self.db.refresh(dataset)
+
+        logger.info("dataset_created", dataset_id=str(dataset.id), name=dataset.name)
+        return dataset
+
+    async def usage_history(self, dataset_id: UUID, limit: int = 10) -> List[Dict[str, Any]]:
+        """使用该数据集的最近实验, performance为实验各track的平均BLEU"""
+        avg_bleu = (
+            select(
+                Evaluation.experiment_id,
+                func.avg(Evaluation.metrics["bleu"].astext.cast(Float)).label("bleu"),
+            )
+            .group_by(Evaluation.experiment_id)
+            .subquery()
+        )
+        rows = await self.db.execute(
+            select(Experiment.id, Experiment.name, Experiment.created_at, avg_bleu.c.bleu)
+            .outerjoin(avg_bleu, avg_bleu.c.experiment_id == Experiment.id)
+            .where(Experiment.dataset_id == dataset_id)
+            .order_by(Experiment.created_at.desc())
+            .limit(limit)
+        )
+        return [
+            {
+                "experiment_id": str(row.id),
+                "experiment_name": row.name,
+                "used_at": row.created_at.isoformat(),
+                "performance": round(row.bleu, 4) if row.bleu is not None else None,
+            }
+            for row in rows
+        ]
+
+    async def tokens_per_example(self, seed_source: Dict[str, Any]) -> float:
+        """
+        每条样本的平均token数
+
+        seed_source指定了种子数据集 (dataset_id) 且该数据集已有预分词缓存时使用实测值,
+        否则使用默认估计。
+        """
+        dataset_id = seed_source.get("dataset_id")
+        if not dataset_id:
+            return DEFAULT_TOKENS_PER_EXAMPLE
+        try:
+            dataset = await self.get_dataset(UUID(str(dataset_id)))
+        except ValueError:
+            return DEFAULT_TOKENS_PER_EXAMPLE
+        if not dataset or not dataset.file_path or not os.path.exists(dataset.file_path):
+            return DEFAULT_TOKENS_PER_EXAMPLE
+
+        stats = await run_in_threadpool(
+            token_cache.find_stats, dataset.file_path, seed_source.get("tokenizer")
+        )
+        if not stats or not stats["num_examples"]:
+            return DEFAULT_TOKENS_PER_EXAMPLE
+        return stats["num_tokens"] / stats["num_examples"]
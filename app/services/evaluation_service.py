@@ -0,0 +1,160 @@
+"""
+Evaluation Service - 评测业务逻辑层
+"""
+
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+import structlog
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+
+from app.models.base import jsonb_number
+from app.models.dataset import Dataset
+from app.models.evaluation import FILTERABLE_METRICS, Evaluation
+from app.models.experiment import Experiment
+from app.models.leaderboard import refresh_leaderboard
+from app.models.model import Model
+from app.schemas.common import PaginatedResponse
+from app.schemas.evaluation import (
+    Evaluation as EvaluationSchema,
+    EvaluationCreate,
+    EvaluationUpdate,
+)
+from app.services.base import AsyncBaseService, Cursor, where_range
+
+logger = structlog.get_logger()
+
+
+class EvaluationService(AsyncBaseService[Evaluation]):
+    """评测服务类"""
+
+    model = Evaluation
+    schema = EvaluationSchema
+    search_columns = ()
+    create_schema = EvaluationCreate
+    update_schema = EvaluationUpdate
+    references = {"experiment_id": (Experiment, "実験が見つかりません")}
+    not_found_detail = "評価結果が見つかりません"
+    bulk_scope = ("experiment_id", "track")
+
+    def evaluations_query(
+        self,
+        track: Optional[str] = None,
+        experiment_id: Optional[UUID] = None,
+        metric: str = "bleu",
+        metric_min: Optional[float] = None,
+        metric_max: Optional[float] = None,
+    ) -> Select:
+        """评测列表的查询, metric_min/metric_max按metrics中的指标值过滤 (闭区间)"""
+        if metric not in FILTERABLE_METRICS:
+            raise ValueError(f"Unsupported metric filter: {metric}")
+        query = self.query({"track": track, "experiment_id": experiment_id})
+        return where_range(query, jsonb_number(Evaluation.metrics, metric), metric_min, metric_max)
+
+    async def get_evaluations(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        track: Optional[str] = None,
+        experiment_id: Optional[UUID] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+        metric: str = "bleu",
+        metric_min: Optional[float] = None,
+        metric_max: Optional[float] = None,
+    ) -> PaginatedResponse:
+        """获取评测列表(分页)"""
+        query = self.evaluations_query(track, experiment_id, metric, metric_min, metric_max)
+        return await self.paginate(query, page, page_size, cursor, count)
+
+    async def get_detail(self, evaluation_id: UUID) -> Optional[Dict[str, Any]]:
+        """评测及其实验、数据集、模型名 (有适配器时为适配器名), 不存在时返回None"""
+        base_model = aliased(Model)
+        adapter = aliased(Model)
+        result = await self.db.execute(
+            select(Evaluation, Experiment.name, Dataset.name, base_model.name, adapter.name)
+            .join(Experiment, Evaluation.experiment_id == Experiment.id)
+            .join(Dataset, Experiment.dataset_id == Dataset.id)
+            .join(base_model, Experiment.base_model_id == base_model.id)
+            .outerjoin(adapter, Experiment.adapter_id == adapter.id)
+            .where(Evaluation.id == evaluation_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        evaluation, experiment_name, dataset_name, base_model_name, adapter_name = row
+        return {
+            "evaluation": evaluation,
+            "experiment_name": experiment_name,
+            "dataset_name": dataset_name,
+            "model_name": adapter_name or base_model_name,
+            "sample_results": (evaluation.error_analysis or {}).get("samples", []),
+        }
+
+    def create_values(self, data: EvaluationCreate) -> Dict[str, Any]:
+        return {
+            "experiment_id": data.experiment_id,
+            "track": data.track,
+            "metrics": data.metrics.model_dump(exclude_none=True),
+            "error_analysis": data.error_analysis.model_dump() if data.error_analysis else {},
+        }
+
+    async def after_bulk_write(self, scope: Set[Tuple]) -> None:
+        """批量写入不经过flush, 在同一事务中更新写入的 (实验, track) 的排行榜"""
+        if scope:
+            await self.db.run_sync(lambda session: refresh_leaderboard(session.connection(), scope))
+
+    async def create_evaluation(self, evaluation_data: EvaluationCreate) -> Evaluation:
+        """创建评测"""
+        evaluation = Evaluation(**self.create_values(evaluation_data))
+        self.db.add(evaluation)
+        await self.db.commit()
+        await self.db.refresh(evaluation)
+
+        logger.info("evaluation_created", evaluation_id=str(evaluation.id), track=evaluation.track)
+        return evaluation
+
+    async def experiment_summary(self, experiment_id: UUID) -> Dict[str, Any]:
+        """实验各track的最新评测及spoken/written的BLEU对比"""
+        latest = (
+            select(
+                Evaluation.track,
+                func.max(Evaluation.created_at).label("created_at"),
+            )
+            .where(Evaluation.experiment_id == experiment_id)
+            .group_by(Evaluation.track)
+            .subquery()
+        )
+        rows = await self.db.scalars(
+            select(Evaluation)
+            .join(
+                latest,
+                (Evaluation.track == latest.c.track)
+                & (Evaluation.created_at == latest.c.created_at),
+            )
+            .where(Evaluation.experiment_id == experiment_id)
+        )
+        by_track = {
+            e.track: {"track": e.track, "metrics": e.metrics, "evaluated_at": e.created_at}
+            for e in rows
+        }
+        spoken, written = by_track.get("spoken"), by_track.get("written")
+
+        comparison = None
+        spoken_bleu = spoken["metrics"].get("bleu") if spoken else None
+        written_bleu = written["metrics"].get("bleu") if written else None
+        if spoken_bleu is not None and written_bleu is not None:
+            comparison = {
+                "better_track": "spoken" if spoken_bleu > written_bleu else "written",
+                "bleu_diff": round(spoken_bleu - written_bleu, 4),
+            }
+
+        return {
+            "experiment_id": str(experiment_id),
+            "spoken": spoken,
+            "written": written,
+            "comparison": comparison,
+        }
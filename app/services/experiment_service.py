@@ -0,0 +1,152 @@
+"""
+Experiment Service - 实验业务逻辑层
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import redis
+import structlog
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql import Select
+
+from app.core.log_store import ExperimentLogReader
+from app.core.progress import progress_snapshot_key
+from app.core.redis import get_async_redis
+from app.models.base import jsonb_number
+from app.models.experiment import Experiment
+from app.schemas.common import PaginatedResponse
+from app.schemas.experiment import Experiment as ExperimentSchema
+from app.services.base import AsyncBaseService, Cursor, where_range
+
+logger = structlog.get_logger()
+
+# 详情中附带的最近日志行数
+RECENT_LOG_LINES = 10
+
+
+class ExperimentService(AsyncBaseService[Experiment]):
+    """实验服务类"""
+
+    model = Experiment
+    schema = ExperimentSchema
+
+    def experiments_query(
+        self,
+        status: Optional[str] = None,
+        model_id: Optional[UUID] = None,
+        search: Optional[str] = None,
+        learning_rate_min: Optional[float] = None,
+        learning_rate_max: Optional[float] = None,
+    ) -> Select:
+        """实验列表的查询, model_id匹配基座模型或适配器, 学习率为training_recipe中的值"""
+        query = self.query({"status": status}, search)
+        if model_id:
+            query = query.where(
+                or_(Experiment.base_model_id == model_id, Experiment.adapter_id == model_id)
+            )
+        learning_rate = jsonb_number(Experiment.config, "training_recipe", "learning_rate")
+        return where_range(query, learning_rate, learning_rate_min, learning_rate_max)
+
+    async def get_experiments(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        status: Optional[str] = None,
+        model_id: Optional[UUID] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+        learning_rate_min: Optional[float] = None,
+        learning_rate_max: Optional[float] = None,
+    ) -> PaginatedResponse:
+        """获取实验列表(分页)"""
+        query = self.experiments_query(
+            status, model_id, search, learning_rate_min, learning_rate_max
+        )
+        return await self.paginate(query, page, page_size, cursor, count)
+
+    async def create_experiment(
+        self,
+        name: str,
+        task: str,
+        direction: str,
+        dataset_id: UUID,
+        base_model_id: UUID,
+        config: Dict[str, Any],
+        adapter_id: Optional[UUID] = None,
+        priority: int = 0,
+        resources: Optional[Dict[str, Any]] = None,
+        owner_id: Optional[UUID] = None,
+    ) -> Experiment:
+        """创建实验 (pending, 由start提交给调度器)"""
+        experiment = Experiment(
+            name=name,
+            task=task,
+            direction=direction,
+            dataset_id=dataset_id,
+            base_model_id=base_model_id,
+            adapter_id=adapter_id,
+            prompt_contract_id=config.get("prompt_contract_id"),
+            config=config,
+            status="pending",
+            owner_id=owner_id,
+            priority=priority,
+            resources=resources,
+        )
+        self.db.add(experiment)
+        await self.db.commit()
+        await self.db.refresh(experiment)
+
+        logger.info("experiment_created", experiment_id=str(experiment.id), name=name)
+        return experiment
+
+    async def get_detail(self, experiment_id: UUID) -> Optional[Experiment]:
+        """
+        实验及详情中的关联
+
+        数据集/基座模型/适配器为多对一, 与实验在同一条查询中JOIN;
+        评测为一对多, 另用一条SELECT ... IN加载 (避免JOIN使实验行重复)。
+        """
+        return await self.get(
+            experiment_id,
+            joinedload(Experiment.dataset),
+            joinedload(Experiment.base_model),
+            joinedload(Experiment.adapter),
+            selectinload(Experiment.evaluations),
+        )
+
+    async def get_progress(self, experiment_id: UUID) -> Optional[Dict[str, Any]]:
+        """Redis中的最新进度快照, 不是训练进度事件或已过期时返回None"""
+        try:
+            # 进程共享的客户端, 不能关闭 (会断开广播的订阅连接)
+            raw = await get_async_redis().get(progress_snapshot_key(str(experiment_id)))
+        except redis.RedisError as e:
+            logger.warning(
+                "progress_snapshot_failed", experiment_id=str(experiment_id), error=str(e)
+            )
+            return None
+        if not raw:
+            return None
+
+        snapshot = json.loads(raw)
+        if snapshot.get("step") is None:
+            return None
+        return {
+            "current_epoch": snapshot["epoch"],
+            "total_epochs": snapshot["total_epochs"],
+            "current_step": snapshot["step"],
+            "total_steps": snapshot["total_steps"],
+            "loss": snapshot["loss"],
+            "last_update": datetime.utcfromtimestamp(snapshot["ts"]).isoformat(),
+        }
+
+    async def recent_logs(self, experiment_id: UUID, limit: int = RECENT_LOG_LINES) -> List[Dict]:
+        """最后limit行日志 (文件读取在线程池中执行)"""
+        reader = ExperimentLogReader(str(experiment_id))
+        total = await run_in_threadpool(reader.total)
+        return await run_in_threadpool(reader.read, max(total - limit, 0), limit)
@@ -0,0 +1,66 @@
+"""
+Leaderboard Service - 排行榜业务逻辑层
+
+读取汇总表leaderboard_entries (由app.models.leaderboard在评测写入时维护)。
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from app.models.dataset import Dataset
+from app.models.leaderboard import LeaderboardEntry
+from app.models.model import Model
+from app.services.base import AsyncBaseService
+
+# 排序键 -> 汇总表的列
+SORT_COLUMNS = {
+    "bleu": LeaderboardEntry.best_bleu,
+    "rouge_l": LeaderboardEntry.best_rouge_l,
+    "ribes": LeaderboardEntry.best_ribes,
+    "mqm": LeaderboardEntry.best_mqm,
+}
+
+
+class LeaderboardService(AsyncBaseService[LeaderboardEntry]):
+    """排行榜服务类"""
+
+    model = LeaderboardEntry
+
+    async def get_leaderboard(
+        self,
+        track: Optional[str] = None,
+        dataset_id: Optional[UUID] = None,
+        model_id: Optional[UUID] = None,
+        sort_by: str = "bleu",
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """按指标的最好值降序 (没有该指标的排在最后), 附带模型名与数据集名"""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort key: {sort_by}")
+        filters = {"track": track, "dataset_id": dataset_id, "model_id": model_id}
+        statement = (
+            self.query(filters)
+            .add_columns(Model.name, Dataset.name)
+            .join(Model, LeaderboardEntry.model_id == Model.id)
+            .join(Dataset, LeaderboardEntry.dataset_id == Dataset.id)
+            .order_by(SORT_COLUMNS[sort_by].desc().nulls_last(), LeaderboardEntry.id)
+            .limit(limit)
+        )
+        rows = await self.db.execute(statement)
+        return [
+            {
+                "model_id": entry.model_id,
+                "model_name": model_name,
+                "dataset_id": entry.dataset_id,
+                "dataset_name": dataset_name,
+                "track": entry.track,
+                "best_bleu": entry.best_bleu,
+                "best_rouge_l": entry.best_rouge_l,
+                "best_ribes": entry.best_ribes,
+                "best_mqm": entry.best_mqm,
+                "best_experiment_id": entry.best_experiment_id,
+                "evaluation_count": entry.evaluation_count,
+                "updated_at": entry.updated_at,
+            }
+            for entry, model_name, dataset_name in rows
+        ]
@@ -0,0 +1,197 @@
+"""
+Metrics Service - 训练指标时序存储
+"""
+
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+import numpy as np
+import structlog
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.metric import ExperimentMetricChunk
+from app.utils.downsample import DOWNSAMPLERS
+
+logger = structlog.get_logger()
+
+# 训练循环记录的标准指标
+DEFAULT_SERIES = ("loss", "val_loss", "learning_rate", "tokens_per_sec", "memory_mb")
+
+
+class MetricsWriter:
+    """
+    step级指标写入器
+
+    每个序列在内存中缓冲chunk_size个点后写入一个数据块,
+    避免每个step写一行数据库记录。
+    """
+
+    def __init__(self, db: Session, experiment_id: str, chunk_size: Optional[int] = None):
+        self.db = db
+        self.experiment_id = UUID(str(experiment_id))
+        self.chunk_size = chunk_size or settings.METRICS_CHUNK_SIZE
+        self._steps: Dict[str, List[int]] = {}
+        self._values: Dict[str, List[float]] = {}
+
+    def append(self, step: int, metrics: Dict[str, Optional[float]]) -> None:
+        """追加一个step的指标, None值会被忽略"""
+        for name, value in metrics.items():
+            if value is None:
+                continue
+            steps = self._steps.setdefault(name, [])
+            steps.append(step)
+            self._values.setdefault(name, []).append(float(value))
+            if len(steps) >= self.chunk_size:
+                self._write_chunk(name)
+
+    def flush(self) -> None:
+        """写入所有缓冲中的数据并提交"""
+        for name in list(self._steps):
+            if self._steps[name]:
+                self._write_chunk(name)
+        self.db.commit()
+
+    def truncate_after(self, step: int) -> None:
+        """
+        删除step之后的数据 (从checkpoint恢复时使用)
+
+        跨越step的数据块会被截断重写。
+        """
+        chunks = (
+            self.db.query(ExperimentMetricChunk)
+            .filter(
+                ExperimentMetricChunk.experiment_id == self.experiment_id,
+                ExperimentMetricChunk.end_step > step,
+            )
+            .all()
+        )
+        for chunk in chunks:
+            steps, values = _decode(chunk)
+            keep = steps <= step
+            self.db.delete(chunk)
+            if keep.any():
+                self.db.add(_encode(self.experiment_id, chunk.series, steps[keep], values[keep]))
+        self._steps.clear()
+        self._values.clear()
+        self.db.commit()
+
+    def _write_chunk(self, name: str) -> None:
+        steps = np.asarray(self._steps.pop(name), dtype=np.int64)
+        values = np.asarray(self._values.pop(name), dtype=np.float32)
+        self.db.add(_encode(self.experiment_id, name, steps, values))
+        self.db.flush()
+
+
+def _encode(
+    experiment_id: UUID, series: str, steps: np.ndarray, values: np.ndarray
+) -> ExperimentMetricChunk:
+    """编码数据块"""
+    start_step = int(steps[0])
+    finite = values[np.isfinite(values)]
+    return ExperimentMetricChunk(
+        experiment_id=experiment_id,
+        series=series,
+        start_step=start_step,
+        end_step=int(steps[-1]),
+        count=len(steps),
+        min_value=float(finite.min()) if len(finite) else None,
+        max_value=float(finite.max()) if len(finite) else None,
+        steps=(steps - start_step).astype(np.uint32).tobytes(),
+        values=values.astype(np.float32).tobytes(),
+    )
+
+
+def _decode(chunk: ExperimentMetricChunk):
+    """解码数据块为 (steps, values)"""
+    steps = np.frombuffer(chunk.steps, dtype=np.uint32).astype(np.int64) + chunk.start_step
+    values = np.frombuffer(chunk.values, dtype=np.float32)
+    return steps, values
+
+
+class MetricsService:
+    """指标查询服务"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_series(
+        self,
+        experiment_id: UUID,
+        series: str,
+        start_step: Optional[int] = None,
+        end_step: Optional[int] = None,
+    ):
+        """读取原始序列, 返回按step排序且去重后的 (steps, values)"""
+        query = self.db.query(ExperimentMetricChunk).filter(
+            ExperimentMetricChunk.experiment_id == experiment_id,
+            ExperimentMetricChunk.series == series,
+        )
+        if start_step is not None:
+            query = query.filter(ExperimentMetricChunk.end_step >= start_step)
+        if end_step is not None:
+            query = query.filter(ExperimentMetricChunk.start_step <= end_step)
+
+        chunks = query.order_by(ExperimentMetricChunk.start_step).all()
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        decoded = [_decode(c) for c in chunks]
+        steps = np.concatenate([d[0] for d in decoded])
+        values = np.concatenate([d[1] for d in decoded])
+
+        # 重试可能产生重复step, 保留最后写入的值
+        order = np.argsort(steps, kind="stable")
+        steps, values = steps[order], values[order]
+        last = np.append(steps[1:] != steps[:-1], True)
+        steps, values = steps[last], values[last]
+
+        mask = np.ones(len(steps), dtype=bool)
+        if start_step is not None:
+            mask &= steps >= start_step
+        if end_step is not None:
+            mask &= steps <= end_step
+        return steps[mask], values[mask]
+
+    def get_series(
+        self,
+        experiment_id: UUID,
+        names: Iterable[str] = DEFAULT_SERIES,
+        width: int = 1000,
+        method: str = "lttb",
+        start_step: Optional[int] = None,
+        end_step: Optional[int] = None,
+    ) -> List[Dict]:
+        """获取降采样后的序列, 点数不超过图表宽度"""
+        downsample = DOWNSAMPLERS[method]
+        result = []
+        for name in names:
+            steps, values = self.load_series(experiment_id, name, start_step, end_step)
+            total = len(steps)
+            if total:
+                steps, values = downsample(steps, values.astype(np.float64), width)
+            result.append(
+                {
+                    "name": name,
+                    "steps": steps.tolist(),
+                    "values": [float(v) for v in values],
+                    "total_points": total,
+                }
+            )
+        return result
+
+    def get_latest(self, experiment_id: UUID, series: str) -> Optional[Dict]:
+        """获取序列最后一个点"""
+        chunk = (
+            self.db.query(ExperimentMetricChunk)
+            .filter(
+                ExperimentMetricChunk.experiment_id == experiment_id,
+                ExperimentMetricChunk.series == series,
+            )
+            .order_by(ExperimentMetricChunk.end_step.desc())
+            .first()
+        )
+        if not chunk:
+            return None
+        steps, values = _decode(chunk)
+        return {"step": int(steps[-1]), "value": float(values[-1])}
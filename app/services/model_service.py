@@ -3,82 +3,88 @@ Model Service - 模型业务逻辑层
 """
 
 from typing import Optional, List, Dict, Any
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Float, func, or_, select
+from sqlalchemy.orm import selectinload
 from uuid import UUID
 
+from app.models.dataset import Dataset
+from app.models.evaluation import Evaluation
+from app.models.experiment import Experiment
 from app.models.model import Model
-from app.schemas.model import ModelCreate, BaselineProbe
+from app.schemas.model import Model as ModelSchema, ModelCreate, ModelUpdate
 from app.schemas.common import PaginatedResponse
+from app.services.base import AsyncBaseService, Cursor
 import structlog
 
 logger = structlog.get_logger()
 
 
-class ModelService:
+class ModelService(AsyncBaseService[Model]):
     """模型服务类"""
 
-    def __init__(self, db: Session):
-        self.db = db
+    model = Model
+    schema = ModelSchema
+    create_schema = ModelCreate
+    update_schema = ModelUpdate
+    references = {"base_model_id": (Model, "ベースモデルが見つかりません")}
+    not_found_detail = "モデルが見つかりません"
 
-    def get_models(
+    async def get_models(
         self,
         page: int = 1,
         page_size: int = 20,
         status: Optional[str] = None,
         model_type: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
     ) -> PaginatedResponse:
         """获取模型列表(分页)"""
+        filters = {"status": status, "type": model_type}
+        return await self.list(page, page_size, filters, search, cursor, count)
 
-        query = self.db.query(Model)
-
-        # 过滤条件
-        if status:
-            query = query.filter(Model.status == status)
-        if model_type:
-            query = query.filter(Model.type == model_type)
-
-        # 总数
-        total = query.count()
-
-        # 分页
-        offset = (page - 1) * page_size
-        models = query.offset(offset).limit(page_size).all()
-
-        total_pages = (total + page_size - 1) // page_size
+    async def get_model_by_id(self, model_id: UUID) -> Optional[Model]:
+        """根据ID获取模型"""
+        return await self.get(model_id)
 
-        return PaginatedResponse(
-            items=models, total=total, page=page, page_size=page_size, total_pages=total_pages
+    async def get_model_detail(self, model_id: UUID) -> Optional[Model]:
+        """模型及其Prompt契约 (新版本在前) 和适配器, 各用一条SELECT ... IN加载"""
+        return await self.get(
+            model_id, selectinload(Model.prompt_contracts), selectinload(Model.adapters)
         )
 
-    def get_model_by_id(self, model_id: UUID) -> Optional[Model]:
-        """根据ID获取模型"""
-        return self.db.query(Model).filter(Model.id == model_id).first()
-
-    def create_model(self, model_data: ModelCreate) -> Model:
+    def create_values(self, data: ModelCreate) -> Dict[str, Any]:
+        return {
+            "name": data.name,
+            "type": data.type,
+            "base_model_id": data.base_model_id,
+            "status": data.status,
+            "config": data.config,
+            "metadata_": data.metadata.dict() if data.metadata else {},
+        }
+
+    def update_values(self, data: ModelUpdate) -> Dict[str, Any]:
+        values = data.model_dump(exclude_none=True)
+        if "metadata" in values:
+            values["metadata_"] = values.pop("metadata")
+        return values
+
+    async def create_model(self, model_data: ModelCreate) -> Model:
         """创建新模型"""
 
-        db_model = Model(
-            name=model_data.name,
-            type=model_data.type,
-            base_model_id=model_data.base_model_id,
-            status=model_data.status,
-            config=model_data.config,
-            metadata_=model_data.metadata.dict() if model_data.metadata else {},
-        )
+        db_model = Model(**self.create_values(model_data))
 
         self.db.add(db_model)
-        self.db.commit()
-        self.db.refresh(db_model)
+        await self.db.commit()
+        await self.db.refresh(db_model)
 
         logger.info("model_created", model_id=str(db_model.id), name=db_model.name)
 
         return db_model
 
-    def run_baseline_probe(
+    async def run_baseline_probe(
         self, model_id: UUID, test_cases: Optional[List[Dict[str, Any]]] = None
-    ) -> BaselineProbe:
+    ) -> str:
         """
         运行基线行为探测
 
@@ -87,69 +93,103 @@ class ModelService:
         1. 是否支持多候选输出
         2. 是否提供解释性输出
         3. 是否遵循输出契约
+
+        探测在Celery任务中并发执行, 这里只提交任务并返回任务ID
         """
+        from app.tasks.probe import run_baseline_probe
 
-        model = self.get_model_by_id(model_id)
+        model = await self.get_model_by_id(model_id)
         if not model:
             raise ValueError("モデルが見つかりません")
 
-        # TODO: 实际的探测逻辑
-        # 1. 加载模型
-        # 2. 运行测试用例
-        # 3. 分析输出
-
-        # 示例实现(需要实际的模型推理逻辑)
-        probe_result = BaselineProbe(
-            is_multi_candidate=True,  # 示例值
-            has_explanation=False,
-            follows_output_contract=True,
-            probed_at=datetime.utcnow(),
-            details={
-                "test_count": len(test_cases) if test_cases else 0,
-                "notes": "Baseline probe completed",
-            },
-        )
+        task = run_baseline_probe.delay(str(model_id), test_cases)
 
-        # 保存探测结果到数据库
-        model.baseline_probe = probe_result.dict()
-        self.db.commit()
+        logger.info("baseline_probe_submitted", model_id=str(model_id), task_id=task.id)
 
-        logger.info(
-            "baseline_probe_completed",
-            model_id=str(model_id),
-            result=probe_result.dict(),
-        )
+        return task.id
 
-        return probe_result
+    def _evaluations_query(self, model_id: UUID, *columns):
+        """以该模型为基座或适配器的实验的评测"""
+        return (
+            select(*columns)
+            .select_from(Evaluation)
+            .join(Experiment, Evaluation.experiment_id == Experiment.id)
+            .join(Dataset, Experiment.dataset_id == Dataset.id)
+            .where(or_(Experiment.base_model_id == model_id, Experiment.adapter_id == model_id))
+        )
 
-    def get_model_evaluations(self, model_id: UUID) -> List[Dict]:
-        """获取模型的评测历史"""
-        # TODO: 从Evaluation表查询
-        return []
+    async def get_model_evaluations(self, model_id: UUID, limit: int = 50) -> List[Dict]:
+        """获取模型的评测历史 (新的在前)"""
+        rows = await self.db.execute(
+            self._evaluations_query(model_id, Evaluation, Experiment.name, Dataset.name)
+            .order_by(Evaluation.created_at.desc())
+            .limit(limit)
+        )
+        return [
+            {
+                "id": str(evaluation.id),
+                "experiment_id": str(evaluation.experiment_id),
+                "experiment_name": experiment_name,
+                "dataset_name": dataset_name,
+                "track": evaluation.track,
+                "bleu": evaluation.metrics.get("bleu"),
+                "rouge_l": evaluation.metrics.get("rouge_l"),
+                "ribes": evaluation.metrics.get("ribes"),
+                "evaluated_at": evaluation.created_at.isoformat(),
+            }
+            for evaluation, experiment_name, dataset_name in rows
+        ]
+
+    async def get_evaluation_summary(self, model_id: UUID) -> Optional[Dict[str, Any]]:
+        """评测汇总 (次数、平均BLEU/ROUGE-L、BLEU最高的实验), 没有评测时返回None"""
+        bleu = Evaluation.metrics["bleu"].astext.cast(Float)
+        rouge_l = Evaluation.metrics["rouge_l"].astext.cast(Float)
+        totals = (
+            await self.db.execute(
+                self._evaluations_query(
+                    model_id, func.count(Evaluation.id), func.avg(bleu), func.avg(rouge_l)
+                )
+            )
+        ).one()
+        if not totals[0]:
+            return None
 
-    def update_model_status(self, model_id: UUID, status: str) -> Optional[Model]:
+        best = (
+            await self.db.execute(
+                self._evaluations_query(model_id, Experiment.id, Experiment.name, bleu)
+                .where(bleu.isnot(None))
+                .order_by(bleu.desc())
+                .limit(1)
+            )
+        ).first()
+        return {
+            "total_evaluations": totals[0],
+            "avg_bleu": round(totals[1], 4) if totals[1] is not None else None,
+            "avg_rouge_l": round(totals[2], 4) if totals[2] is not None else None,
+            "best_experiment": (
+                {"id": str(best[0]), "name": best[1], "score": best[2]} if best else None
+            ),
+        }
+
+    async def update_model_status(self, model_id: UUID, status: str) -> Optional[Model]:
         """更新模型状态"""
-        model = self.get_model_by_id(model_id)
+        model = await self.get_model_by_id(model_id)
         if not model:
             return None
 
         model.status = status
-        self.db.commit()
-        self.db.refresh(model)
+        await self.db.commit()
+        await self.db.refresh(model)
 
         logger.info("model_status_updated", model_id=str(model_id), status=status)
 
         return model
 
-    def delete_model(self, model_id: UUID) -> bool:
+    async def delete_model(self, model_id: UUID) -> bool:
         """删除模型"""
-        model = self.get_model_by_id(model_id)
-        if not model:
+        if not await self.delete(model_id):
             return False
 
-        self.db.delete(model)
-        self.db.commit()
-
         logger.info("model_deleted", model_id=str(model_id))
 
         return True
@@ -0,0 +1,385 @@
+"""
+Pipeline Service - 训练流水线的阶段记录
+
+流水线: 质量门禁 -> 训练 -> 评测 (spoken/written并行) -> 生成报告
+每个阶段的输入计算为幂等键, 与上次成功执行的键相同时跳过该阶段。
+键只取决于阶段的输入 (规范化的实验配置, 数据集内容哈希, 模型ID), 与实验本身无关:
+门禁、训练的结果保存在stage_cache表中, 输入相同的其他实验直接复用
+(评测阶段目前不计算指标, 不写入缓存)。
+各阶段的状态与耗时记录在 experiments.pipeline 中:
+{
+  "stages": {
+    "gate": {"key": "...", "status": "completed", "started_at": "...",
+             "completed_at": "...", "duration_seconds": 1.2, "result": {...}},
+    ...
+  }
+}
+"""
+
+import copy
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import structlog
+
+from app.config import settings
+from app.models.dataset import Dataset
+from app.models.experiment import Experiment
+from app.models.model import Model, PromptContract
+from app.models.stage_cache import StageCacheEntry
+from app.training import token_cache
+
+logger = structlog.get_logger()
+
+EVALUATION_TRACKS = ("spoken", "written")
+# 不影响训练结果的配方字段, 不参与幂等键
+_NON_SEMANTIC_RECIPE_FIELDS = ("auto_save_checkpoints", "checkpoint_interval")
+
+
+def stage_key(stage: str, inputs: Dict[str, Any]) -> str:
+    """阶段输入的幂等键 (规范化JSON的哈希)"""
+    payload = json.dumps(
+        {"stage": stage, **inputs}, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def canonical_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """去掉不影响结果的字段后的实验配置"""
+    config = copy.deepcopy(config or {})
+    recipe = config.get("training_recipe") or {}
+    for field in _NON_SEMANTIC_RECIPE_FIELDS:
+        recipe.pop(field, None)
+    return config
+
+
+def dataset_inputs(dataset: Dataset) -> Dict[str, Any]:
+    """数据集内容 (不含ID: 内容相同的数据集版本共享缓存)"""
+    if not dataset.file_path:
+        return {"dataset_id": str(dataset.id)}
+    return {"content": token_cache.dataset_content_hash(dataset.file_path)}
+
+
+def gate_key(dataset: Dataset) -> str:
+    return stage_key(
+        "gate",
+        {
+            **dataset_inputs(dataset),
+            "thresholds": [
+                settings.QUALITY_GATE_ALIGNMENT_RATE,
+                settings.QUALITY_GATE_DUPLICATE_RATE,
+                settings.QUALITY_GATE_LANGUAGE_CONSISTENCY,
+            ],
+        },
+    )
+
+
+def train_key(experiment: Experiment, dataset: Dataset) -> str:
+    return stage_key(
+        "train",
+        {
+            **dataset_inputs(dataset),
+            "config": canonical_config(experiment.config),
+            "base_model_id": experiment.base_model_id,
+            "adapter_id": experiment.adapter_id,
+            "prompt_contract_id": experiment.prompt_contract_id,
+        },
+    )
+
+
+def evaluation_key(trained: str, track: str) -> str:
+    """评测只取决于训练的输入 (即训练结果) 与track"""
+    return stage_key(f"evaluate_{track}", {"train": trained})
+
+
+def checkpoint_available(result: Dict[str, Any]) -> bool:
+    """训练缓存的checkpoint仍然存在"""
+    path = (result or {}).get("best_checkpoint_path")
+    return bool(path) and os.path.exists(path)
+
+
+class StageCache:
+    """跨实验的阶段结果缓存 (stage_cache表)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def lookup(self, key: str) -> Optional[StageCacheEntry]:
+        return self.db.query(StageCacheEntry).filter(StageCacheEntry.key == key).first()
+
+    def hit(self, entry: StageCacheEntry) -> None:
+        entry.hits += 1
+        entry.last_hit_at = datetime.utcnow()
+        self.db.commit()
+
+    def store(self, stage: str, key: str, result: Dict[str, Any], experiment_id: UUID) -> None:
+        entry = self.lookup(key)
+        if entry is None:
+            entry = StageCacheEntry(key=key, stage=stage)
+            self.db.add(entry)
+        entry.result = result
+        entry.source_experiment_id = experiment_id
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # 同一输入的另一个实验同时写入, 保留先写入的结果即可
+            self.db.rollback()
+
+    def invalidate(self, entry: StageCacheEntry) -> None:
+        """产物已不存在的缓存"""
+        logger.info("stage_cache_invalidated", stage=entry.stage, key=entry.key)
+        self.db.delete(entry)
+        self.db.commit()
+
+
+class PipelineRecorder:
+    """
+    在experiments.pipeline中记录阶段状态
+
+    并行的评测阶段会同时更新同一行, 每次更新都先对实验行加锁再读改写。
+    """
+
+    def __init__(self, db: Session, experiment_id: UUID):
+        self.db = db
+        self.experiment_id = experiment_id
+        self.cache = StageCache(db)
+
+    def _update(self, stage: str, **fields: Any) -> Dict[str, Any]:
+        experiment = (
+            self.db.query(Experiment)
+            .filter(Experiment.id == self.experiment_id)
+            .with_for_update()
+            .first()
+        )
+        if not experiment:
+            raise ValueError(f"Experiment {self.experiment_id} not found")
+        # JSONB列需要整体赋值才会被检测为修改
+        pipeline = dict(experiment.pipeline or {})
+        stages = dict(pipeline.get("stages") or {})
+        record = {**stages.get(stage, {}), **fields}
+        stages[stage] = record
+        pipeline["stages"] = stages
+        experiment.pipeline = pipeline
+        self.db.commit()
+        return record
+
+    def stage(self, stage: str) -> Dict[str, Any]:
+        experiment = self.db.query(Experiment).filter(Experiment.id == self.experiment_id).first()
+        return ((experiment.pipeline or {}).get("stages") or {}).get(stage, {})
+
+    def is_done(self, stage: str, key: str) -> bool:
+        """相同输入已经成功执行过"""
+        record = self.stage(stage)
+        return record.get("status") == "completed" and record.get("key") == key
+
+    def begin(self, stage: str, key: str, started_at: Optional[datetime] = None) -> None:
+        self._update(
+            stage,
+            key=key,
+            status="running",
+            started_at=(started_at or datetime.utcnow()).isoformat(),
+            completed_at=None,
+            duration_seconds=None,
+            error=None,
+            cache_hit=None,
+        )
+        logger.info("pipeline_stage_started", experiment_id=str(self.experiment_id), stage=stage)
+
+    def _finish(
+        self, stage: str, status: str, completed_at: Optional[datetime], **fields: Any
+    ) -> Dict[str, Any]:
+        completed_at = completed_at or datetime.utcnow()
+        started_at = self.stage(stage).get("started_at")
+        duration = (
+            (completed_at - datetime.fromisoformat(started_at)).total_seconds()
+            if started_at
+            else None
+        )
+        record = self._update(
+            stage,
+            status=status,
+            completed_at=completed_at.isoformat(),
+            duration_seconds=duration,
+            **fields,
+        )
+        logger.info(
+            "pipeline_stage_finished",
+            experiment_id=str(self.experiment_id),
+            stage=stage,
+            status=status,
+            duration_seconds=duration,
+        )
+        return record
+
+    def complete(
+        self,
+        stage: str,
+        result: Optional[Dict[str, Any]] = None,
+        completed_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        return self._finish(stage, "completed", completed_at, result=result)
+
+    def fail(
+        self, stage: str, error: str, completed_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        return self._finish(stage, "failed", completed_at, error=error)
+
+    def skip(self, stage: str) -> Dict[str, Any]:
+        """输入未变化, 复用上次的结果"""
+        logger.info("pipeline_stage_skipped", experiment_id=str(self.experiment_id), stage=stage)
+        return self._update(stage, skipped_at=datetime.utcnow().isoformat())
+
+    def reuse(
+        self, stage: str, key: str, apply: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        复用其他实验相同输入的结果
+
+        apply将缓存的结果应用到本实验 (复制评测记录等), 产物已不存在时返回None,
+        此时删除该缓存并返回None。
+        """
+        entry = self.cache.lookup(key)
+        if entry is None:
+            return None
+        result = apply(entry.result)
+        if result is None:
+            self.cache.invalidate(entry)
+            return None
+        self.cache.hit(entry)
+
+        now = datetime.utcnow().isoformat()
+        self._update(
+            stage,
+            key=key,
+            status="completed",
+            started_at=now,
+            completed_at=now,
+            duration_seconds=0.0,
+            error=None,
+            result=result,
+            cache_hit={
+                "source_experiment_id": str(entry.source_experiment_id),
+                "cached_at": entry.created_at.isoformat(),
+            },
+        )
+        logger.info(
+            "pipeline_stage_cache_hit",
+            experiment_id=str(self.experiment_id),
+            stage=stage,
+            source_experiment_id=str(entry.source_experiment_id),
+        )
+        return result
+
+    def run(
+        self,
+        stage: str,
+        key: str,
+        fn: Callable[[], Dict[str, Any]],
+        reuse: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        执行阶段
+
+        相同输入已成功执行过时直接返回上次的结果; 指定reuse时先查找其他实验的缓存,
+        执行成功后写入缓存。
+        """
+        if self.is_done(stage, key):
+            return self.skip(stage).get("result") or {}
+        if reuse is not None:
+            result = self.reuse(stage, key, reuse)
+            if result is not None:
+                return result
+
+        self.begin(stage, key)
+        try:
+            result = fn()
+        except Exception as e:
+            self.fail(stage, str(e))
+            raise
+        self.complete(stage, result)
+        if reuse is not None:
+            self.cache.store(stage, key, result, self.experiment_id)
+        return result
+
+
+def explain_pipeline(db: Session, experiment_id: UUID) -> Dict[str, Any]:
+    """
+    各阶段的幂等键以及下次执行时的动作 (不执行任何阶段)
+
+    action: skip (本实验已用相同输入完成) | reuse (命中其他实验的缓存) | run
+    """
+    experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    if not experiment:
+        raise ValueError(f"Experiment {experiment_id} not found")
+    dataset = db.query(Dataset).filter(Dataset.id == experiment.dataset_id).first()
+    stages = (experiment.pipeline or {}).get("stages") or {}
+
+    def describe(stage: str, key: str, entry: Optional[StageCacheEntry], valid: bool = True):
+        record = stages.get(stage, {})
+        if record.get("status") == "completed" and record.get("key") == key:
+            action = "skip"
+        elif entry is not None and valid:
+            action = "reuse"
+        else:
+            action = "run"
+        return {
+            "stage": stage,
+            "key": key,
+            "action": action,
+            "status": record.get("status"),
+            "duration_seconds": record.get("duration_seconds"),
+            "last_cache_hit": record.get("cache_hit"),
+            "cached": entry is not None and valid,
+            "source_experiment_id": entry.source_experiment_id if entry else None,
+            "hits": entry.hits if entry else 0,
+        }
+
+    cache = StageCache(db)
+    explained: List[Dict[str, Any]] = []
+
+    key = gate_key(dataset)
+    explained.append(describe("gate", key, cache.lookup(key)))
+
+    # 分词缓存是文件缓存 (app.training.token_cache), 反映本机的TOKEN_CACHE_DIR
+    # (docker-compose中api与各worker挂载同一目录)
+    if dataset.file_path:
+        base_model = db.query(Model).filter(Model.id == experiment.base_model_id).first()
+        contract = (
+            db.query(PromptContract)
+            .filter(PromptContract.id == experiment.prompt_contract_id)
+            .first()
+            if experiment.prompt_contract_id
+            else None
+        )
+        recipe = (experiment.config or {}).get("training_recipe", {})
+        key, meta = token_cache.lookup(
+            dataset.file_path,
+            tokenizer_name=((base_model.metadata_ or {}) if base_model else {}).get("tokenizer"),
+            prompt_template=contract.template if contract else None,
+            max_seq_len=recipe.get("max_seq_len"),
+        )
+        explained.append(
+            {
+                "stage": "tokenize",
+                "key": key,
+                "action": "reuse" if meta else "run",
+                "cached": meta is not None,
+            }
+        )
+
+    trained = train_key(experiment, dataset)
+    entry = cache.lookup(trained)
+    explained.append(
+        describe("train", trained, entry, valid=entry is None or checkpoint_available(entry.result))
+    )
+    for track in EVALUATION_TRACKS:
+        # 评测阶段不使用stage_cache
+        explained.append(describe(f"evaluate_{track}", evaluation_key(trained, track), None))
+
+    return {"experiment_id": experiment.id, "stages": explained}
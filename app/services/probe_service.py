@@ -0,0 +1,221 @@
+"""
+Probe Service - 基线行为探测逻辑
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.schemas.model import BaselineProbe
+from app.utils.prompt_template import CompiledContract, ContractValidator
+
+logger = structlog.get_logger()
+
+# 模型调用函数: prompt -> 输出文本
+Invoker = Callable[[str], str]
+
+# 未指定测试用例时使用的默认用例
+DEFAULT_TEST_CASES: List[Dict[str, Any]] = [
+    {"input": "こんにちは"},
+    {"input": "本日はお忙しい中お越しいただきありがとうございます。"},
+    {"input": "プロジェクトの進捗状況について報告いたします。"},
+    {"input": "次回のミーティングは来週の金曜日を予定しております。"},
+    {"input": "資料は会議の前日までに共有してください。"},
+]
+
+# 各检查项使用的prompt
+CHECK_PROMPTS = {
+    "multi_candidate": (
+        "次の文を英語に翻訳し、異なる翻訳候補を3つ番号付きで挙げてください。\n{input}"
+    ),
+    "explanation": "次の文を英語に翻訳し、訳語選択の理由を説明してください。\n{input}",
+    "output_contract": "次の文を英語に翻訳してください。訳文のみを1行で出力してください。\n{input}",
+}
+
+_NUMBERED_LINE = re.compile(r"^\s*(?:\d+[.)、:]|[-*・])\s*\S", re.MULTILINE)
+_EXPLANATION_MARKERS = re.compile(
+    r"(because|reason|explanation|note:|理由|説明|解説|ため|なぜなら)", re.IGNORECASE
+)
+
+
+def _check_multi_candidate(output: str, case: Dict[str, Any]) -> bool:
+    """是否输出了多个不同的候选"""
+    candidates = {
+        line.strip().lower() for line in output.splitlines() if _NUMBERED_LINE.match(line)
+    }
+    return len(candidates) >= 2
+
+
+def _check_explanation(output: str, case: Dict[str, Any]) -> bool:
+    """是否附带了解释性文字"""
+    return bool(_EXPLANATION_MARKERS.search(output)) or len(output.strip().splitlines()) > 1
+
+
+CHECKS: Dict[str, Callable[[str, Dict[str, Any]], bool]] = {
+    "multi_candidate": _check_multi_candidate,
+    "explanation": _check_explanation,
+}
+
+CHECK_NAMES = ("multi_candidate", "explanation", "output_contract")
+
+
+def azure_openai_invoker(deployment: Optional[str] = None) -> Invoker:
+    """创建基于Azure OpenAI的模型调用函数"""
+    from openai import AzureOpenAI
+
+    client = AzureOpenAI(
+        api_key=settings.AZURE_OPENAI_KEY,
+        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        api_version=settings.AZURE_OPENAI_API_VERSION,
+    )
+    deployment = deployment or settings.AZURE_OPENAI_DEPLOYMENT
+
+    def invoke(prompt: str) -> str:
+        response = client.chat.completions.create(
+            model=deployment,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+        )
+        return response.choices[0].message.content or ""
+
+    return invoke
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """计算p50/p95/mean (秒)"""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "mean": 0.0}
+    arr = np.asarray(values, dtype=float)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "p95": round(float(np.percentile(arr, 95)), 4),
+        "mean": round(float(arr.mean()), 4),
+    }
+
+
+class BaselineProber:
+    """
+    基线行为探测器
+
+    每个测试用例的三项检查(多候选/解释性/输出契约)作为独立调用并发执行,
+    所有用例共享同一个线程池。指定Prompt Contract时, 输出契约检查使用
+    契约模板生成prompt, 并用契约的校验器判定输出。
+    """
+
+    def __init__(
+        self,
+        invoker: Invoker,
+        contract: Optional[CompiledContract] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.invoker = invoker
+        self.contract = contract
+        self.validator = contract.validator if contract else ContractValidator()
+        self.max_workers = max_workers or settings.PROBE_MAX_CONCURRENCY
+
+    def _build_prompt(self, check: str, case: Dict[str, Any]) -> str:
+        """生成检查项对应的prompt"""
+        if case.get("prompts", {}).get(check):
+            return case["prompts"][check]
+        if check == "output_contract" and self.contract:
+            return self.contract.render(text=case["input"], **case.get("variables", {}))
+        return CHECK_PROMPTS[check].format(input=case["input"])
+
+    def _evaluate(self, check: str, output: str, case: Dict[str, Any]) -> bool:
+        """判定检查项是否通过"""
+        if check == "output_contract":
+            return self.validator.is_valid(output)
+        return CHECKS[check](output, case)
+
+    def _run_check(self, case_index: int, check: str, case: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单项检查并计时"""
+        started = time.perf_counter()
+        try:
+            output = self.invoker(self._build_prompt(check, case))
+            passed = self._evaluate(check, output, case)
+            error = None
+        except Exception as e:
+            output, passed, error = "", False, str(e)
+        finished = time.perf_counter()
+
+        return {
+            "case": case_index,
+            "check": check,
+            "passed": passed,
+            "output": output,
+            "error": error,
+            "started": started,
+            "finished": finished,
+        }
+
+    def run(self, test_cases: Optional[List[Dict[str, Any]]] = None) -> BaselineProbe:
+        """并发执行所有用例并汇总结果"""
+        cases = test_cases or DEFAULT_TEST_CASES
+        probe_started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_check, i, check, case)
+                for i, case in enumerate(cases)
+                for check in CHECK_NAMES
+            ]
+            results = [f.result() for f in futures]
+
+        # 用例延迟 = 该用例最早开始到最晚结束
+        case_latencies = []
+        for i in range(len(cases)):
+            case_results = [r for r in results if r["case"] == i]
+            case_latencies.append(
+                max(r["finished"] for r in case_results) - min(r["started"] for r in case_results)
+            )
+
+        check_timings = {}
+        pass_rates = {}
+        for check in CHECK_NAMES:
+            check_results = [r for r in results if r["check"] == check]
+            pass_rates[check] = sum(r["passed"] for r in check_results) / len(check_results)
+            check_timings[check] = {
+                **_percentiles([r["finished"] - r["started"] for r in check_results]),
+                "pass_rate": round(pass_rates[check], 4),
+            }
+
+        errors = [
+            {"case": r["case"], "check": r["check"], "error": r["error"]}
+            for r in results
+            if r["error"]
+        ]
+
+        return BaselineProbe(
+            is_multi_candidate=pass_rates["multi_candidate"] >= 0.5,
+            has_explanation=pass_rates["explanation"] >= 0.5,
+            follows_output_contract=pass_rates["output_contract"] >= 0.5,
+            probed_at=datetime.utcnow(),
+            details={
+                "test_cases_count": len(cases),
+                "total_time": round(time.perf_counter() - probe_started, 4),
+                "latency": _percentiles(case_latencies),
+                "checks": check_timings,
+                "success_rate": round(1 - len(errors) / len(results), 4),
+                "errors": errors[:20],
+                "prompt_contract": (
+                    {"id": self.contract.key[0], "version": self.contract.key[1]}
+                    if self.contract
+                    else None
+                ),
+                "samples": [
+                    {
+                        "input": cases[r["case"]]["input"],
+                        "check": r["check"],
+                        "output": r["output"],
+                        "passed": r["passed"],
+                    }
+                    for r in results[: 3 * len(CHECK_NAMES)]
+                ],
+            },
+        )
@@ -0,0 +1,166 @@
+"""
+Report Service - 报告业务逻辑层
+
+报告API使用camelCase字段 (app.schemas.report), 与ORM之间的转换在这里完成。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Type
+from uuid import UUID
+
+import structlog
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Float, func, select
+
+from app.models.evaluation import Evaluation
+from app.models.experiment import Experiment
+from app.models.model import Model
+from app.models.report import Report
+from app.schemas.common import PaginatedResponse
+from app.schemas.report import (
+    ComparisonAnalysis,
+    ReportCreate,
+    ReportSummary,
+    ReportUpdate,
+    SyntheticDataImpact,
+)
+from app.services.base import AsyncBaseService, Cursor
+
+logger = structlog.get_logger()
+
+
+def _section(schema: Type[BaseModel], data: Optional[Dict[str, Any]]) -> Optional[BaseModel]:
+    """JSONB中的报告章节, 为空或与schema不符 (如流水线生成的摘要) 时返回None"""
+    if not data:
+        return None
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        return None
+
+
+def to_schema(report: Report) -> Dict[str, Any]:
+    """ORM -> Report (camelCase)"""
+    return {
+        "id": str(report.id),
+        "experimentId": str(report.experiment_id),
+        "title": report.title,
+        "description": report.description or "",
+        "type": report.type,
+        "status": report.status,
+        "createdAt": report.created_at.isoformat(),
+        "publishedAt": report.published_at.isoformat() if report.published_at else None,
+        "createdBy": report.created_by or "",
+        "tags": report.tags or [],
+    }
+
+
+class ReportService(AsyncBaseService[Report]):
+    """报告服务类"""
+
+    model = Report
+    search_columns = ("title", "description")
+
+    async def get_reports(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        report_type: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        """获取报告列表(分页)"""
+        filters = {"type": report_type, "status": status}
+        result = await self.list(page, page_size, filters, search, cursor, count)
+        result.items = [to_schema(r) for r in result.items]
+        return result
+
+    async def metrics_summary(self, experiment_id: UUID) -> Dict[str, Any]:
+        """实验评测的平均指标, bestModel为实验使用的适配器 (无则为基座模型)"""
+        averages = (
+            await self.db.execute(
+                select(
+                    *(
+                        func.avg(Evaluation.metrics[name].astext.cast(Float))
+                        for name in ("bleu", "rouge_l", "ribes")
+                    )
+                ).where(Evaluation.experiment_id == experiment_id)
+            )
+        ).one()
+        model_name = await self.db.scalar(
+            select(Model.name)
+            .join(
+                Experiment,
+                Model.id == func.coalesce(Experiment.adapter_id, Experiment.base_model_id),
+            )
+            .where(Experiment.id == experiment_id)
+        )
+        return {
+            "avgBleu": averages[0],
+            "avgRougeL": averages[1],
+            "avgRibes": averages[2],
+            "bestModel": model_name,
+            "improvementRate": None,
+        }
+
+    async def get_detail(self, report_id: UUID) -> Optional[Dict[str, Any]]:
+        """报告详情 (ReportDetail), 不存在时返回None"""
+        report = await self.get(report_id)
+        if not report:
+            return None
+        return {
+            **to_schema(report),
+            "summary": _section(ReportSummary, report.summary),
+            "comparison": _section(ComparisonAnalysis, report.comparison),
+            "syntheticDataAnalysis": _section(SyntheticDataImpact, report.synthetic_data_analysis),
+            "metricsSummary": await self.metrics_summary(report.experiment_id),
+            "nextSteps": report.next_steps or [],
+        }
+
+    async def create_report(
+        self, data: ReportCreate, experiment_id: UUID, created_by: Optional[str] = None
+    ) -> Report:
+        """创建报告 (draft)"""
+        report = Report(
+            experiment_id=experiment_id,
+            title=data.title,
+            description=data.description,
+            type=data.type,
+            status="draft",
+            tags=[],
+            created_by=created_by,
+        )
+        self.db.add(report)
+        await self.db.commit()
+        await self.db.refresh(report)
+
+        logger.info("report_created", report_id=str(report.id), experiment_id=str(experiment_id))
+        return report
+
+    async def update_report(self, report_id: UUID, data: ReportUpdate) -> Optional[Report]:
+        """更新报告 (只更新给出的字段)"""
+        report = await self.get(report_id)
+        if not report:
+            return None
+
+        for field, value in data.model_dump(exclude_none=True).items():
+            setattr(report, field, value)
+        await self.db.commit()
+        await self.db.refresh(report)
+        return report
+
+    async def publish_report(self, report_id: UUID) -> Optional[Report]:
+        """发布报告"""
+        report = await self.get(report_id)
+        if not report:
+            return None
+
+        report.status = "published"
+        report.published_at = datetime.utcnow()
+        await self.db.commit()
+        await self.db.refresh(report)
+
+        logger.info("report_published", report_id=str(report_id))
+        return report
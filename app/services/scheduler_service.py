@@ -0,0 +1,288 @@
+"""
+Scheduler Service - 实验调度
+
+实验提交后进入queued状态, 由调度器按资源容量分派到训练队列:
+- 资源: 每个实验声明 memory_mb / cpu_cores / accelerators, 与训练worker总容量比较
+- 优先级: priority越大越先分派, 等待时间每满 SCHEDULER_AGING_SECONDS 有效优先级+1
+- 公平共享: 同优先级下, 当前占用份额(主导资源占比)较小的用户先分派
+- 回填: 队首放不下时允许较小的实验先运行, 但队首等待超过
+  SCHEDULER_RESERVE_AFTER_SECONDS 后停止回填, 让资源逐步空出来
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import structlog
+
+from app.config import settings
+from app.core.cancellation import clear_cancel, request_cancel
+from app.core.response_cache import invalidate_tags
+from app.models.experiment import Experiment
+from app.tasks.celery_app import celery_app
+
+logger = structlog.get_logger()
+
+# 占用资源的状态
+ACTIVE_STATUSES = ("starting", "running", "stopping")
+# 保证同一时刻只有一个调度过程 (pg advisory lock的key)
+_DISPATCH_LOCK_KEY = 0x56455249
+
+
+@dataclass
+class Resources:
+    """资源需求/容量"""
+
+    memory_mb: int = 0
+    cpu_cores: int = 0
+    accelerators: int = 0
+
+    @classmethod
+    def capacity(cls) -> "Resources":
+        return cls(
+            memory_mb=settings.SCHEDULER_CAPACITY_MEMORY_MB,
+            cpu_cores=settings.SCHEDULER_CAPACITY_CPU_CORES,
+            accelerators=settings.SCHEDULER_CAPACITY_ACCELERATORS,
+        )
+
+    @classmethod
+    def requested(cls, declared: Optional[Dict[str, Any]]) -> "Resources":
+        """实验声明的资源, 未指定的项取默认值"""
+        declared = declared or {}
+        return cls(
+            memory_mb=declared.get("memory_mb", settings.SCHEDULER_DEFAULT_MEMORY_MB),
+            cpu_cores=declared.get("cpu_cores", settings.SCHEDULER_DEFAULT_CPU_CORES),
+            accelerators=declared.get("accelerators", settings.SCHEDULER_DEFAULT_ACCELERATORS),
+        )
+
+    def __add__(self, other: "Resources") -> "Resources":
+        return Resources(
+            self.memory_mb + other.memory_mb,
+            self.cpu_cores + other.cpu_cores,
+            self.accelerators + other.accelerators,
+        )
+
+    def __sub__(self, other: "Resources") -> "Resources":
+        return Resources(
+            self.memory_mb - other.memory_mb,
+            self.cpu_cores - other.cpu_cores,
+            self.accelerators - other.accelerators,
+        )
+
+    def fits(self, available: "Resources") -> bool:
+        return (
+            self.memory_mb <= available.memory_mb
+            and self.cpu_cores <= available.cpu_cores
+            and self.accelerators <= available.accelerators
+        )
+
+    def dominant_share(self, capacity: "Resources") -> float:
+        """占容量比例最大的那一项 (Dominant Resource Fairness)"""
+        shares = [
+            self.memory_mb / capacity.memory_mb if capacity.memory_mb else 0.0,
+            self.cpu_cores / capacity.cpu_cores if capacity.cpu_cores else 0.0,
+            self.accelerators / capacity.accelerators if capacity.accelerators else 0.0,
+        ]
+        return max(shares)
+
+
+class ExperimentScheduler:
+    """实验调度器"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.capacity = Resources.capacity()
+
+    def submit(self, experiment_id: UUID, priority: Optional[int] = None) -> Experiment:
+        """将实验加入队列并尝试立即分派"""
+        experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment:
+            raise ValueError(f"Experiment {experiment_id} not found")
+        if experiment.status != "pending":
+            raise ValueError(f"Experiment {experiment_id} is already {experiment.status}")
+        if not Resources.requested(experiment.resources).fits(self.capacity):
+            raise ValueError(f"Experiment {experiment_id} requests more than worker capacity")
+
+        if priority is not None:
+            experiment.priority = priority
+        experiment.status = "queued"
+        experiment.queued_at = datetime.utcnow()
+        self.db.commit()
+        invalidate_tags("experiments")
+        logger.info("experiment_queued", experiment_id=str(experiment_id), priority=priority)
+
+        self.dispatch()
+        self.db.refresh(experiment)
+        return experiment
+
+    def _usage(self) -> Tuple[List[Experiment], Resources, Dict[Any, float]]:
+        """运行中的实验, 已占用资源, 各用户占用的份额"""
+        active = self.db.query(Experiment).filter(Experiment.status.in_(ACTIVE_STATUSES)).all()
+        used = Resources()
+        owner_share: Dict[Any, float] = {}
+        for experiment in active:
+            requested = Resources.requested(experiment.resources)
+            used = used + requested
+            self._add_share(owner_share, experiment.owner_id, requested)
+        return active, used, owner_share
+
+    def _add_share(
+        self, owner_share: Dict[Any, float], owner_id: Any, requested: Resources
+    ) -> None:
+        owner_share[owner_id] = owner_share.get(owner_id, 0.0) + requested.dominant_share(
+            self.capacity
+        )
+
+    def _effective_priority(self, experiment: Experiment, now: datetime) -> int:
+        waited = (now - experiment.queued_at).total_seconds() if experiment.queued_at else 0
+        return experiment.priority + int(waited // settings.SCHEDULER_AGING_SECONDS)
+
+    def _ordered(
+        self, queued: List[Experiment], owner_share: Dict[Any, float], now: datetime
+    ) -> List[Experiment]:
+        """分派顺序: 有效优先级 -> 用户当前份额 -> 入队时间"""
+        return sorted(
+            queued,
+            key=lambda e: (
+                -self._effective_priority(e, now),
+                owner_share.get(e.owner_id, 0.0),
+                e.queued_at or now,
+            ),
+        )
+
+    def dispatch(self) -> List[str]:
+        """按剩余容量分派排队中的实验, 返回本次分派的实验ID"""
+        # 事务级锁, commit后自动释放
+        self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _DISPATCH_LOCK_KEY})
+
+        now = datetime.utcnow()
+        _, used, owner_share = self._usage()
+
+        queued = self.db.query(Experiment).filter(Experiment.status == "queued").all()
+        dispatched: List[Experiment] = []
+        while queued:
+            available = self.capacity - used
+            ordered = self._ordered(queued, owner_share, now)
+            head = ordered[0]
+            reserve = (
+                head.queued_at is not None
+                and (now - head.queued_at).total_seconds()
+                >= settings.SCHEDULER_RESERVE_AFTER_SECONDS
+            )
+            candidates = ordered[:1] if reserve else ordered
+            chosen = next(
+                (e for e in candidates if Resources.requested(e.resources).fits(available)), None
+            )
+            if chosen is None:
+                break
+
+            requested = Resources.requested(chosen.resources)
+            used = used + requested
+            self._add_share(owner_share, chosen.owner_id, requested)
+            chosen.status = "starting"
+            chosen.celery_task_id = str(uuid4())
+            queued.remove(chosen)
+            dispatched.append(chosen)
+        self.db.commit()
+
+        # 先提交状态再发送任务: 发送失败时退回队列
+        for experiment in dispatched:
+            try:
+                celery_app.send_task(
+                    "train_model",
+                    args=[str(experiment.id)],
+                    task_id=experiment.celery_task_id,
+                )
+            except Exception as e:
+                logger.error(
+                    "experiment_dispatch_failed", experiment_id=str(experiment.id), error=str(e)
+                )
+                experiment.status = "queued"
+                experiment.celery_task_id = None
+                self.db.commit()
+                continue
+            logger.info(
+                "experiment_dispatched",
+                experiment_id=str(experiment.id),
+                task_id=experiment.celery_task_id,
+                priority=experiment.priority,
+            )
+        if dispatched:
+            invalidate_tags("experiments")
+        return [str(e.id) for e in dispatched if e.status == "starting"]
+
+    def stop(self, experiment_id: UUID) -> str:
+        """
+        停止实验, 返回停止后的状态
+
+        尚未分派的实验直接变为stopped; 已分派的实验设置取消标志并变为stopping,
+        由训练循环保存checkpoint后自行结束。
+        """
+        experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment:
+            raise ValueError(f"Experiment {experiment_id} not found")
+
+        if experiment.status in ("pending", "queued"):
+            experiment.status = "stopped"
+            experiment.completed_at = datetime.utcnow()
+        elif experiment.status in ("starting", "running"):
+            request_cancel(str(experiment_id))
+            experiment.status = "stopping"
+        elif experiment.status not in ("stopping", "stopped"):
+            raise ValueError(f"Experiment {experiment_id} is already {experiment.status}")
+        self.db.commit()
+        invalidate_tags("experiments")
+        logger.info("experiment_stop_requested", experiment_id=str(experiment_id))
+        return experiment.status
+
+    def force_stop(self, experiment_id: UUID) -> bool:
+        """
+        宽限期后仍未停止时revoke并终止任务进程, 释放资源
+
+        返回是否执行了强制终止。
+        """
+        experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment or experiment.status not in ACTIVE_STATUSES:
+            return False
+
+        if experiment.celery_task_id:
+            celery_app.control.revoke(experiment.celery_task_id, terminate=True, signal="SIGTERM")
+        experiment.status = "stopped"
+        experiment.completed_at = datetime.utcnow()
+        self.db.commit()
+        invalidate_tags("experiments")
+        clear_cancel(str(experiment_id))
+        logger.warning(
+            "experiment_force_stopped",
+            experiment_id=str(experiment_id),
+            task_id=experiment.celery_task_id,
+        )
+
+        self.dispatch()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """容量、占用与队列 (按当前分派顺序)"""
+        now = datetime.utcnow()
+        active, used, owner_share = self._usage()
+
+        queued = self.db.query(Experiment).filter(Experiment.status == "queued").all()
+        return {
+            "capacity": asdict(self.capacity),
+            "used": asdict(used),
+            "running": [str(e.id) for e in active],
+            "queue": [
+                {
+                    "experiment_id": e.id,
+                    "owner_id": e.owner_id,
+                    "priority": e.priority,
+                    "effective_priority": self._effective_priority(e, now),
+                    "resources": asdict(Resources.requested(e.resources)),
+                    "queued_at": e.queued_at,
+                }
+                for e in self._ordered(queued, owner_share, now)
+            ],
+        }
@@ -0,0 +1,282 @@
+"""
+Sweep Service - 超参数搜索
+
+将搜索空间展开为子实验, 按max_parallel限制同时运行的数量逐步提交给调度器;
+子实验在训练中按ASHA剪枝 (app.training.pruning), 全部结束后选出目标指标最优的实验。
+"""
+
+import copy
+import itertools
+import math
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import structlog
+
+from app.config import settings
+from app.core.response_cache import invalidate_tags
+from app.models.experiment import Experiment
+from app.models.sweep import Sweep
+from app.schemas.common import PaginatedResponse
+from app.schemas.sweep import Sweep as SweepSchema
+from app.services.base import BaseService, Cursor
+from app.services.scheduler_service import ACTIVE_STATUSES, ExperimentScheduler
+
+logger = structlog.get_logger()
+
+# 可搜索的参数 (training_recipe内的路径) -> 是否为整数
+SEARCHABLE_PARAMS = {
+    "learning_rate": False,
+    "batch_size": True,
+    "warmup_steps": True,
+    "gradient_accumulation_steps": True,
+    "lora_config.r": True,
+    "lora_config.alpha": False,
+    "lora_config.dropout": False,
+}
+# 占用sweep并行名额的子实验状态
+_IN_FLIGHT_STATUSES = ("queued",) + ACTIVE_STATUSES
+
+
+def _sample(name: str, spec: Dict[str, Any], rng: random.Random) -> Any:
+    if spec.get("values"):
+        return rng.choice(spec["values"])
+    low, high = spec["min"], spec["max"]
+    if spec.get("log"):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return round(value) if SEARCHABLE_PARAMS[name] else value
+
+
+def expand_search_space(
+    search_space: Dict[str, Dict[str, Any]],
+    strategy: str = "grid",
+    num_trials: Optional[int] = None,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    展开搜索空间为参数组合列表
+
+    - grid: 所有参数都必须给出values, 取笛卡尔积 (num_trials小于组合数时只取前num_trials个)
+    - random: 每个参数从values中选取, 或在[min, max]内均匀/对数均匀采样, 共num_trials个
+    """
+    if not search_space:
+        raise ValueError("Search space is empty")
+    for name, spec in search_space.items():
+        if name not in SEARCHABLE_PARAMS:
+            raise ValueError(f"Parameter {name} is not searchable")
+        if not spec.get("values") and (spec.get("min") is None or spec.get("max") is None):
+            raise ValueError(f"Parameter {name} needs values or min/max")
+        if spec.get("log") and spec.get("min") is not None and spec["min"] <= 0:
+            raise ValueError(f"Parameter {name} needs a positive min for log sampling")
+
+    names = sorted(search_space)
+    if strategy == "grid":
+        missing = [n for n in names if not search_space[n].get("values")]
+        if missing:
+            raise ValueError(f"Grid search needs explicit values for {missing}")
+        trials = [
+            dict(zip(names, combo))
+            for combo in itertools.product(*(search_space[n]["values"] for n in names))
+        ]
+        if num_trials:
+            trials = trials[:num_trials]
+    elif strategy == "random":
+        if not num_trials:
+            raise ValueError("Random search needs num_trials")
+        rng = random.Random(seed)
+        trials = [{n: _sample(n, search_space[n], rng) for n in names} for _ in range(num_trials)]
+    else:
+        raise ValueError(f"Unknown sweep strategy {strategy}")
+
+    if len(trials) > settings.SWEEP_MAX_TRIALS:
+        raise ValueError(
+            f"Sweep expands to {len(trials)} trials, limit is {settings.SWEEP_MAX_TRIALS}"
+        )
+    return trials
+
+
+def apply_hyperparameters(config: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """将参数组合写入实验配置的training_recipe (返回副本)"""
+    config = copy.deepcopy(config)
+    recipe = config.setdefault("training_recipe", {})
+    for name, value in params.items():
+        if name.startswith("lora_config."):
+            lora_config = recipe.get("lora_config") or {}
+            lora_config[name.split(".", 1)[1]] = value
+            recipe["lora_config"] = lora_config
+        else:
+            recipe[name] = value
+    return config
+
+
+class SweepService(BaseService[Sweep]):
+    """超参数搜索服务"""
+
+    model = Sweep
+    schema = SweepSchema
+
+    def get_sweeps(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        status: Optional[str] = None,
+        cursor: Optional[Cursor] = None,
+        count: Optional[str] = None,
+    ) -> PaginatedResponse:
+        """获取sweep列表(分页)"""
+        return self.list(page, page_size, {"status": status}, cursor=cursor, count=count)
+
+    def create(
+        self,
+        name: str,
+        template: Dict[str, Any],
+        search_space: Dict[str, Dict[str, Any]],
+        strategy: str = "grid",
+        num_trials: Optional[int] = None,
+        max_parallel: int = 2,
+        pruner: Optional[Dict[str, Any]] = None,
+        objective: str = "best_val_loss",
+        owner_id: Optional[UUID] = None,
+    ) -> Sweep:
+        """创建sweep及全部子实验 (pending, 由advance逐步提交)"""
+        trials = expand_search_space(
+            search_space, strategy, num_trials, seed=template["config"].get("seed", 42)
+        )
+        sweep = Sweep(
+            name=name,
+            owner_id=owner_id,
+            template=template,
+            search_space=search_space,
+            strategy=strategy,
+            num_trials=len(trials),
+            max_parallel=max_parallel,
+            pruner=pruner,
+            objective=objective,
+            status="running",
+        )
+        self.db.add(sweep)
+        self.db.flush()
+
+        for i, params in enumerate(trials):
+            self.db.add(
+                Experiment(
+                    name=f"{name}-t{i:03d}",
+                    task=template.get("task", "translation"),
+                    direction=template["direction"],
+                    dataset_id=template["dataset_id"],
+                    base_model_id=template["base_model_id"],
+                    adapter_id=template.get("adapter_id"),
+                    config=apply_hyperparameters(template["config"], params),
+                    status="pending",
+                    owner_id=owner_id,
+                    priority=template.get("priority", 0),
+                    resources=template.get("resources"),
+                    sweep_id=sweep.id,
+                    hyperparameters=params,
+                )
+            )
+        self.db.commit()
+        invalidate_tags("experiments")
+        logger.info("sweep_created", sweep_id=str(sweep.id), trials=len(trials))
+        return sweep
+
+    def _get(self, sweep_id: UUID, for_update: bool = False) -> Sweep:
+        query = self.db.query(Sweep).filter(Sweep.id == sweep_id)
+        if for_update:
+            query = query.with_for_update()
+        sweep = query.first()
+        if not sweep:
+            raise ValueError(f"Sweep {sweep_id} not found")
+        return sweep
+
+    def advance(self, sweep_id: UUID) -> List[str]:
+        """
+        补充提交子实验直到max_parallel个在运行, 全部结束时汇总结果
+
+        返回本次提交的实验ID。
+        """
+        # 行锁: 多个子实验同时结束触发advance时不会超额提交
+        sweep = self._get(sweep_id, for_update=True)
+        if sweep.status != "running":
+            self.db.commit()
+            return []
+
+        trials = (
+            self.db.query(Experiment)
+            .filter(Experiment.sweep_id == sweep_id)
+            .order_by(Experiment.name)
+            .all()
+        )
+        pending = [e for e in trials if e.status == "pending"]
+        in_flight = sum(1 for e in trials if e.status in _IN_FLIGHT_STATUSES)
+
+        if not pending and not in_flight:
+            self._finish(sweep, trials)
+            self.db.commit()
+            return []
+
+        submitted = pending[: max(sweep.max_parallel - in_flight, 0)]
+        now = datetime.utcnow()
+        for experiment in submitted:
+            experiment.status = "queued"
+            experiment.queued_at = now
+        self.db.commit()
+
+        if submitted:
+            invalidate_tags("experiments")
+            logger.info(
+                "sweep_trials_submitted",
+                sweep_id=str(sweep_id),
+                submitted=len(submitted),
+                remaining=len(pending) - len(submitted),
+            )
+            ExperimentScheduler(self.db).dispatch()
+        return [str(e.id) for e in submitted]
+
+    def _finish(self, sweep: Sweep, trials: List[Experiment]) -> None:
+        """选出目标指标最小的已完成子实验"""
+        scored = [
+            (e.metrics[sweep.objective], e)
+            for e in trials
+            if e.status == "completed" and (e.metrics or {}).get(sweep.objective) is not None
+        ]
+        if scored:
+            best_value, best = min(scored, key=lambda item: item[0])
+            sweep.best_experiment_id = best.id
+            sweep.best_value = best_value
+        sweep.status = "completed"
+        sweep.completed_at = datetime.utcnow()
+        logger.info(
+            "sweep_completed",
+            sweep_id=str(sweep.id),
+            best_experiment_id=str(sweep.best_experiment_id),
+            best_value=sweep.best_value,
+            pruned=sum(1 for e in trials if e.status == "pruned"),
+        )
+
+    def stop(self, sweep_id: UUID) -> List[str]:
+        """停止sweep: 未开始的子实验直接停止, 运行中的子实验请求停止; 返回stopping的实验ID"""
+        sweep = self._get(sweep_id, for_update=True)
+        if sweep.status != "running":
+            raise ValueError(f"Sweep {sweep_id} is already {sweep.status}")
+        sweep.status = "stopped"
+        sweep.completed_at = datetime.utcnow()
+        self.db.commit()
+
+        scheduler = ExperimentScheduler(self.db)
+        stopping = []
+        trials = self.db.query(Experiment).filter(Experiment.sweep_id == sweep_id).all()
+        for experiment in trials:
+            if experiment.status in ("pending",) + _IN_FLIGHT_STATUSES:
+                if scheduler.stop(experiment.id) == "stopping":
+                    stopping.append(str(experiment.id))
+        logger.info("sweep_stopped", sweep_id=str(sweep_id), stopping=len(stopping))
+        return stopping
+
+    def running_ids(self) -> List[str]:
+        """进行中的sweep"""
+        return [str(s.id) for s in self.db.query(Sweep.id).filter(Sweep.status == "running")]
@@ -3,7 +3,10 @@ Celery应用配置
 """
 
 from celery import Celery
+from celery.signals import worker_process_init
+from kombu import Queue
 from app.config import settings
+from app.database import configure_worker_engine
 
 # 创建Celery应用
 celery_app = Celery(
@@ -15,9 +18,16 @@ celery_app = Celery(
         "app.tasks.generation",
         "app.tasks.evaluation",
         "app.tasks.quality_gate",
+        "app.tasks.probe",
+        "app.tasks.scheduler",
+        "app.tasks.sweep",
+        "app.tasks.pipeline",
     ],
 )
 
+# 任务硬超时: 训练任务最长4小时
+TASK_TIME_LIMIT = 3600 * 4
+
 # Celery配置
 celery_app.conf.update(
     task_serializer="json",
@@ -26,11 +36,43 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
-    task_time_limit=3600 * 4,  # 4小时超时
+    task_time_limit=TASK_TIME_LIMIT,
+    task_soft_time_limit=TASK_TIME_LIMIT - 300,  # 预留5分钟保存checkpoint
+    # acks_late的消息在visibility_timeout内未确认会被重新投递给其他worker;
+    # 必须长于任务的最长执行时间, 否则超过1小时 (默认值) 的训练会被并行执行第二份
+    broker_transport_options={"visibility_timeout": TASK_TIME_LIMIT + 3600},
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=50,
+    # 队列: 长时间的训练任务与评测/探测等短任务使用不同的worker, 互不阻塞
+    # celery -A app.tasks.celery_app worker -Q training --concurrency=1
+    # celery -A app.tasks.celery_app worker -Q evaluation,default --concurrency=4
+    task_queues=(Queue("training"), Queue("evaluation"), Queue("default")),
+    task_default_queue="default",
+    task_routes={
+        "train_model": {"queue": "training"},
+        "evaluate_model": {"queue": "evaluation"},
+        "run_baseline_probe": {"queue": "evaluation"},
+        "check_quality_gate": {"queue": "evaluation"},
+        "pipeline_evaluate": {"queue": "evaluation"},
+    },
+    beat_schedule={
+        "dispatch-experiments": {
+            "task": "dispatch_experiments",
+            "schedule": settings.SCHEDULER_TICK_INTERVAL,
+        },
+        "advance-sweeps": {
+            "task": "advance_sweeps",
+            "schedule": settings.SWEEP_TICK_INTERVAL,
+        },
+    },
 )
 
 
+@worker_process_init.connect
+def init_worker_db_pool(**kwargs):
+    """prefork子进程不使用从父进程继承的数据库连接池"""
+    configure_worker_engine()
+
+
 if __name__ == "__main__":
     celery_app.start()
@@ -1,13 +1,68 @@
 """
-评测任务 (Placeholder)
+评测任务
 """
 
+import structlog
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.dataset import Dataset
+from app.models.experiment import Experiment
+from app.models.model import Model, PromptContract
 from app.tasks.celery_app import celery_app
+from app.training import token_cache
+
+logger = structlog.get_logger()
 
 
 @celery_app.task(name="evaluate_model")
-def evaluate_model(experiment_id: str):
+def evaluate_model(experiment_id: str, track: str = "written"):
     """
-    模型评测任务 (TODO: 完整实现)
+    模型评测任务
+
+    评测数据与训练共用预分词缓存 (同一数据集+分词器+模板只分词一次)。
+
+    目前只加载评测数据并返回其规模 (eval_examples/eval_tokens), 不做生成与打分,
+    两个track使用同一份数据。没有BLEU/ROUGE-L/RIBES/MQM, 因此不写入evaluations表
+    (不影响排行榜), 返回值的metrics_computed为False; 带指标的评测通过API写入。
     """
-    return {"status": "completed", "experiment_id": experiment_id}
+    db = SessionLocal()
+    try:
+        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment:
+            raise ValueError(f"Experiment {experiment_id} not found")
+
+        dataset = db.query(Dataset).filter(Dataset.id == experiment.dataset_id).first()
+        base_model = db.query(Model).filter(Model.id == experiment.base_model_id).first()
+        contract = (
+            db.query(PromptContract)
+            .filter(PromptContract.id == experiment.prompt_contract_id)
+            .first()
+            if experiment.prompt_contract_id
+            else None
+        )
+        recipe = (experiment.config or {}).get("training_recipe", {})
+
+        examples = token_cache.get_or_build(
+            dataset.file_path,
+            tokenizer_name=(base_model.metadata_ or {}).get("tokenizer"),
+            prompt_template=contract.template if contract else None,
+            max_seq_len=recipe.get("max_seq_len") or settings.DATALOADER_MAX_SEQ_LEN,
+        )
+        logger.info(
+            "evaluation_data_loaded",
+            experiment_id=experiment_id,
+            examples=len(examples),
+            tokens=examples.num_tokens,
+        )
+
+        return {
+            "status": "completed",
+            "experiment_id": experiment_id,
+            "track": track,
+            "metrics_computed": False,
+            "eval_examples": len(examples),
+            "eval_tokens": examples.num_tokens,
+        }
+    finally:
+        db.close()
@@ -0,0 +1,274 @@
+"""
+训练流水线 - Celery canvas
+
+    chain(gate, train)                           # 训练经调度器分派, 异步结束
+    chord(group(evaluate spoken, written), report)  # 训练完成后由pipeline_training_finished启动
+
+各阶段以输入的幂等键记录在experiments.pipeline中, 输入未变化的阶段重新执行时直接跳过;
+门禁、训练的结果写入stage_cache, 输入相同的其他实验直接复用 (不再执行)。
+
+评测阶段 (evaluate_model) 目前只加载评测数据, 不计算翻译指标: 不写入evaluations表和
+stage_cache, 结果 (metrics_computed=False) 只记录在experiments.pipeline中。
+报告只汇总通过API写入的评测, 实验没有评测时不生成。
+"""
+
+from datetime import datetime
+from uuid import UUID
+
+from celery import chain, chord, group
+from celery.canvas import Signature
+
+from app.tasks.celery_app import celery_app
+from app.core.response_cache import invalidate_tags
+from app.database import SessionLocal
+from app.models.dataset import Dataset
+from app.models.evaluation import Evaluation
+from app.models.experiment import Experiment
+from app.models.report import Report
+from app.services.pipeline_service import (
+    EVALUATION_TRACKS,
+    PipelineRecorder,
+    checkpoint_available,
+    evaluation_key,
+    gate_key,
+    stage_key,
+    train_key,
+)
+from app.services.scheduler_service import ExperimentScheduler
+from app.tasks.evaluation import evaluate_model
+from app.tasks.quality_gate import check_quality_gate
+import structlog
+
+logger = structlog.get_logger()
+
+
+def build_pipeline(experiment_id: str) -> Signature:
+    """门禁 -> 训练; 训练之后的阶段见build_post_training"""
+    return chain(pipeline_gate.si(experiment_id), pipeline_train.si(experiment_id))
+
+
+def build_post_training(experiment_id: str) -> Signature:
+    """两个track并行评测, 全部结束后生成报告"""
+    return chord(
+        group([pipeline_evaluate.si(experiment_id, track) for track in EVALUATION_TRACKS]),
+        pipeline_report.si(experiment_id),
+    )
+
+
+def _load(db, experiment_id: str) -> Experiment:
+    experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    if not experiment:
+        raise ValueError(f"Experiment {experiment_id} not found")
+    return experiment
+
+
+@celery_app.task(name="pipeline_gate")
+def pipeline_gate(experiment_id: str):
+    """阶段1: 数据质量门禁, 未通过时中止流水线"""
+    db = SessionLocal()
+    try:
+        experiment = _load(db, experiment_id)
+        dataset = db.query(Dataset).filter(Dataset.id == experiment.dataset_id).first()
+
+        def run() -> dict:
+            result = check_quality_gate(str(dataset.id))
+            if result["status"] != "passed":
+                reasons = "; ".join(result.get("block_reasons", []))
+                raise ValueError(f"Dataset {dataset.id} blocked by quality gate: {reasons}")
+            return result
+
+        def reuse(result: dict) -> dict:
+            # 内容相同的数据集已通过门禁
+            dataset.quality_gate_result = result
+            dataset.status = "passed"
+            db.commit()
+            invalidate_tags("datasets")
+            return result
+
+        return PipelineRecorder(db, experiment.id).run("gate", gate_key(dataset), run, reuse)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="pipeline_train")
+def pipeline_train(experiment_id: str):
+    """
+    阶段2: 提交训练
+
+    训练经调度器按资源分派, 不在此任务中等待; 结束后train_model触发
+    pipeline_training_finished继续后面的阶段。输入未变化且已训练完成时直接进入评测,
+    其他实验已用相同输入训练完成时复用其checkpoint与指标。
+    """
+    db = SessionLocal()
+    try:
+        experiment = _load(db, experiment_id)
+        dataset = db.query(Dataset).filter(Dataset.id == experiment.dataset_id).first()
+        recorder = PipelineRecorder(db, experiment.id)
+        key = train_key(experiment, dataset)
+
+        if recorder.is_done("train", key):
+            recorder.skip("train")
+            build_post_training(experiment_id).apply_async()
+            return {"experiment_id": experiment_id, "status": "skipped"}
+
+        record = recorder.stage("train")
+        if record.get("status") == "running" and record.get("key") == key:
+            # 同一输入的训练已在进行中
+            return {"experiment_id": experiment_id, "status": experiment.status}
+        if experiment.status != "pending":
+            raise ValueError(
+                f"Experiment {experiment_id} is already {experiment.status}; "
+                "its training inputs changed, create a new experiment"
+            )
+
+        def reuse(result: dict):
+            if not checkpoint_available(result):
+                return None
+            now = datetime.utcnow()
+            experiment.status = "completed"
+            experiment.started_at = experiment.completed_at = now
+            experiment.best_checkpoint_path = result["best_checkpoint_path"]
+            experiment.metrics = {**(result.get("metrics") or {}), "reused": True}
+            db.commit()
+            invalidate_tags("experiments")
+            return result
+
+        if recorder.reuse("train", key, reuse) is not None:
+            build_post_training(experiment_id).apply_async()
+            return {"experiment_id": experiment_id, "status": "reused"}
+
+        recorder.begin("train", key)
+        try:
+            experiment = ExperimentScheduler(db).submit(experiment.id)
+        except Exception as e:
+            db.rollback()
+            recorder.fail("train", str(e))
+            raise
+        return {"experiment_id": experiment_id, "status": experiment.status}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="pipeline_training_finished", ignore_result=True)
+def pipeline_training_finished(experiment_id: str):
+    """训练结束 (train_model触发): 记录训练阶段并写入缓存, 成功时启动评测与报告"""
+    db = SessionLocal()
+    try:
+        experiment = _load(db, experiment_id)
+        recorder = PipelineRecorder(db, experiment.id)
+        record = recorder.stage("train")
+        if record.get("status") != "running":
+            return
+
+        if experiment.status != "completed":
+            recorder.fail(
+                "train",
+                f"Training ended as {experiment.status}",
+                completed_at=experiment.completed_at,
+            )
+            return
+
+        result = {
+            "metrics": experiment.metrics,
+            "best_checkpoint_path": experiment.best_checkpoint_path,
+            # 阶段耗时包含排队时间, 分开记录
+            "queued_seconds": (
+                (experiment.started_at - experiment.queued_at).total_seconds()
+                if experiment.started_at and experiment.queued_at
+                else None
+            ),
+            "training_seconds": (
+                (experiment.completed_at - experiment.started_at).total_seconds()
+                if experiment.completed_at and experiment.started_at
+                else None
+            ),
+        }
+        recorder.complete("train", result, completed_at=experiment.completed_at)
+        recorder.cache.store("train", record["key"], result, experiment.id)
+        build_post_training(experiment_id).apply_async()
+    finally:
+        db.close()
+
+
+@celery_app.task(name="pipeline_evaluate")
+def pipeline_evaluate(experiment_id: str, track: str):
+    """
+    阶段3: 评测 (每个track一个任务, 并行执行)
+
+    evaluate_model不计算指标, 不指定reuse: 结果不写入stage_cache, 也不复用其他实验的缓存。
+    """
+    db = SessionLocal()
+    try:
+        experiment = _load(db, experiment_id)
+        recorder = PipelineRecorder(db, experiment.id)
+        trained = recorder.stage("train").get("key")
+        if not trained:
+            raise ValueError(f"Experiment {experiment_id} has no training stage")
+
+        return recorder.run(
+            f"evaluate_{track}",
+            evaluation_key(trained, track),
+            lambda: evaluate_model(experiment_id, track),
+        )
+    finally:
+        db.close()
+
+
+@celery_app.task(name="pipeline_report")
+def pipeline_report(experiment_id: str):
+    """
+    阶段4: 汇总训练与评测结果生成报告 (草稿), 重新生成时更新同一份报告
+
+    评测阶段不写入evaluations表, 实验没有 (通过API写入的) 评测时不生成报告。
+    """
+    db = SessionLocal()
+    try:
+        experiment = _load(db, experiment_id)
+        recorder = PipelineRecorder(db, experiment.id)
+        evaluations = (
+            db.query(Evaluation)
+            .filter(Evaluation.experiment_id == experiment.id)
+            .order_by(Evaluation.track)
+            .all()
+        )
+        if not evaluations:
+            logger.info("pipeline_report_skipped", experiment_id=experiment_id, reason="no_metrics")
+            return {"experiment_id": experiment_id, "status": "skipped"}
+        key = stage_key(
+            "report",
+            {
+                "train": recorder.stage("train").get("key"),
+                "evaluations": {e.track: [str(e.id), e.updated_at] for e in evaluations},
+            },
+        )
+
+        def run() -> dict:
+            previous_id = (recorder.stage("report").get("result") or {}).get("report_id")
+            report = (
+                db.query(Report).filter(Report.id == UUID(previous_id)).first()
+                if previous_id
+                else None
+            )
+            if not report:
+                report = Report(
+                    experiment_id=experiment.id, title=f"{experiment.name} 实验总结报告"
+                )
+                db.add(report)
+            stages = (experiment.pipeline or {}).get("stages", {})
+            report.summary = {
+                "training": experiment.metrics,
+                "evaluations": {e.track: e.metrics for e in evaluations},
+                "stage_durations": {
+                    name: stage.get("duration_seconds") for name, stage in stages.items()
+                },
+            }
+            report.status = "draft"
+            db.commit()
+            invalidate_tags("reports")
+            return {"report_id": str(report.id)}
+
+        result = recorder.run("report", key, run)
+        logger.info("pipeline_completed", experiment_id=experiment_id, **result)
+        return result
+    finally:
+        db.close()
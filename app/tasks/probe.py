@@ -0,0 +1,66 @@
+"""
+Baseline Probe - 基线行为探测任务
+"""
+
+from typing import Any, Dict, List, Optional
+from app.tasks.celery_app import celery_app
+from app.core.response_cache import invalidate_tags
+from app.database import SessionLocal
+from app.models.model import Model, PromptContract
+from app.services.probe_service import BaselineProber, azure_openai_invoker
+from app.utils.prompt_template import get_compiled_contract
+import structlog
+
+logger = structlog.get_logger()
+
+
+@celery_app.task(name="run_baseline_probe")
+def run_baseline_probe(
+    model_id: str,
+    test_cases: Optional[List[Dict[str, Any]]] = None,
+    prompt_contract_id: Optional[str] = None,
+):
+    """
+    基线行为探测任务
+
+    并发执行测试用例, 结果(含p50/p95延迟和各检查项耗时)写入Model.baseline_probe。
+    未指定prompt_contract_id时使用该模型最新版本的契约。
+    """
+
+    logger.info("baseline_probe_started", model_id=model_id)
+
+    db = SessionLocal()
+    try:
+        model = db.get(Model, model_id)
+        if not model:
+            raise ValueError(f"Model {model_id} not found")
+
+        query = db.query(PromptContract).filter(PromptContract.model_id == model.id)
+        if prompt_contract_id:
+            query = query.filter(PromptContract.id == prompt_contract_id)
+        contract = query.order_by(PromptContract.version.desc()).first()
+
+        invoker = azure_openai_invoker((model.config or {}).get("deployment"))
+        prober = BaselineProber(
+            invoker, contract=get_compiled_contract(contract) if contract else None
+        )
+        probe_result = prober.run(test_cases)
+
+        # 保存探测结果到数据库
+        model.baseline_probe = probe_result.model_dump(mode="json")
+        db.commit()
+        invalidate_tags("models")
+        logger.info(
+            "baseline_probe_completed",
+            model_id=model_id,
+            latency=probe_result.details.get("latency"),
+        )
+
+        return probe_result.model_dump(mode="json")
+
+    except Exception as e:
+        logger.error("baseline_probe_failed", model_id=model_id, error=str(e))
+        raise
+
+    finally:
+        db.close()
@@ -5,6 +5,7 @@ Quality Gate - 数据质量门禁任务
 import random
 from datetime import datetime
 from app.tasks.celery_app import celery_app
+from app.core.response_cache import invalidate_tags
 from app.database import SessionLocal
 from app.models.dataset import Dataset
 from app.config import settings
@@ -97,6 +98,7 @@ def check_quality_gate(dataset_id: str):
         dataset.quality_gate_result = quality_gate_result
         dataset.status = "passed" if passed else "blocked"
         db.commit()
+        invalidate_tags("datasets")
 
         logger.info(
             "quality_gate_completed",
@@ -0,0 +1,86 @@
+"""
+实验调度任务
+"""
+
+from typing import List, Optional
+from uuid import UUID
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+from app.core.response_cache import invalidate_tags
+from app.database import SessionLocal
+from app.models.experiment import Experiment
+from app.services.scheduler_service import ExperimentScheduler
+import structlog
+
+logger = structlog.get_logger()
+
+
+@celery_app.task(name="submit_experiment")
+def submit_experiment(experiment_id: str, priority: Optional[int] = None):
+    """
+    提交实验到调度队列
+
+    资源需求超过worker总容量等无法调度的实验直接标记为failed。
+    """
+    db = SessionLocal()
+    try:
+        try:
+            experiment = ExperimentScheduler(db).submit(UUID(experiment_id), priority)
+        except ValueError as e:
+            db.rollback()
+            logger.error("experiment_submit_failed", experiment_id=experiment_id, error=str(e))
+            experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+            if experiment and experiment.status == "pending":
+                experiment.status = "failed"
+                experiment.metrics = {"error": str(e)}
+                db.commit()
+                invalidate_tags("experiments")
+            raise
+        return {"experiment_id": experiment_id, "status": experiment.status}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="dispatch_experiments", ignore_result=True)
+def dispatch_experiments() -> List[str]:
+    """
+    按剩余容量分派排队中的实验
+
+    由celery beat定期执行, 训练任务结束释放资源时也会立即触发一次。
+    """
+    db = SessionLocal()
+    try:
+        return ExperimentScheduler(db).dispatch()
+    finally:
+        db.close()
+
+
+@celery_app.task(name="stop_experiment")
+def stop_experiment(experiment_id: str):
+    """
+    停止实验
+
+    运行中的实验设置取消标志, 并在STOP_GRACE_SECONDS后检查是否已经停止,
+    未停止时revoke并终止任务 (enforce_stop)。
+    """
+    db = SessionLocal()
+    try:
+        status = ExperimentScheduler(db).stop(UUID(experiment_id))
+    finally:
+        db.close()
+
+    if status == "stopping":
+        enforce_stop.apply_async(args=[experiment_id], countdown=settings.STOP_GRACE_SECONDS)
+    return {"experiment_id": experiment_id, "status": status}
+
+
+@celery_app.task(name="enforce_stop")
+def enforce_stop(experiment_id: str):
+    """宽限期结束后仍未停止的实验强制终止"""
+    db = SessionLocal()
+    try:
+        forced = ExperimentScheduler(db).force_stop(UUID(experiment_id))
+        return {"experiment_id": experiment_id, "forced": forced}
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+"""
+超参数搜索任务
+"""
+
+from typing import List
+from uuid import UUID
+
+from app.config import settings
+from app.tasks.celery_app import celery_app
+from app.database import SessionLocal
+from app.services.sweep_service import SweepService
+from app.tasks.scheduler import enforce_stop
+import structlog
+
+logger = structlog.get_logger()
+
+
+@celery_app.task(name="advance_sweep", ignore_result=True)
+def advance_sweep(sweep_id: str) -> List[str]:
+    """
+    推进sweep: 补充提交子实验, 全部结束后汇总结果
+
+    sweep创建后、子实验结束时触发, 并由advance_sweeps定期兜底。
+    """
+    db = SessionLocal()
+    try:
+        return SweepService(db).advance(UUID(sweep_id))
+    finally:
+        db.close()
+
+
+@celery_app.task(name="advance_sweeps", ignore_result=True)
+def advance_sweeps() -> None:
+    """推进所有进行中的sweep (celery beat定期执行)"""
+    db = SessionLocal()
+    try:
+        sweep_ids = SweepService(db).running_ids()
+    finally:
+        db.close()
+    for sweep_id in sweep_ids:
+        advance_sweep.delay(sweep_id)
+
+
+@celery_app.task(name="stop_sweep")
+def stop_sweep(sweep_id: str):
+    """停止sweep, 运行中的子实验在宽限期后仍未停止时强制终止"""
+    db = SessionLocal()
+    try:
+        stopping = SweepService(db).stop(UUID(sweep_id))
+    finally:
+        db.close()
+
+    for experiment_id in stopping:
+        enforce_stop.apply_async(args=[experiment_id], countdown=settings.STOP_GRACE_SECONDS)
+    return {"sweep_id": sweep_id, "stopping": stopping}
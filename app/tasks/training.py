@@ -2,17 +2,73 @@
 训练任务 - Celery Tasks
 """
 
-import json
+import random
 from datetime import datetime
+import numpy as np
+from celery.exceptions import Retry, SoftTimeLimitExceeded
+from app.config import settings
 from app.tasks.celery_app import celery_app
 from app.database import SessionLocal
 from app.models.experiment import Experiment
+from app.models.dataset import Dataset
+from app.models.model import Model, PromptContract
+from app.core.progress import ProgressPublisher
+from app.core.response_cache import invalidate_tags
+from app.core.cancellation import CancellationToken, clear_cancel
+from app.core.log_store import get_experiment_logger
+from app.core.training_lease import LeaseLost, TrainingLease
+from app.services.metrics_service import MetricsWriter
+from app.training.checkpoint import CheckpointWriter, capture_rng_state, restore_rng_state
+from app.training.data import build_loader_from_experiment
+from app.training.pruning import SweepPruner
 import structlog
 
 logger = structlog.get_logger()
 
 
-@celery_app.task(bind=True, name="train_model")
+def _release_resources(experiment_id: str, sweep_id=None) -> None:
+    """实验结束后触发调度, 让排队中的实验使用释放出来的资源; sweep的子实验同时推进sweep"""
+    try:
+        if sweep_id:
+            # advance_sweep提交后续子实验并调度
+            celery_app.send_task("advance_sweep", args=[str(sweep_id)])
+        else:
+            celery_app.send_task("dispatch_experiments")
+    except Exception as e:
+        # beat的定期调度会兜底
+        logger.warning("dispatch_trigger_failed", experiment_id=experiment_id, error=str(e))
+
+
+def _continue_pipeline(experiment: Experiment) -> None:
+    """流水线中的实验: 记录训练阶段, 训练完成时继续评测与报告"""
+    if not experiment.pipeline:
+        return
+    try:
+        celery_app.send_task("pipeline_training_finished", args=[str(experiment.id)])
+    except Exception as e:
+        logger.warning("pipeline_trigger_failed", experiment_id=str(experiment.id), error=str(e))
+
+
+# 不再训练的状态 (stopped另外处理: 分派后被停止时需要释放资源)
+FINISHED_STATUSES = ("completed", "failed", "pruned")
+
+
+def _checkpoint_interval(recipe: dict) -> int:
+    """checkpoint间隔(step), 0表示不做定期保存"""
+    if not recipe.get("auto_save_checkpoints", True):
+        return 0
+    return recipe.get("checkpoint_interval") or settings.DEFAULT_CHECKPOINT_INTERVAL
+
+
+# acks_late + reject_on_worker_lost: worker被杀时任务重新入队, 从checkpoint恢复;
+# 重新投递的副本由训练租约 (app.core.training_lease) 保证不与仍在执行的副本并行
+@celery_app.task(
+    bind=True,
+    name="train_model",
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=settings.TRAINING_MAX_RETRIES,
+)
 def train_model(self, experiment_id: str):
     """
     模型训练任务
@@ -20,14 +76,32 @@ def train_model(self, experiment_id: str):
     这个任务负责:
     1. 加载实验配置和数据集
     2. 初始化模型
-    3. 执行训练循环
+    3. 执行LoRA训练循环 (梯度累积, 混合精度, warmup, 早停)
     4. 实时发布进度到Redis
-    5. 保存checkpoint
-    6. 触发评测
+    5. 定期保存checkpoint, 重试时从最新checkpoint恢复
+    6. 收到取消标志时保存checkpoint并以stopped结束; sweep的子实验按ASHA剪枝 (pruned)
+    7. 流水线中的实验继续评测与报告 (app.tasks.pipeline)
     """
 
+    # 重新投递的同一消息在另一个执行者训练期间不做任何写入; 租约过期后再试
+    # (持有者进程已被杀时由这次执行接手, 持有者正常结束时在下面按状态跳过)
+    lease = TrainingLease(experiment_id, self.request.id)
+    if not lease.acquire():
+        logger.warning(
+            "training_already_running",
+            experiment_id=experiment_id,
+            task_id=self.request.id,
+            holder=lease.holder,
+        )
+        raise self.retry(countdown=lease.ttl, max_retries=None)
+
     logger.info("training_started", experiment_id=experiment_id)
 
+    publisher = ProgressPublisher(experiment_id)
+    exp_log, log_writer = get_experiment_logger(experiment_id)
+    checkpoints = CheckpointWriter(experiment_id)
+    cancel = CancellationToken(experiment_id)
+    loader = val_loader = None
     db = SessionLocal()
     try:
         # 1. 加载实验配置
@@ -35,80 +109,318 @@ def train_model(self, experiment_id: str):
         if not experiment:
             raise ValueError(f"Experiment {experiment_id} not found")
 
+        # 已结束, 或已被重新分派给其他任务: 重复投递的消息
+        if experiment.status in FINISHED_STATUSES or (
+            experiment.celery_task_id and experiment.celery_task_id != self.request.id
+        ):
+            logger.warning(
+                "training_task_stale",
+                experiment_id=experiment_id,
+                task_id=self.request.id,
+                status=experiment.status,
+            )
+            return {"status": experiment.status, "experiment_id": experiment_id}
+
+        # 分派后、开始前已被停止
+        if experiment.status == "stopped" or cancel.is_set():
+            experiment.status = "stopped"
+            experiment.completed_at = experiment.completed_at or datetime.utcnow()
+            db.commit()
+            invalidate_tags("experiments")
+            clear_cancel(experiment_id)
+            publisher.publish({"type": "status", "status": "stopped"}, force=True)
+            _release_resources(experiment_id, experiment.sweep_id)
+            _continue_pipeline(experiment)
+            return {"status": "stopped", "experiment_id": experiment_id}
+
         # 更新状态
         experiment.status = "running"
-        experiment.started_at = datetime.utcnow()
+        experiment.started_at = experiment.started_at or datetime.utcnow()
         db.commit()
+        invalidate_tags("experiments")
+        publisher.publish({"type": "status", "status": "running"}, force=True)
 
-        # 2. 加载数据集
-        # TODO: 实现数据集加载逻辑
-        logger.info("loading_dataset", dataset_id=str(experiment.dataset_id))
+        metrics_writer = MetricsWriter(db, experiment_id)
+        exp_log.info("training_started", task_id=self.request.id)
 
-        # 3. 加载模型
-        # TODO: 实现模型加载逻辑
-        logger.info("loading_model", model_id=str(experiment.base_model_id))
+        config = experiment.config
+        recipe = config.get("training_recipe", {})
+        epochs = recipe.get("epochs", 10)
+        checkpoint_interval = _checkpoint_interval(recipe)
+
+        # 2. 加载数据集 (流式读取, 后台分词+预取)
+        dataset = db.query(Dataset).filter(Dataset.id == experiment.dataset_id).first()
+        base_model = db.query(Model).filter(Model.id == experiment.base_model_id).first()
+        contract = (
+            db.query(PromptContract)
+            .filter(PromptContract.id == experiment.prompt_contract_id)
+            .first()
+            if experiment.prompt_contract_id
+            else None
+        )
+        loader = build_loader_from_experiment(
+            dataset.file_path,
+            config,
+            tokenizer_name=(base_model.metadata_ or {}).get("tokenizer"),
+            prompt_template=contract.template if contract else None,
+        )
+        val_loader = build_loader_from_experiment(
+            dataset.file_path,
+            config,
+            tokenizer_name=(base_model.metadata_ or {}).get("tokenizer"),
+            prompt_template=contract.template if contract else None,
+            split="validation",
+            num_workers=0,
+        )
+        exp_log.info(
+            "loading_dataset",
+            dataset_id=str(experiment.dataset_id),
+            train_examples=loader.num_examples(),
+            validation_examples=val_loader.num_examples(),
+        )
+
+        # 3. 加载模型 (torch只在worker中需要, 在此处导入)
+        from app.training.engine import EarlyStopping, LoRATrainer, load_base_model, resolve_device
+
+        accumulation = max(recipe.get("gradient_accumulation_steps", 1), 1)
+        # 第一个epoch结束前按样本数估算每个epoch的step数
+        estimated_steps_per_epoch = max(
+            loader.num_examples() // (recipe.get("batch_size", 16) * accumulation), 1
+        )
+        model = load_base_model(
+            base_model.metadata_ or {},
+            vocab_size=loader.tokenizer.vocab_size,
+            max_seq_len=loader.max_seq_len,
+            seed=config.get("seed", 42),
+        )
+        trainer = LoRATrainer(
+            model,
+            recipe,
+            total_steps=estimated_steps_per_epoch * epochs,
+            device=resolve_device(settings.TRAINING_DEVICE),
+        )
+        early_stopping = EarlyStopping(recipe.get("early_stopping_patience"))
+        exp_log.info(
+            "loading_model",
+            model_id=str(experiment.base_model_id),
+            lora_modules=len(trainer.lora_modules),
+            device=str(trainer.device),
+        )
 
         # 4. 训练循环
-        config = experiment.config
-        epochs = config.get("training_recipe", {}).get("epochs", 10)
+        state = {
+            "step": 0,
+            "epoch": 0,
+            "trainer": trainer.state_dict(),
+            "early_stopping": early_stopping.state_dict(),
+            "loader": loader.state_dict(),
+            "steps_per_epoch": None,
+            "loss": None,
+            "val_loss": None,
+            "stopped_early": False,
+        }
+
+        # 从最新的有效checkpoint恢复 (worker被杀或超时重试后)
+        resumed = checkpoints.load_latest()
+        if resumed:
+            state = resumed
+            restore_rng_state(state["rng"])
+            trainer.load_state_dict(state["trainer"])
+            early_stopping.load_state_dict(state["early_stopping"])
+            loader.load_state_dict(state["loader"])
+            metrics_writer.truncate_after(state["step"])
+            exp_log.info("training_resumed", step=state["step"], retries=self.request.retries)
+        else:
+            random.seed(config.get("seed", 42))
+            np.random.seed(config.get("seed", 42))
+        if state["steps_per_epoch"]:
+            trainer.total_steps = state["steps_per_epoch"] * epochs
 
-        for epoch in range(epochs):
-            # TODO: 实际训练逻辑
-            # for step, batch in enumerate(dataloader):
-            #     loss = train_step(model, batch)
+        # sweep的子实验: 到达各rung时与同一sweep的其他子实验比较, 落后的提前结束
+        pruner = None
+        if experiment.sweep_id and experiment.sweep.pruner is not None:
+            pruner = SweepPruner(str(experiment.sweep_id), experiment_id, experiment.sweep.pruner)
+            pruner.resume(state["step"])
+
+        def snapshot() -> dict:
+            return {
+                **state,
+                "trainer": trainer.state_dict(),
+                "early_stopping": early_stopping.state_dict(),
+                "rng": capture_rng_state(),
+            }
 
-            # 模拟进度
-            loss = 0.5 - (epoch * 0.03)  # 示例
+        def on_step(epoch: int, metrics: dict) -> bool:
+            """一次参数更新之后: 记录指标, 推送进度, 定期保存checkpoint; 返回是否被剪枝"""
+            step = state["step"] + 1
+            # 只在参数更新的边界记录loader位置, 恢复时不会重复或遗漏micro-batch
+            state.update(step=step, epoch=epoch, loss=metrics["loss"], loader=loader.state_dict())
+            metrics_writer.append(step, metrics)
 
-            # 更新Celery任务状态
             progress = {
                 "experiment_id": experiment_id,
                 "epoch": epoch + 1,
                 "total_epochs": epochs,
-                "loss": loss,
-                "gpu_util": 85.5,  # 示例
+                "step": step,
+                "total_steps": trainer.total_steps,
+                "loss": metrics["loss"],
+                "learning_rate": metrics["learning_rate"],
+                "samples_per_sec": round(metrics["samples_per_sec"], 2),
+                "tokens_per_sec": round(metrics["tokens_per_sec"], 1),
             }
+            # 发布到Redis用于WebSocket推送 (合并+限流), 同时更新Celery任务状态
+            if publisher.publish({"type": "progress", **progress}):
+                self.update_state(state="PROGRESS", meta=progress)
 
-            self.update_state(state="PROGRESS", meta=progress)
+            # 5. 定期保存checkpoint (后台线程写入); 保留最优只看epoch末的验证loss
+            if checkpoint_interval and step % checkpoint_interval == 0:
+                checkpoints.save(step, snapshot())
+                metrics_writer.flush()
 
-            # 发布到Redis用于WebSocket推送
-            # TODO: 实现Redis pub/sub
-            # redis_client.publish(f"experiment:{experiment_id}", json.dumps(progress))
+            return pruner is not None and pruner.observe(step, metrics)
 
-            logger.info("training_progress", **progress)
+        cancelled = pruned = False
+        try:
+            while loader.epoch < epochs and not state["stopped_early"] and not pruned:
+                epoch = loader.epoch
+                epoch_start_step = state["step"]
+                for batch in loader.iter_epoch():
+                    lease.renew()
+                    # step之间检查取消标志; 未完成累积的梯度丢弃, checkpoint停在上一次参数更新
+                    if cancel.is_set():
+                        cancelled = True
+                        break
+                    metrics = trainer.train_batch(batch)
+                    if metrics and on_step(epoch, metrics):
+                        pruned = True
+                        break
+                if cancelled:
+                    exp_log.info("training_cancelled", step=state["step"], reason=cancel.reason)
+                    break
+                if pruned:
+                    exp_log.info("training_pruned", step=state["step"], rung=pruner.rung - 1)
+                    break
+                # epoch末尾不足gradient_accumulation_steps的micro-batch也做一次更新
+                metrics = trainer.finish_accumulation()
+                if metrics and on_step(epoch, metrics):
+                    pruned = True
+                state["loader"] = loader.state_dict()
 
-        # 5. 保存checkpoint
-        checkpoint_path = f"checkpoints/{experiment_id}/final.pt"
-        # TODO: 实际保存逻辑
-        experiment.best_checkpoint_path = checkpoint_path
+                if epoch == 0 and epoch_start_step == 0:
+                    state["steps_per_epoch"] = state["step"]
+                    trainer.total_steps = state["step"] * epochs
 
-        # 6. 更新完成状态
-        experiment.status = "completed"
+                # 验证 + 早停
+                val_loss = trainer.evaluate(val_loader.iter_epoch())
+                lease.renew()
+                if val_loss is not None:
+                    state["val_loss"] = val_loss
+                    metrics_writer.append(state["step"], {"val_loss": val_loss})
+                    state["stopped_early"] = early_stopping.update(val_loss)
+                    if pruner and pruner.observe(state["step"], {"val_loss": val_loss}):
+                        pruned = True
+                checkpoints.save(state["step"], snapshot(), metric=val_loss)
+                metrics_writer.flush()
+                # 最优checkpoint由后台线程写入后更新, 等待这次写入完成再读取
+                checkpoints.wait()
+                experiment.best_checkpoint_path = checkpoints.best_path
+                exp_log.info(
+                    "epoch_completed",
+                    epoch=epoch + 1,
+                    step=state["step"],
+                    loss=state["loss"],
+                    val_loss=val_loss,
+                )
+                if state["stopped_early"]:
+                    exp_log.info(
+                        "early_stopping", epoch=epoch + 1, best_val_loss=early_stopping.best
+                    )
+                if pruned:
+                    exp_log.info("training_pruned", step=state["step"], rung=pruner.rung - 1)
+
+        except SoftTimeLimitExceeded:
+            # 即将达到硬超时: 同步保存checkpoint后重试, 新的执行从该checkpoint继续
+            # (未完成累积的梯度丢弃, 恢复后从上一次参数更新的位置重新读取)
+            metrics_writer.flush()
+            checkpoints.save(state["step"], snapshot(), blocking=True)
+            exp_log.warning("training_time_limit_checkpoint", step=state["step"])
+            raise self.retry(countdown=5)
+
+        # 最终checkpoint (取消/剪枝时同样保存, 已完成的训练不会丢失)
+        metrics_writer.flush()
+        final_path = checkpoints.save(
+            state["step"],
+            snapshot(),
+            # 中途结束时的参数没有对应的验证loss, 不参与最优checkpoint的比较
+            metric=None if cancelled or pruned else state["val_loss"],
+            blocking=True,
+        )
+        experiment.best_checkpoint_path = checkpoints.best_path or str(final_path)
+        loss = state["loss"]
+
+        # 6. 更新完成状态 (取消/剪枝时记录截至当前的部分指标)
+        status = "stopped" if cancelled else "pruned" if pruned else "completed"
+        experiment.status = status
         experiment.completed_at = datetime.utcnow()
         experiment.metrics = {
-            "final_loss": float(loss),
-            "epochs_completed": epochs,
+            "final_loss": loss,
+            "best_val_loss": early_stopping.best,
+            "epochs_completed": loader.epoch,
+            "steps_completed": state["step"],
+            "stopped_early": state["stopped_early"],
         }
+        if cancelled:
+            experiment.metrics["cancel_reason"] = cancel.reason
+        if cancelled or pruned:
+            experiment.metrics["partial"] = True
         db.commit()
+        invalidate_tags("experiments")
+
+        publisher.publish(
+            {"type": "status", "status": status, "metrics": experiment.metrics}, force=True
+        )
 
-        logger.info("training_completed", experiment_id=experiment_id)
+        exp_log.info(f"training_{status}", metrics=experiment.metrics)
+        logger.info(f"training_{status}", experiment_id=experiment_id)
+        if cancelled:
+            clear_cancel(experiment_id)
+        _release_resources(experiment_id, experiment.sweep_id)
 
-        # 7. 触发评测任务
-        # from app.tasks.evaluation import evaluate_model
-        # evaluate_model.delay(experiment_id)
+        # 7. 流水线: 评测 (两个track并行) -> 报告
+        _continue_pipeline(experiment)
 
-        return {"status": "completed", "experiment_id": experiment_id}
+        return {"status": status, "experiment_id": experiment_id}
+
+    except Retry:
+        raise
+
+    except LeaseLost as e:
+        # 其他执行者已接手 (本进程长时间未能续期), 由它写入状态和checkpoint
+        logger.error("training_lease_lost", experiment_id=experiment_id, holder=str(e))
+        return {"status": "lease_lost", "experiment_id": experiment_id}
 
     except Exception as e:
         logger.error("training_failed", experiment_id=experiment_id, error=str(e))
+        exp_log.error("training_failed", error=str(e))
 
         # 更新失败状态
         experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
         if experiment:
             experiment.status = "failed"
             db.commit()
+            invalidate_tags("experiments")
+        publisher.publish({"type": "status", "status": "failed", "error": str(e)}, force=True)
+        _release_resources(experiment_id, experiment.sweep_id if experiment else None)
+        if experiment:
+            _continue_pipeline(experiment)
 
         raise
 
     finally:
+        for data_loader in (loader, val_loader):
+            if data_loader is not None:
+                data_loader.close()
+        checkpoints.close()
+        log_writer.close()
         db.close()
+        lease.release()
@@ -0,0 +1,279 @@
+"""
+训练Checkpoint - 原子写入与恢复
+
+文件格式: MAGIC(8字节) + sha256(32字节) + pickle数据。
+先写临时文件并fsync, 再rename为正式文件名, 读取时校验摘要,
+因此进程在任意时刻被杀都不会留下被误认为有效的checkpoint。
+写盘在后台线程进行, 训练循环只负责把状态快照到主机内存。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import queue
+import random
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+MAGIC = b"VTCKPT01"
+_CHECKPOINT_NAME = re.compile(r"^step-(\d+)\.ckpt$")
+
+
+def checkpoint_dir(experiment_id: str) -> Path:
+    """实验的checkpoint目录"""
+    return Path(settings.CHECKPOINT_DIR) / str(experiment_id)
+
+
+def capture_rng_state() -> Dict[str, Any]:
+    """记录python/numpy/torch的随机数状态"""
+    state: Dict[str, Any] = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+    }
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        state["torch"] = torch.get_rng_state()
+        if torch.cuda.is_available():
+            state["torch_cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state: Dict[str, Any]) -> None:
+    """恢复随机数状态"""
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch = sys.modules.get("torch")
+    if torch is not None and "torch" in state:
+        torch.set_rng_state(state["torch"])
+        if "torch_cuda" in state and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(state["torch_cuda"])
+
+
+def write_atomic(path: Path, payload: bytes, with_header: bool = True) -> None:
+    """写临时文件 -> fsync -> rename -> fsync目录"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        if with_header:
+            f.write(MAGIC)
+            f.write(hashlib.sha256(payload).digest())
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def read_checkpoint(path: Path) -> Dict[str, Any]:
+    """读取并校验checkpoint, 文件损坏时抛出ValueError"""
+    data = path.read_bytes()
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"Invalid checkpoint header: {path}")
+    digest = data[len(MAGIC) : len(MAGIC) + 32]
+    payload = data[len(MAGIC) + 32 :]
+    if hashlib.sha256(payload).digest() != digest:
+        raise ValueError(f"Checkpoint checksum mismatch: {path}")
+    return pickle.loads(payload)
+
+
+def list_checkpoints(directory: Path) -> List[Tuple[int, Path]]:
+    """按step升序列出checkpoint文件"""
+    if not directory.is_dir():
+        return []
+    found = []
+    for path in directory.iterdir():
+        match = _CHECKPOINT_NAME.match(path.name)
+        if match:
+            found.append((int(match.group(1)), path))
+    return sorted(found)
+
+
+def snapshot_state(obj: Any) -> Any:
+    """
+    复制状态到主机内存
+
+    torch张量会detach并拷贝到CPU, numpy数组会复制;
+    之后训练继续修改参数也不会影响正在后台写入的快照。
+    """
+    if isinstance(obj, dict):
+        return {k: snapshot_state(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [snapshot_state(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(snapshot_state(v) for v in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    torch = sys.modules.get("torch")
+    if torch is not None and isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    return obj
+
+
+class CheckpointWriter:
+    """
+    异步Checkpoint写入器
+
+    save() 只在调用线程中把状态快照到主机内存, 序列化和写盘由后台线程完成。
+    写入完成后按保留策略清理: 保留最近keep_last个 + 验证指标最好的keep_best个。
+    保留信息记录在 manifest.json 中, 其中best即为best_checkpoint_path。
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        keep_last: Optional[int] = None,
+        keep_best: Optional[int] = None,
+        mode: str = "min",
+    ):
+        self.experiment_id = experiment_id
+        self.directory = checkpoint_dir(experiment_id)
+        self.keep_last = settings.CHECKPOINT_KEEP_LAST if keep_last is None else keep_last
+        self.keep_best = settings.CHECKPOINT_KEEP_BEST if keep_best is None else keep_best
+        self.mode = mode
+        self.manifest = self._load_manifest()
+
+        # 队列长度为1: 最多一个写入中 + 一个等待中, 再多则save()阻塞形成背压
+        self._queue: "queue.Queue" = queue.Queue(maxsize=1)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def path_for(self, step: int) -> Path:
+        return self.directory / f"step-{step:08d}.ckpt"
+
+    @property
+    def best_path(self) -> Optional[str]:
+        """
+        已写入的checkpoint中最优的路径
+
+        manifest在后台线程写入后更新, save()之后需要先wait()才包含这次保存。
+        """
+        return self.manifest.get("best")
+
+    def save(
+        self,
+        step: int,
+        state: Dict[str, Any],
+        metric: Optional[float] = None,
+        blocking: bool = False,
+    ) -> Path:
+        """保存checkpoint, metric为验证指标(用于keep-best)"""
+        self._raise_pending_error()
+        self._queue.put((step, snapshot_state(state), metric))
+        if blocking:
+            self.wait()
+        return self.path_for(step)
+
+    def wait(self) -> None:
+        """等待队列中的写入全部完成"""
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self) -> None:
+        """等待后台写入结束并停止后台线程, 写入失败只记录日志 (用于清理阶段)"""
+        try:
+            self.wait()
+        except Exception as e:
+            logger.error("checkpoint_write_failed", experiment_id=self.experiment_id, error=str(e))
+        self._queue.put(None)
+        self._thread.join()
+
+    def _raise_pending_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            step, state, metric = item
+            try:
+                self._write(step, state, metric)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, step: int, state: Dict[str, Any], metric: Optional[float]) -> None:
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self.path_for(step)
+        write_atomic(path, payload)
+
+        entries = [e for e in self.manifest["checkpoints"] if e["step"] != step]
+        entries.append({"step": step, "path": str(path), "metric": metric})
+        self.manifest = self._apply_retention(entries)
+        write_atomic(
+            self.directory / "manifest.json",
+            json.dumps(self.manifest).encode(),
+            with_header=False,
+        )
+
+        logger.info(
+            "checkpoint_saved",
+            experiment_id=self.experiment_id,
+            step=step,
+            size=len(payload),
+            metric=metric,
+        )
+
+    def _apply_retention(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """保留最近N个和指标最好的K个, 删除其余文件"""
+        entries.sort(key=lambda e: e["step"])
+        keep = {e["step"] for e in entries[-self.keep_last :]} if self.keep_last else set()
+
+        scored = [e for e in entries if e["metric"] is not None]
+        scored.sort(key=lambda e: e["metric"], reverse=self.mode == "max")
+        keep |= {e["step"] for e in scored[: self.keep_best]}
+        # best只指向保留下来的文件 (keep_best=0时为保留的checkpoint中指标最好的)
+        best = next((e["path"] for e in scored if e["step"] in keep), None)
+
+        kept = []
+        for entry in entries:
+            if entry["step"] in keep:
+                kept.append(entry)
+                continue
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+
+        return {"checkpoints": kept, "best": best}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.directory / "manifest.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return {"checkpoints": [], "best": None}
+
+    def load_latest(self) -> Optional[Dict[str, Any]]:
+        """加载最新的有效checkpoint, 跳过损坏或未写完的文件"""
+        for step, path in reversed(list_checkpoints(self.directory)):
+            try:
+                state = read_checkpoint(path)
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning(
+                    "checkpoint_invalid", experiment_id=self.experiment_id, step=step, error=str(e)
+                )
+                continue
+            logger.info("checkpoint_loaded", experiment_id=self.experiment_id, step=step)
+            return state
+        return None
@@ -0,0 +1,407 @@
+"""
+训练数据加载 - 流式读取数据集文件
+
+数据集为JSONL, 每行 {"source": "...", "target": "..."}。
+处理流程: 逐行读取 -> 有界shuffle buffer -> 后台进程分词 -> 按token预算组batch -> 预取队列。
+内存占用只与buffer/窗口/预取大小有关, 与数据集大小无关。
+"""
+
+import json
+import queue
+import random
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import billiard
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.utils.prompt_template import CompiledTemplate
+
+logger = structlog.get_logger()
+
+IGNORE_INDEX = -100
+DEFAULT_PROMPT_TEMPLATE = "{{text}}\n"
+
+# (input_ids, prompt_len)
+TokenizedExample = Tuple[List[int], int]
+
+
+class ByteTokenizer:
+    """UTF-8字节级分词器, 不依赖外部模型文件 (用于小模型和测试)"""
+
+    name = "byte"
+    pad_token_id = 0
+    eos_token_id = 1
+    offset = 3
+    vocab_size = 256 + offset
+
+    def encode(self, text: str) -> List[int]:
+        return [b + self.offset for b in text.encode("utf-8")]
+
+    def decode(self, ids: List[int]) -> str:
+        return bytes(i - self.offset for i in ids if i >= self.offset).decode("utf-8", "replace")
+
+
+class HFTokenizer:
+    """transformers分词器的简单封装"""
+
+    def __init__(self, name: str):
+        from transformers import AutoTokenizer
+
+        self.name = name
+        self._tokenizer = AutoTokenizer.from_pretrained(name)
+        self.eos_token_id = self._tokenizer.eos_token_id
+        self.pad_token_id = (
+            self._tokenizer.pad_token_id
+            if self._tokenizer.pad_token_id is not None
+            else self.eos_token_id
+        )
+        self.vocab_size = len(self._tokenizer)
+
+    def encode(self, text: str) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, ids: List[int]) -> str:
+        return self._tokenizer.decode(ids, skip_special_tokens=True)
+
+
+def load_tokenizer(name: Optional[str]) -> Any:
+    """根据名称加载分词器, 未指定或为"byte"时使用字节级分词器"""
+    if not name or name == ByteTokenizer.name:
+        return ByteTokenizer()
+    return HFTokenizer(name)
+
+
+# ---- 分词worker进程 ----
+
+_worker_tokenizer: Any = None
+_worker_template: Optional[CompiledTemplate] = None
+_worker_max_len: int = 0
+
+
+def _init_worker(tokenizer_name: Optional[str], prompt_template: str, max_seq_len: int) -> None:
+    global _worker_tokenizer, _worker_template, _worker_max_len
+    _worker_tokenizer = load_tokenizer(tokenizer_name)
+    _worker_template = CompiledTemplate(prompt_template)
+    _worker_max_len = max_seq_len
+
+
+def tokenize_example(
+    tokenizer: Any, template: CompiledTemplate, max_seq_len: int, example: Dict[str, Any]
+) -> TokenizedExample:
+    """prompt + target + eos, 超长时从target末尾截断"""
+    prompt_ids = tokenizer.encode(template.render({"text": example["source"], **example}))
+    target_ids = tokenizer.encode(example["target"]) + [tokenizer.eos_token_id]
+    input_ids = (prompt_ids + target_ids)[:max_seq_len]
+    return input_ids, min(len(prompt_ids), len(input_ids))
+
+
+def _tokenize_in_worker(example: Dict[str, Any]) -> TokenizedExample:
+    return tokenize_example(_worker_tokenizer, _worker_template, _worker_max_len, example)
+
+
+# ---- 读取与shuffle ----
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取JSONL, 跳过空行"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def shuffle_buffer(items: Iterator[Any], buffer_size: int, rng: random.Random) -> Iterator[Any]:
+    """有界shuffle: buffer满后每读入一条就随机输出一条"""
+    buffer: List[Any] = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def collate(examples: List[TokenizedExample], pad_token_id: int) -> Dict[str, Any]:
+    """pad为矩形数组, prompt与padding部分的label为IGNORE_INDEX"""
+    max_len = max(len(ids) for ids, _ in examples)
+    input_ids = np.full((len(examples), max_len), pad_token_id, dtype=np.int64)
+    labels = np.full((len(examples), max_len), IGNORE_INDEX, dtype=np.int64)
+    attention_mask = np.zeros((len(examples), max_len), dtype=np.int64)
+    for row, (ids, prompt_len) in enumerate(examples):
+        input_ids[row, : len(ids)] = ids
+        labels[row, prompt_len : len(ids)] = ids[prompt_len:]
+        attention_mask[row, : len(ids)] = 1
+
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "labels": labels,
+        "num_examples": len(examples),
+        "num_tokens": int(attention_mask.sum()),
+    }
+
+
+def token_budget_batches(
+    examples: Iterator[TokenizedExample], max_tokens: int, max_batch_size: Optional[int] = None
+) -> Iterator[List[TokenizedExample]]:
+    """按token预算组batch: batch内 最长序列长度 x 条数 不超过max_tokens"""
+    batch: List[TokenizedExample] = []
+    longest = 0
+    for example in examples:
+        length = len(example[0])
+        new_longest = max(longest, length)
+        too_many = max_batch_size is not None and len(batch) >= max_batch_size
+        if batch and (new_longest * (len(batch) + 1) > max_tokens or too_many):
+            yield batch
+            batch, new_longest = [], length
+        batch.append(example)
+        longest = new_longest
+    if batch:
+        yield batch
+
+
+def in_validation_split(index: int, validation_split: float) -> bool:
+    """按样本下标确定性地划分验证集: 每 1/validation_split 条取一条"""
+    if validation_split <= 0:
+        return False
+    stride = max(int(round(1 / validation_split)), 2)
+    return index % stride == stride - 1
+
+
+_END_OF_EPOCH = object()
+
+
+class StreamingDataLoader:
+    """
+    流式训练数据加载器
+
+    - shuffle由 (seed, epoch) 决定, 重复运行得到相同顺序
+    - 分词在后台进程池中按窗口并行, 窗口外的数据不会被提前读入
+    - 后台线程预取prefetch个batch, 训练step不等待I/O
+    - 传入token_cache (预分词数据集) 时直接按下标读取, 不再分词
+    - validation_split > 0 时按下标划分训练/验证集, split选择使用哪一部分
+    - state_dict()/load_state_dict() 记录当前epoch内已消费的样本数, 用于checkpoint恢复
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tokenizer_name: Optional[str] = None,
+        prompt_template: Optional[str] = None,
+        seed: int = 42,
+        max_tokens: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        max_seq_len: Optional[int] = None,
+        shuffle_buffer_size: Optional[int] = None,
+        num_workers: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        token_cache: Any = None,
+        validation_split: float = 0.0,
+        split: str = "train",
+    ):
+        self.path = path
+        self.tokenizer_name = tokenizer_name
+        self.prompt_template = prompt_template or DEFAULT_PROMPT_TEMPLATE
+        self.seed = seed
+        self.max_tokens = max_tokens or settings.DATALOADER_MAX_TOKENS
+        self.max_batch_size = max_batch_size
+        self.max_seq_len = max_seq_len or settings.DATALOADER_MAX_SEQ_LEN
+        self.shuffle_buffer_size = shuffle_buffer_size or settings.DATALOADER_SHUFFLE_BUFFER
+        self.num_workers = settings.DATALOADER_NUM_WORKERS if num_workers is None else num_workers
+        self.prefetch = prefetch or settings.DATALOADER_PREFETCH
+        self.token_cache = token_cache
+        self.validation_split = validation_split
+        if split not in ("train", "validation"):
+            raise ValueError(f"Unknown split: {split}")
+        self.split = split
+
+        self.tokenizer = load_tokenizer(tokenizer_name)
+        self.epoch = 0
+        self.position = 0  # 当前epoch内已交给训练循环的样本数
+
+        self._pool = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---- checkpoint ----
+
+    def state_dict(self) -> Dict[str, int]:
+        return {"epoch": self.epoch, "position": self.position}
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.epoch = state.get("epoch", 0)
+        self.position = state.get("position", 0)
+
+    # ---- 数据管道 ----
+
+    def _in_split(self, index: int) -> bool:
+        return in_validation_split(index, self.validation_split) == (self.split == "validation")
+
+    def num_examples(self) -> int:
+        """当前split的样本数"""
+        if self.token_cache is not None:
+            total = len(self.token_cache)
+        else:
+            total = count_examples(self.path)
+        validation = (
+            total // max(int(round(1 / self.validation_split)), 2)
+            if self.validation_split > 0
+            else 0
+        )
+        return validation if self.split == "validation" else total - validation
+
+    def _shuffled(self, epoch: int) -> Iterator[Dict[str, Any]]:
+        rng = random.Random(self.seed * 1_000_003 + epoch)
+        examples = (e for i, e in enumerate(iter_jsonl(self.path)) if self._in_split(i))
+        return shuffle_buffer(examples, self.shuffle_buffer_size, rng)
+
+    def _tokenized(self, examples: Iterator[Dict[str, Any]]) -> Iterator[TokenizedExample]:
+        """按窗口提交到进程池, 同时最多两个窗口在处理中"""
+        if not self.num_workers:
+            template = CompiledTemplate(self.prompt_template)
+            for example in examples:
+                yield tokenize_example(self.tokenizer, template, self.max_seq_len, example)
+            return
+
+        window_size = self.num_workers * settings.DATALOADER_WORKER_CHUNK * 4
+        pending: List[Any] = []
+        while True:
+            window = [e for _, e in zip(range(window_size), examples)]
+            if window:
+                pending.append(
+                    self._pool.map_async(
+                        _tokenize_in_worker, window, chunksize=settings.DATALOADER_WORKER_CHUNK
+                    )
+                )
+            if not pending:
+                return
+            if len(pending) >= 2 or not window:
+                yield from pending.pop(0).get()
+
+    def _examples(self, epoch: int, skip: int) -> Iterator[TokenizedExample]:
+        """跳过已消费的样本 (在分词之前跳过, 恢复时开销很小)"""
+        if self.token_cache is not None:
+            # 对下标做shuffle, 与逐行读取时的顺序相同
+            rng = random.Random(self.seed * 1_000_003 + epoch)
+            indices = shuffle_buffer(
+                (i for i in range(len(self.token_cache)) if self._in_split(i)),
+                self.shuffle_buffer_size,
+                rng,
+            )
+            for _ in zip(range(skip), indices):
+                pass
+            return (self.token_cache[i] for i in indices)
+
+        shuffled = self._shuffled(epoch)
+        for _ in zip(range(skip), shuffled):
+            pass
+        return self._tokenized(shuffled)
+
+    def _produce(self, out: "queue.Queue", epoch: int, skip: int) -> None:
+        """后台线程: 组batch并放入预取队列"""
+        try:
+            position = skip
+            batches = token_budget_batches(
+                self._examples(epoch, skip), self.max_tokens, self.max_batch_size
+            )
+            for examples in batches:
+                if self._stop.is_set():
+                    return
+                batch = collate(examples, self.tokenizer.pad_token_id)
+                position += len(examples)
+                batch["position"] = position
+                out.put(batch)
+            out.put(_END_OF_EPOCH)
+        except BaseException as e:
+            out.put(e)
+
+    def _start_pool(self) -> None:
+        if self.num_workers and self.token_cache is None and self._pool is None:
+            self._pool = billiard.Pool(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(self.tokenizer_name, self.prompt_template, self.max_seq_len),
+            )
+
+    def iter_epoch(self) -> Iterator[Dict[str, Any]]:
+        """迭代当前epoch剩余的batch, 结束后epoch加1且position归零"""
+        self._start_pool()
+        self._stop.clear()
+        out: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        self._thread = threading.Thread(
+            target=self._produce, args=(out, self.epoch, self.position), daemon=True
+        )
+        self._thread.start()
+
+        try:
+            while True:
+                item = out.get()
+                if item is _END_OF_EPOCH:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self.position = item["position"]
+                yield item
+        finally:
+            self._stop.set()
+            # 排空队列, 让生产线程从阻塞的put中退出
+            while self._thread.is_alive():
+                try:
+                    out.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._thread = None
+
+        self.epoch += 1
+        self.position = 0
+
+    def close(self) -> None:
+        """关闭分词进程池"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def count_examples(path: str) -> int:
+    """统计样本数 (流式, 用于计算总step数的估计)"""
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def build_loader_from_experiment(
+    dataset_path: str,
+    config: Dict[str, Any],
+    tokenizer_name: Optional[str],
+    prompt_template: Optional[str] = None,
+    **kwargs: Any,
+) -> StreamingDataLoader:
+    """根据实验配置创建数据加载器, 启用TOKEN_CACHE时使用预分词缓存"""
+    # token_cache依赖本模块的分词函数, 在此处导入避免循环引用
+    from app.training import token_cache
+
+    recipe = config.get("training_recipe", {})
+    cache = None
+    if settings.TOKEN_CACHE_ENABLED:
+        cache = token_cache.get_or_build(
+            dataset_path, tokenizer_name, prompt_template, recipe.get("max_seq_len")
+        )
+    return StreamingDataLoader(
+        dataset_path,
+        tokenizer_name=tokenizer_name,
+        prompt_template=prompt_template,
+        seed=config.get("seed", 42),
+        max_tokens=recipe.get("max_tokens_per_batch"),
+        max_batch_size=recipe.get("batch_size"),
+        max_seq_len=recipe.get("max_seq_len"),
+        token_cache=cache,
+        validation_split=recipe.get("validation_split", 0.0),
+        **kwargs,
+    )
@@ -0,0 +1,319 @@
+"""
+LoRA训练引擎
+
+- 梯度累积: 每个loader batch为一个micro-batch, 累积gradient_accumulation_steps个后更新一次
+- 混合精度: CUDA上使用autocast (支持时bf16, 否则fp16 + GradScaler), CPU上使用fp32
+- 学习率: warmup_steps内线性升温, 之后余弦衰减到峰值的10%
+- 早停: 验证loss连续early_stopping_patience次没有改善时停止
+
+本模块依赖torch, 只在训练worker中导入 (可选依赖 `pip install .[train]`)。
+"""
+
+import math
+import resource
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import torch
+from torch import nn
+from torch.nn import functional as F
+
+from app.training.data import IGNORE_INDEX
+from app.training.lora import apply_lora, load_lora_state_dict, lora_state_dict
+
+DEFAULT_TARGET_MODULES = ("q_proj", "v_proj")
+TINY_MODEL_PATH = "tiny"
+MIN_LR_RATIO = 0.1
+
+
+class TinyAttention(nn.Module):
+    def __init__(self, hidden_size: int, num_heads: int):
+        super().__init__()
+        self.num_heads = num_heads
+        self.q_proj = nn.Linear(hidden_size, hidden_size)
+        self.k_proj = nn.Linear(hidden_size, hidden_size)
+        self.v_proj = nn.Linear(hidden_size, hidden_size)
+        self.o_proj = nn.Linear(hidden_size, hidden_size)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        batch, length, hidden = x.shape
+        shape = (batch, length, self.num_heads, hidden // self.num_heads)
+        q, k, v = (
+            proj(x).view(shape).transpose(1, 2) for proj in (self.q_proj, self.k_proj, self.v_proj)
+        )
+        # 右侧padding, 因果mask已保证有效位置看不到padding
+        out = F.scaled_dot_product_attention(q, k, v, is_causal=True)
+        return self.o_proj(out.transpose(1, 2).reshape(batch, length, hidden))
+
+
+class TinyBlock(nn.Module):
+    def __init__(self, hidden_size: int, num_heads: int):
+        super().__init__()
+        self.attn_norm = nn.LayerNorm(hidden_size)
+        self.attn = TinyAttention(hidden_size, num_heads)
+        self.mlp_norm = nn.LayerNorm(hidden_size)
+        self.up_proj = nn.Linear(hidden_size, hidden_size * 4)
+        self.down_proj = nn.Linear(hidden_size * 4, hidden_size)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = x + self.attn(self.attn_norm(x))
+        return x + self.down_proj(F.gelu(self.up_proj(self.mlp_norm(x))))
+
+
+class TinyCausalLM(nn.Module):
+    """
+    小型decoder-only语言模型
+
+    模块命名与常见LLM一致 (q_proj/v_proj/up_proj/down_proj), LoRA的target_modules可以通用。
+    用于CPU上的端到端验证和冒烟测试。
+    """
+
+    def __init__(
+        self,
+        vocab_size: int,
+        hidden_size: int = 64,
+        num_layers: int = 2,
+        num_heads: int = 4,
+        max_seq_len: int = 512,
+    ):
+        super().__init__()
+        self.embed_tokens = nn.Embedding(vocab_size, hidden_size)
+        self.embed_positions = nn.Embedding(max_seq_len, hidden_size)
+        self.layers = nn.ModuleList(TinyBlock(hidden_size, num_heads) for _ in range(num_layers))
+        self.norm = nn.LayerNorm(hidden_size)
+        self.lm_head = nn.Linear(hidden_size, vocab_size, bias=False)
+
+    def forward(
+        self, input_ids: torch.Tensor, attention_mask: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        positions = torch.arange(input_ids.shape[1], device=input_ids.device)
+        x = self.embed_tokens(input_ids) + self.embed_positions(positions)
+        for layer in self.layers:
+            x = layer(x)
+        return self.lm_head(self.norm(x))
+
+
+def load_base_model(
+    metadata: Dict[str, Any], vocab_size: int, max_seq_len: int, seed: int = 42
+) -> nn.Module:
+    """
+    加载基座模型
+
+    metadata.model_path 为transformers模型名或本地路径; 未指定或为"tiny"时
+    按metadata.architecture构建TinyCausalLM (随机初始化由seed决定, 恢复训练时可以重建)。
+    """
+    model_path = metadata.get("model_path") or TINY_MODEL_PATH
+    if model_path == TINY_MODEL_PATH:
+        torch.manual_seed(seed)
+        architecture = metadata.get("architecture", {})
+        return TinyCausalLM(vocab_size, max_seq_len=max_seq_len, **architecture)
+
+    from transformers import AutoModelForCausalLM
+
+    return AutoModelForCausalLM.from_pretrained(model_path)
+
+
+def resolve_device(name: str = "auto") -> torch.device:
+    if name == "auto":
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return torch.device(name)
+
+
+def _memory_mb(device: torch.device) -> float:
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    # Linux下ru_maxrss单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class EarlyStopping:
+    """验证loss连续patience次没有改善min_delta以上时触发"""
+
+    def __init__(self, patience: Optional[int], min_delta: float = 0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best: Optional[float] = None
+        self.bad_evals = 0
+
+    def update(self, value: float) -> bool:
+        """记录一次验证结果, 返回是否应停止"""
+        if self.best is None or value < self.best - self.min_delta:
+            self.best = value
+            self.bad_evals = 0
+        else:
+            self.bad_evals += 1
+        return bool(self.patience) and self.bad_evals >= self.patience
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"best": self.best, "bad_evals": self.bad_evals}
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        self.best = state["best"]
+        self.bad_evals = state["bad_evals"]
+
+
+class LoRATrainer:
+    """
+    LoRA训练器
+
+    train_batch() 每处理一个micro-batch调用一次, 完成一次参数更新时返回该step的指标,
+    指标名与 metrics_service.DEFAULT_SERIES 一致。
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        recipe: Dict[str, Any],
+        total_steps: int,
+        device: Optional[torch.device] = None,
+    ):
+        self.device = device or resolve_device()
+        lora = recipe.get("lora_config") or {}
+        self.lora_modules = apply_lora(
+            model,
+            r=lora.get("r", 8),
+            alpha=lora.get("alpha", 16),
+            dropout=lora.get("dropout", 0.0),
+            target_modules=lora.get("target_modules") or DEFAULT_TARGET_MODULES,
+        )
+        self.model = model.to(self.device)
+
+        self.learning_rate = recipe.get("learning_rate", 1e-4)
+        self.warmup_steps = recipe.get("warmup_steps", 0)
+        self.total_steps = max(total_steps, 1)
+        self.accumulation = max(recipe.get("gradient_accumulation_steps", 1), 1)
+        self.max_grad_norm = recipe.get("max_grad_norm", 1.0)
+
+        params = [p for p in self.model.parameters() if p.requires_grad]
+        optimizer = recipe.get("optimizer", "adamw")
+        if optimizer == "adamw":
+            self.optimizer = torch.optim.AdamW(
+                params, lr=self.learning_rate, weight_decay=recipe.get("weight_decay", 0.0)
+            )
+        elif optimizer == "sgd":
+            self.optimizer = torch.optim.SGD(params, lr=self.learning_rate, momentum=0.9)
+        else:
+            raise ValueError(f"Unsupported optimizer: {optimizer}")
+        self.scheduler = torch.optim.lr_scheduler.LambdaLR(self.optimizer, self._lr_lambda)
+
+        self.autocast_dtype = None
+        if self.device.type == "cuda" and recipe.get("mixed_precision", True):
+            self.autocast_dtype = (
+                torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            )
+        self.scaler = torch.cuda.amp.GradScaler(enabled=self.autocast_dtype == torch.float16)
+
+        self._reset_window()
+
+    def _lr_lambda(self, step: int) -> float:
+        if step < self.warmup_steps:
+            return (step + 1) / self.warmup_steps
+        decay_steps = max(self.total_steps - self.warmup_steps, 1)
+        progress = min((step - self.warmup_steps) / decay_steps, 1.0)
+        return MIN_LR_RATIO + (1 - MIN_LR_RATIO) * 0.5 * (1 + math.cos(math.pi * progress))
+
+    def _reset_window(self) -> None:
+        self._micro_batches = 0
+        self._loss_sum = 0.0
+        self._samples = 0
+        self._tokens = 0
+        self._window_start = time.perf_counter()
+
+    def _autocast(self) -> Any:
+        if self.autocast_dtype is None:
+            return nullcontext()
+        return torch.autocast(self.device.type, dtype=self.autocast_dtype)
+
+    def _loss(self, batch: Dict[str, Any]) -> Tuple[torch.Tensor, int]:
+        """下一个token预测的交叉熵, 返回 (loss总和, 参与计算的token数)"""
+        input_ids = torch.from_numpy(batch["input_ids"]).to(self.device, non_blocking=True)
+        attention_mask = torch.from_numpy(batch["attention_mask"]).to(
+            self.device, non_blocking=True
+        )
+        labels = torch.from_numpy(batch["labels"]).to(self.device, non_blocking=True)
+
+        with self._autocast():
+            output = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            logits = output.logits if hasattr(output, "logits") else output
+        logits = logits[:, :-1].float()
+        targets = labels[:, 1:]
+        loss_sum = F.cross_entropy(
+            logits.reshape(-1, logits.shape[-1]),
+            targets.reshape(-1),
+            ignore_index=IGNORE_INDEX,
+            reduction="sum",
+        )
+        return loss_sum, int((targets != IGNORE_INDEX).sum())
+
+    def train_batch(self, batch: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """处理一个micro-batch, 完成参数更新时返回指标"""
+        self.model.train()
+        loss_sum, count = self._loss(batch)
+        if count:
+            loss = loss_sum / count
+            self.scaler.scale(loss / self.accumulation).backward()
+            self._loss_sum += float(loss.detach())
+
+        self._micro_batches += 1
+        self._samples += batch["num_examples"]
+        self._tokens += batch["num_tokens"]
+        if self._micro_batches < self.accumulation:
+            return None
+        return self._optimizer_step()
+
+    def finish_accumulation(self) -> Optional[Dict[str, float]]:
+        """对尚未凑满gradient_accumulation_steps的micro-batch执行一次更新 (epoch末尾调用)"""
+        if not self._micro_batches:
+            return None
+        return self._optimizer_step()
+
+    def _optimizer_step(self) -> Dict[str, float]:
+        learning_rate = self.scheduler.get_last_lr()[0]
+        self.scaler.unscale_(self.optimizer)
+        grad_norm = torch.nn.utils.clip_grad_norm_(
+            [p for p in self.model.parameters() if p.requires_grad], self.max_grad_norm
+        )
+        self.scaler.step(self.optimizer)
+        self.scaler.update()
+        self.optimizer.zero_grad(set_to_none=True)
+        self.scheduler.step()
+
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        elapsed = max(time.perf_counter() - self._window_start, 1e-9)
+        metrics = {
+            "loss": self._loss_sum / self._micro_batches,
+            "learning_rate": learning_rate,
+            "grad_norm": float(grad_norm),
+            "samples_per_sec": self._samples / elapsed,
+            "tokens_per_sec": self._tokens / elapsed,
+            "memory_mb": _memory_mb(self.device),
+        }
+        self._reset_window()
+        return metrics
+
+    @torch.no_grad()
+    def evaluate(self, batches: Iterable[Dict[str, Any]]) -> Optional[float]:
+        """按token加权的平均loss, 没有验证数据时返回None"""
+        self.model.eval()
+        total, count = 0.0, 0
+        for batch in batches:
+            loss_sum, n = self._loss(batch)
+            total += float(loss_sum)
+            count += n
+        return total / count if count else None
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {
+            "lora": lora_state_dict(self.model),
+            "optimizer": self.optimizer.state_dict(),
+            "scheduler": self.scheduler.state_dict(),
+            "scaler": self.scaler.state_dict(),
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        load_lora_state_dict(self.model, state["lora"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.scheduler.load_state_dict(state["scheduler"])
+        self.scaler.load_state_dict(state["scaler"])
@@ -0,0 +1,79 @@
+"""
+LoRA适配层
+
+将目标nn.Linear替换为 W x + (alpha / r) * B A dropout(x),
+基座权重冻结, 只训练A/B两个低秩矩阵。B初始化为0, 训练开始时输出与基座模型一致。
+"""
+
+import math
+from typing import Any, Dict, Iterable, List
+
+import torch
+from torch import nn
+
+
+class LoRALinear(nn.Module):
+    """带LoRA旁路的Linear层"""
+
+    def __init__(self, base: nn.Linear, r: int, alpha: float, dropout: float = 0.0):
+        super().__init__()
+        if r <= 0:
+            raise ValueError(f"LoRA rank must be positive, got {r}")
+        self.base = base
+        self.r = r
+        self.scaling = alpha / r
+        self.dropout = nn.Dropout(dropout) if dropout else nn.Identity()
+
+        factory = {"device": base.weight.device, "dtype": base.weight.dtype}
+        self.lora_A = nn.Parameter(torch.empty(r, base.in_features, **factory))
+        self.lora_B = nn.Parameter(torch.zeros(base.out_features, r, **factory))
+        nn.init.kaiming_uniform_(self.lora_A, a=math.sqrt(5))
+
+        for param in self.base.parameters():
+            param.requires_grad = False
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        update = self.dropout(x) @ self.lora_A.t() @ self.lora_B.t()
+        return self.base(x) + update * self.scaling
+
+
+def apply_lora(
+    model: nn.Module,
+    r: int = 8,
+    alpha: float = 16,
+    dropout: float = 0.0,
+    target_modules: Iterable[str] = ("q_proj", "v_proj"),
+) -> List[str]:
+    """
+    替换名称以target_modules结尾的Linear层, 并冻结其余所有参数
+
+    返回被替换的模块名; 没有匹配到任何模块时抛出ValueError。
+    """
+    targets = tuple(target_modules)
+    for param in model.parameters():
+        param.requires_grad = False
+
+    replaced = []
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            full_name = f"{name}.{child_name}" if name else child_name
+            if isinstance(child, nn.Linear) and child_name in targets:
+                setattr(module, child_name, LoRALinear(child, r, alpha, dropout))
+                replaced.append(full_name)
+
+    if not replaced:
+        raise ValueError(f"No Linear modules match LoRA target_modules {list(targets)}")
+    return replaced
+
+
+def lora_state_dict(model: nn.Module) -> Dict[str, torch.Tensor]:
+    """只包含LoRA参数的state_dict (adapter权重)"""
+    return {k: v for k, v in model.state_dict().items() if ".lora_" in k}
+
+
+def load_lora_state_dict(model: nn.Module, state: Dict[str, Any]) -> None:
+    """加载adapter权重, key必须与当前模型的LoRA参数完全一致"""
+    expected = set(lora_state_dict(model))
+    if set(state) != expected:
+        raise ValueError("LoRA state_dict keys do not match the model")
+    model.load_state_dict(state, strict=False)
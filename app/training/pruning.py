@@ -0,0 +1,136 @@
+"""
+超参数搜索的早期剪枝 - ASHA (Asynchronous Successive Halving)
+
+rung k 位于第 min_steps * reduction_factor^k 个step。子实验到达rung时记录该段的平均指标,
+若不在同一rung已记录结果的前 1/reduction_factor 之内则剪枝。判断是异步的, 不等待
+其他子实验: rung上的结果不足reduction_factor个时直接晋级。
+各rung的结果保存在Redis hash sweep:{id}:rung:{k} 中, 由同一sweep的所有worker共享。
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+import redis
+import structlog
+
+from app.config import settings
+from app.core.redis import get_redis
+
+logger = structlog.get_logger()
+
+
+def rung_key(sweep_id: str, rung: int) -> str:
+    """rung结果的key"""
+    return f"sweep:{sweep_id}:rung:{rung}"
+
+
+def rung_step(rung: int, min_steps: int, reduction_factor: int) -> int:
+    """rung所在的step"""
+    return min_steps * reduction_factor**rung
+
+
+def should_prune(value: float, recorded: List[float], reduction_factor: int) -> bool:
+    """
+    value是否应被剪枝 (指标越小越好)
+
+    recorded为该rung上已记录的全部结果 (包含value本身)。
+    """
+    if len(recorded) < reduction_factor:
+        return False
+    keep = max(len(recorded) // reduction_factor, 1)
+    cutoff = sorted(recorded)[keep - 1]
+    return value > cutoff
+
+
+def _as_float(value: Any) -> float:
+    value = float(value)
+    # NaN/发散的loss排在最后
+    return math.inf if math.isnan(value) else value
+
+
+def load_rungs(sweep_id: str, client: Optional[redis.Redis] = None) -> Dict[int, Dict[str, float]]:
+    """sweep各rung上记录的结果 {rung: {experiment_id: value}}"""
+    client = client or get_redis()
+    rungs = {}
+    for key in client.scan_iter(match=f"sweep:{sweep_id}:rung:*"):
+        rung = int(key.rsplit(":", 1)[1])
+        rungs[rung] = {k: _as_float(v) for k, v in client.hgetall(key).items()}
+    return dict(sorted(rungs.items()))
+
+
+class SweepPruner:
+    """
+    训练循环使用的ASHA剪枝判断
+
+    每个参数更新后调用observe(step, metrics); 返回True时应停止该子实验。
+    """
+
+    def __init__(
+        self,
+        sweep_id: str,
+        experiment_id: str,
+        config: Optional[Dict[str, Any]] = None,
+        client: Optional[redis.Redis] = None,
+    ):
+        config = config or {}
+        self.sweep_id = sweep_id
+        self.experiment_id = experiment_id
+        self.metric = config.get("metric") or "loss"
+        self.min_steps = config.get("min_steps") or settings.SWEEP_PRUNER_MIN_STEPS
+        self.reduction_factor = (
+            config.get("reduction_factor") or settings.SWEEP_PRUNER_REDUCTION_FACTOR
+        )
+        if self.min_steps < 1 or self.reduction_factor < 2:
+            raise ValueError("Pruner requires min_steps >= 1 and reduction_factor >= 2")
+        self.client = client or get_redis()
+        self.rung = 0
+        self._window: List[float] = []
+
+    @property
+    def next_step(self) -> int:
+        return rung_step(self.rung, self.min_steps, self.reduction_factor)
+
+    def resume(self, step: int) -> None:
+        """从checkpoint恢复后跳过已经经过的rung"""
+        while self.next_step <= step:
+            self.rung += 1
+        self._window = []
+
+    def observe(self, step: int, metrics: Dict[str, Any]) -> bool:
+        value = metrics.get(self.metric)
+        if value is not None:
+            self._window.append(_as_float(value))
+        if step < self.next_step or not self._window:
+            return False
+
+        # 两个rung之间的平均值, 减小单个step的噪声
+        value = sum(self._window) / len(self._window)
+        rung = self.rung
+        self._window = []
+        while self.next_step <= step:
+            self.rung += 1
+
+        key = rung_key(self.sweep_id, rung)
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(key, self.experiment_id, repr(value))
+            pipe.hvals(key)
+            pipe.expire(key, settings.SWEEP_RUNG_TTL)
+            _, recorded, _ = pipe.execute()
+        except redis.RedisError as e:
+            # Redis不可用时不剪枝, 继续训练
+            logger.warning("sweep_rung_record_failed", sweep_id=self.sweep_id, error=str(e))
+            return False
+
+        pruned = should_prune(value, [_as_float(v) for v in recorded], self.reduction_factor)
+        logger.info(
+            "sweep_rung_reached",
+            sweep_id=self.sweep_id,
+            experiment_id=self.experiment_id,
+            rung=rung,
+            step=step,
+            value=value,
+            peers=len(recorded),
+            pruned=pruned,
+        )
+        return pruned
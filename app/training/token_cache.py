@@ -0,0 +1,272 @@
+"""
+预分词数据集缓存
+
+同一数据集 + 同一分词器只分词一次, 结果以memmap文件保存在 TOKEN_CACHE_DIR/{key}/ 下:
+- tokens.i32: 所有样本的token id首尾相接的int32数组
+- offsets.i64: 第i条样本为 tokens[offsets[i]:offsets[i+1]]
+- prompt_lens.i32: 每条样本中prompt部分的长度 (label mask使用)
+- meta.json: 内容摘要、分词器、统计信息
+
+key由数据集内容摘要、分词器、prompt模板和截断长度决定, 数据集文件变化后自动失效。
+meta.json的mtime作为最近使用时间, 总大小超过 TOKEN_CACHE_MAX_BYTES 时按LRU淘汰。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import billiard
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.training.data import (
+    DEFAULT_PROMPT_TEMPLATE,
+    TokenizedExample,
+    _init_worker,
+    _tokenize_in_worker,
+    iter_jsonl,
+    load_tokenizer,
+    tokenize_example,
+)
+from app.utils.prompt_template import CompiledTemplate
+
+logger = structlog.get_logger()
+
+_META_FILE = "meta.json"
+_TMP_MARKER = ".tmp-"
+
+# 进程内缓存文件摘要, 同一文件未变化时不重复计算
+_content_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def _cache_root() -> Path:
+    return Path(settings.TOKEN_CACHE_DIR)
+
+
+def dataset_content_hash(path: str) -> str:
+    """数据集文件内容的sha256"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _content_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _content_hashes[memo_key] = digest.hexdigest()
+    return _content_hashes[memo_key]
+
+
+def cache_key(
+    content_hash: str, tokenizer_name: Optional[str], prompt_template: str, max_seq_len: int
+) -> str:
+    """缓存key, 分词结果取决于的所有输入"""
+    identity = json.dumps(
+        [content_hash, tokenizer_name or "byte", prompt_template, max_seq_len]
+    ).encode()
+    return hashlib.sha256(identity).hexdigest()[:32]
+
+
+class TokenizedDataset:
+    """只读的预分词数据集, 按下标取 (input_ids, prompt_len)"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.meta: Dict[str, Any] = json.loads((directory / _META_FILE).read_text())
+        self.offsets = np.fromfile(directory / "offsets.i64", dtype=np.int64)
+        self.prompt_lens = np.fromfile(directory / "prompt_lens.i32", dtype=np.int32)
+        # 空文件无法memmap
+        self.tokens = (
+            np.memmap(directory / "tokens.i32", dtype=np.int32, mode="r")
+            if self.offsets[-1]
+            else np.empty(0, dtype=np.int32)
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> TokenizedExample:
+        return self.tokens[self.offsets[i] : self.offsets[i + 1]], int(self.prompt_lens[i])
+
+    def lengths(self) -> np.ndarray:
+        """每条样本的token数"""
+        return np.diff(self.offsets)
+
+    @property
+    def num_tokens(self) -> int:
+        return int(self.offsets[-1])
+
+
+def _tokenize_all(
+    path: str, tokenizer_name: Optional[str], prompt_template: str, max_seq_len: int
+) -> Iterator[TokenizedExample]:
+    """按文件顺序分词, 与StreamingDataLoader使用相同的worker函数"""
+    workers = settings.DATALOADER_NUM_WORKERS
+    if not workers:
+        tokenizer = load_tokenizer(tokenizer_name)
+        template = CompiledTemplate(prompt_template)
+        for example in iter_jsonl(path):
+            yield tokenize_example(tokenizer, template, max_seq_len, example)
+        return
+
+    with billiard.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(tokenizer_name, prompt_template, max_seq_len),
+    ) as pool:
+        yield from pool.imap(
+            _tokenize_in_worker, iter_jsonl(path), chunksize=settings.DATALOADER_WORKER_CHUNK
+        )
+
+
+def _build(
+    directory: Path,
+    path: str,
+    content_hash: str,
+    tokenizer_name: Optional[str],
+    prompt_template: str,
+    max_seq_len: int,
+) -> None:
+    """在临时目录中生成缓存, 完成后rename为正式目录"""
+    tmp_dir = directory.with_name(f"{directory.name}{_TMP_MARKER}{uuid.uuid4().hex[:8]}")
+    tmp_dir.mkdir(parents=True)
+    try:
+        offsets: List[int] = [0]
+        prompt_lens: List[int] = []
+        started = time.monotonic()
+        with open(tmp_dir / "tokens.i32", "wb") as f:
+            for input_ids, prompt_len in _tokenize_all(
+                path, tokenizer_name, prompt_template, max_seq_len
+            ):
+                f.write(np.asarray(input_ids, dtype=np.int32).tobytes())
+                offsets.append(offsets[-1] + len(input_ids))
+                prompt_lens.append(prompt_len)
+
+        np.asarray(offsets, dtype=np.int64).tofile(tmp_dir / "offsets.i64")
+        np.asarray(prompt_lens, dtype=np.int32).tofile(tmp_dir / "prompt_lens.i32")
+        lengths = np.diff(np.asarray(offsets, dtype=np.int64))
+        meta = {
+            "content_hash": content_hash,
+            "tokenizer": tokenizer_name or "byte",
+            "prompt_template": prompt_template,
+            "max_seq_len": max_seq_len,
+            "num_examples": len(prompt_lens),
+            "num_tokens": int(offsets[-1]),
+            "num_prompt_tokens": int(sum(prompt_lens)),
+            "num_truncated": int((lengths >= max_seq_len).sum()),
+            "created_at": time.time(),
+        }
+        (tmp_dir / _META_FILE).write_text(json.dumps(meta))
+
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # 其他进程已经生成了同一个缓存
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        logger.info(
+            "token_cache_built",
+            key=directory.name,
+            examples=meta["num_examples"],
+            tokens=meta["num_tokens"],
+            duration=round(time.monotonic() - started, 2),
+        )
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _entries() -> List[Tuple[float, int, Path]]:
+    """所有缓存条目的 (最近使用时间, 大小, 目录)"""
+    root = _cache_root()
+    if not root.is_dir():
+        return []
+    entries = []
+    for directory in root.iterdir():
+        meta_path = directory / _META_FILE
+        if _TMP_MARKER in directory.name or not meta_path.exists():
+            continue
+        size = sum(p.stat().st_size for p in directory.iterdir())
+        entries.append((meta_path.stat().st_mtime, size, directory))
+    return entries
+
+
+def evict(keep: Optional[Path] = None, max_bytes: Optional[int] = None) -> int:
+    """
+    按LRU删除缓存, 直到总大小不超过max_bytes
+
+    已被其他进程memmap打开的文件删除后仍可继续读取。返回删除的条目数。
+    """
+    max_bytes = settings.TOKEN_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, directory in entries:
+        if total <= max_bytes:
+            break
+        if directory == keep:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+        removed += 1
+        logger.info("token_cache_evicted", key=directory.name, size=size)
+    return removed
+
+
+def lookup(
+    path: str,
+    tokenizer_name: Optional[str] = None,
+    prompt_template: Optional[str] = None,
+    max_seq_len: Optional[int] = None,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """缓存key以及已有缓存的meta (不存在时为None), 不触发分词"""
+    prompt_template = prompt_template or DEFAULT_PROMPT_TEMPLATE
+    max_seq_len = max_seq_len or settings.DATALOADER_MAX_SEQ_LEN
+    key = cache_key(dataset_content_hash(path), tokenizer_name, prompt_template, max_seq_len)
+    meta_path = _cache_root() / key / _META_FILE
+    return key, json.loads(meta_path.read_text()) if meta_path.exists() else None
+
+
+def get_or_build(
+    path: str,
+    tokenizer_name: Optional[str] = None,
+    prompt_template: Optional[str] = None,
+    max_seq_len: Optional[int] = None,
+) -> TokenizedDataset:
+    """获取预分词数据集, 不存在时生成"""
+    prompt_template = prompt_template or DEFAULT_PROMPT_TEMPLATE
+    max_seq_len = max_seq_len or settings.DATALOADER_MAX_SEQ_LEN
+    content_hash = dataset_content_hash(path)
+    key = cache_key(content_hash, tokenizer_name, prompt_template, max_seq_len)
+    directory = _cache_root() / key
+
+    if not (directory / _META_FILE).exists():
+        _build(directory, path, content_hash, tokenizer_name, prompt_template, max_seq_len)
+        evict(keep=directory)
+    else:
+        # 更新最近使用时间
+        os.utime(directory / _META_FILE)
+
+    return TokenizedDataset(directory)
+
+
+def find_stats(path: str, tokenizer_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    查找已有缓存的统计信息 (不触发分词)
+
+    未指定分词器时返回该数据集最近使用的任意缓存。
+    """
+    content_hash = dataset_content_hash(path)
+    for _, _, directory in sorted(_entries(), reverse=True):
+        meta = json.loads((directory / _META_FILE).read_text())
+        if meta["content_hash"] != content_hash:
+            continue
+        if tokenizer_name and meta["tokenizer"] != tokenizer_name:
+            continue
+        return meta
+    return None
@@ -0,0 +1,74 @@
+"""
+时序数据降采样
+
+- lttb: Largest-Triangle-Three-Buckets, 保留曲线形状, 适合损失曲线
+- minmax: 每个bucket保留最小值和最大值, 保留尖峰, 适合吞吐量/显存
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """LTTB降采样到threshold个点"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # 首尾点固定, 中间n-2个点分成threshold-2个bucket
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # 下一个bucket的平均点 (最后一个bucket使用末尾点)
+        if i < threshold - 3:
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        ax, ay = x[a], y[a]
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """min/max降采样, 每个bucket输出两个点, 共约threshold个点"""
+    n = len(x)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return x, y
+
+    size = -(-n // buckets)  # 向上取整
+    padded = np.full(buckets * size, np.nan, dtype=np.float64)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+
+    # 末尾bucket可能为空 (全部为NaN)
+    valid = ~np.all(np.isnan(grid), axis=1)
+    grid = grid[valid]
+    offsets = np.arange(buckets)[valid] * size
+
+    idx_min = offsets + np.nanargmin(grid, axis=1)
+    idx_max = offsets + np.nanargmax(grid, axis=1)
+
+    # 按原始顺序输出, 去掉重复点
+    selected = np.unique(np.concatenate([idx_min, idx_max]))
+    return x[selected], y[selected]
+
+
+DOWNSAMPLERS = {
+    "lttb": lttb,
+    "minmax": minmax,
+}
@@ -0,0 +1,213 @@
+"""
+Prompt Contract模板编译与输出校验
+
+模板使用 {{name}} 占位符, 每个 (contract id, version) 只解析一次,
+编译结果缓存在进程内LRU中供探测/生成/评测复用。
+"""
+
+import json
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# 未声明output_spec时的默认契约: 仅输出一行译文
+DEFAULT_OUTPUT_SPEC: Dict[str, Any] = {"format": "text", "max_lines": 1}
+
+
+class CompiledTemplate:
+    """预解析的模板: 字面量片段与占位符交替排列"""
+
+    __slots__ = ("literals", "placeholders")
+
+    def __init__(self, template: str):
+        literals: List[str] = []
+        placeholders: List[str] = []
+        pos = 0
+        for match in _PLACEHOLDER.finditer(template):
+            literals.append(template[pos : match.start()])
+            placeholders.append(match.group(1))
+            pos = match.end()
+        literals.append(template[pos:])
+
+        self.literals = tuple(literals)
+        self.placeholders = tuple(placeholders)
+
+    @property
+    def variables(self) -> frozenset:
+        """模板需要的变量名"""
+        return frozenset(self.placeholders)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """渲染模板, 缺少变量时抛出ValueError"""
+        parts = [self.literals[0]]
+        try:
+            for name, literal in zip(self.placeholders, self.literals[1:]):
+                parts.append(str(values[name]))
+                parts.append(literal)
+        except KeyError as e:
+            raise ValueError(f"Missing template variable: {e.args[0]}") from None
+        return "".join(parts)
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    """单条输出的校验结果"""
+
+    ok: bool
+    reason: Optional[str] = None
+
+
+class ContractValidator:
+    """
+    输出契约校验器
+
+    output_spec示例:
+    {
+      "format": "text" | "json",
+      "max_lines": 1,
+      "max_chars": 500,
+      "pattern": "^[^\\n]+$",
+      "forbidden": ["Note:", "解説"],
+      "required_keys": ["translation"]
+    }
+    """
+
+    def __init__(self, output_spec: Optional[Dict[str, Any]] = None):
+        spec = output_spec or DEFAULT_OUTPUT_SPEC
+        self.format = spec.get("format", "text")
+        self.max_lines = spec.get("max_lines")
+        self.max_chars = spec.get("max_chars")
+        self.pattern = re.compile(spec["pattern"], re.DOTALL) if spec.get("pattern") else None
+        forbidden = spec.get("forbidden") or []
+        self.forbidden = (
+            re.compile("|".join(re.escape(f) for f in forbidden), re.IGNORECASE)
+            if forbidden
+            else None
+        )
+        self.required_keys = frozenset(spec.get("required_keys") or [])
+
+    def validate(self, output: str) -> ValidationResult:
+        """校验单条输出, 按开销从低到高依次检查"""
+        text = output.strip()
+        if not text:
+            return ValidationResult(False, "empty")
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return ValidationResult(False, "too_long")
+        if self.max_lines is not None and text.count("\n") + 1 > self.max_lines:
+            return ValidationResult(False, "too_many_lines")
+        if self.forbidden is not None and self.forbidden.search(text):
+            return ValidationResult(False, "forbidden_content")
+        if self.pattern is not None and not self.pattern.fullmatch(text):
+            return ValidationResult(False, "pattern_mismatch")
+
+        if self.format == "json":
+            if text[0] != "{":
+                return ValidationResult(False, "not_json")
+            try:
+                data = json.loads(text)
+            except ValueError:
+                return ValidationResult(False, "not_json")
+            if not isinstance(data, dict) or not self.required_keys <= data.keys():
+                return ValidationResult(False, "missing_keys")
+
+        return ValidationResult(True)
+
+    def is_valid(self, output: str) -> bool:
+        """只返回是否通过"""
+        return self.validate(output).ok
+
+    def validate_stream(self, outputs: Iterable[str]) -> Iterator[ValidationResult]:
+        """逐条校验, 不在内存中保留整个输出集合"""
+        validate = self.validate
+        for output in outputs:
+            yield validate(output)
+
+    def summarize(self, outputs: Iterable[str]) -> Dict[str, Any]:
+        """批量校验并汇总通过率与失败原因"""
+        total = 0
+        passed = 0
+        reasons: Counter = Counter()
+        for result in self.validate_stream(outputs):
+            total += 1
+            if result.ok:
+                passed += 1
+            else:
+                reasons[result.reason] += 1
+
+        return {
+            "total": total,
+            "passed": passed,
+            "pass_rate": round(passed / total, 4) if total else 0.0,
+            "failure_reasons": dict(reasons),
+        }
+
+
+@dataclass
+class CompiledContract:
+    """编译后的Prompt Contract"""
+
+    template: CompiledTemplate
+    validator: ContractValidator
+    key: Tuple[str, int] = field(default=("", 0))
+
+    def render(self, **values: Any) -> str:
+        return self.template.render(values)
+
+
+class _ContractCache:
+    """线程安全的LRU缓存, key为 (contract id, version)"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Tuple[str, int], CompiledContract]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compile(
+        self, key: Tuple[str, int], template: str, output_spec: Optional[Dict[str, Any]]
+    ) -> CompiledContract:
+        with self._lock:
+            compiled = self._items.get(key)
+            if compiled is not None:
+                self._items.move_to_end(key)
+                return compiled
+
+        compiled = CompiledContract(
+            template=CompiledTemplate(template),
+            validator=ContractValidator(output_spec),
+            key=key,
+        )
+
+        with self._lock:
+            self._items[key] = compiled
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _ContractCache()
+
+
+def get_compiled_contract(contract: Any) -> CompiledContract:
+    """
+    获取编译后的契约
+
+    contract可以是ORM对象或Schema, 需要 id/version/template/output_spec 属性。
+    同一 (id, version) 的模板内容不可变, 因此只在首次访问时编译。
+    """
+    key = (str(contract.id), int(contract.version or 1))
+    return _cache.get_or_compile(key, contract.template, getattr(contract, "output_spec", None))
+
+
+def clear_contract_cache() -> None:
+    """清空编译缓存"""
+    _cache.clear()
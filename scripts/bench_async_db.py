@@ -0,0 +1,120 @@
+"""
+同步Session与AsyncSession的并发吞吐对比 (需要DATABASE_URL指向的PostgreSQL)
+
+模拟同一事件循环中的concurrency个并发请求, 每个请求执行一次列表查询 (数据集第一页 + COUNT):
+- blocking: async def中直接使用同步Session (迁移前的接口), 查询期间事件循环被阻塞
+- async: AsyncSession (asyncpg), 查询等待期间事件循环可以处理其他请求
+
+--delay在每个请求中附加pg_sleep, 模拟较慢的查询; 同时测量事件循环的最大延迟
+(每10ms一次的心跳实际间隔), blocking模式下它接近单次查询的耗时。
+
+用法: python -m scripts.bench_async_db [--requests 400] [--concurrency 50] [--delay 0.02]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.models.dataset import Dataset
+from app.services.base import AsyncBaseService, BaseService
+
+HEARTBEAT_INTERVAL = 0.01
+
+
+class _SyncDatasets(BaseService[Dataset]):
+    model = Dataset
+
+
+class _AsyncDatasets(AsyncBaseService[Dataset]):
+    model = Dataset
+
+
+async def blocking_request(delay: float) -> None:
+    db = SessionLocal()
+    try:
+        if delay:
+            db.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+        _SyncDatasets(db).list(page_size=20)
+    finally:
+        db.close()
+
+
+async def async_request(delay: float) -> None:
+    async with AsyncSessionLocal() as db:
+        if delay:
+            await db.execute(text("SELECT pg_sleep(:delay)"), {"delay": delay})
+        await _AsyncDatasets(db).list(page_size=20)
+
+
+async def heartbeat(stop: asyncio.Event) -> float:
+    """事件循环的最大延迟 (秒)"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        worst = max(worst, time.perf_counter() - start - HEARTBEAT_INTERVAL)
+    return worst
+
+
+async def run(mode: str, args) -> dict:
+    request = blocking_request if mode == "blocking" else async_request
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await request(args.delay)
+            latencies.append(time.perf_counter() - start)
+
+    # 预热连接池
+    await asyncio.gather(*(request(0) for _ in range(min(args.concurrency, 10))))
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    latencies.sort()
+    return {
+        "throughput": args.requests / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "max_lag": await lag,
+    }
+
+
+async def main_async(args) -> int:
+    results = {}
+    try:
+        for mode in ("blocking", "async"):
+            r = results[mode] = await run(mode, args)
+            print(
+                f"{mode:>8}: {r['throughput']:7.1f} req/s  p50={r['p50'] * 1000:6.1f}ms  "
+                f"p99={r['p99'] * 1000:6.1f}ms  event loop max lag={r['max_lag'] * 1000:6.1f}ms"
+            )
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+    speedup = results["async"]["throughput"] / results["blocking"]["throughput"]
+    print(f"async/blocking throughput: {speedup:.1f}x")
+    return 0 if speedup > 1 else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.02)
+    return asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
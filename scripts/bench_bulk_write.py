@@ -0,0 +1,117 @@
+"""
+评测的批量写入与逐条写入对比 (需要DATABASE_URL指向已初始化的PostgreSQL)
+
+写入一个实验 (及其数据集、模型) 后, 通过TestClient:
+- single: POST /evaluations 逐条创建 --single条 (每条一个请求、一次提交)
+- bulk: POST /evaluations/bulk 以NDJSON一次创建 --rows条 (一个事务, 多行INSERT)
+输出两者的吞吐 (行/秒), 并检查排行榜的评测数与写入的行数一致。结束时删除写入的数据。
+
+用法: python -m scripts.bench_bulk_write [--rows 100000] [--single 200]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import orjson
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Dataset, Evaluation, Experiment, LeaderboardEntry, Model
+
+PREFIX = "/api/v1"
+
+
+def seed(db) -> dict:
+    dataset = Dataset(name="bulk-bench", type="human", language_direction="ja-en", scene="meeting")
+    model = Model(name="bulk-bench", type="base", config={})
+    db.add_all([dataset, model])
+    db.flush()
+    experiment = Experiment(
+        name="bulk-bench",
+        direction="ja-en",
+        dataset_id=dataset.id,
+        base_model_id=model.id,
+        config={},
+        status="completed",
+    )
+    db.add(experiment)
+    db.commit()
+    return {"dataset": dataset, "model": model, "experiment": experiment}
+
+
+def cleanup(db, data: dict) -> None:
+    """删除seed写入的数据 (排行榜行随模型级联删除)"""
+    experiment_id = data["experiment"].id
+    db.execute(delete(Evaluation).where(Evaluation.experiment_id == experiment_id))
+    db.execute(delete(Experiment).where(Experiment.id == experiment_id))
+    db.execute(delete(Model).where(Model.id == data["model"].id))
+    db.execute(delete(Dataset).where(Dataset.id == data["dataset"].id))
+    db.commit()
+
+
+def evaluation(experiment_id: str) -> dict:
+    return {
+        "experiment_id": experiment_id,
+        "track": random.choice(("spoken", "written")),
+        "metrics": {
+            "bleu": round(random.uniform(0.1, 0.6), 4),
+            "rouge_l": round(random.uniform(0.3, 0.8), 4),
+            "ribes": round(random.uniform(0.5, 0.9), 4),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="批量写入的行数")
+    parser.add_argument("--single", type=int, default=200, help="逐条写入的行数")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    data = seed(db)
+    experiment_id = str(data["experiment"].id)
+    try:
+        with TestClient(app) as client:
+            start = time.perf_counter()
+            for _ in range(args.single):
+                client.post(f"{PREFIX}/evaluations", json=evaluation(experiment_id))
+            single = time.perf_counter() - start
+
+            body = b"\n".join(orjson.dumps(evaluation(experiment_id)) for _ in range(args.rows))
+            start = time.perf_counter()
+            response = client.post(
+                f"{PREFIX}/evaluations/bulk",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            bulk = time.perf_counter() - start
+            result = response.json()
+
+        total = db.execute(
+            select(func.sum(LeaderboardEntry.evaluation_count)).where(
+                LeaderboardEntry.model_id == data["model"].id
+            )
+        ).scalar()
+    finally:
+        cleanup(db, data)
+        db.close()
+
+    print(f"    single  rows={args.single} {single:.1f}s {args.single / single:.0f} rows/s")
+    print(
+        f"      bulk  rows={args.rows} {bulk:.1f}s {args.rows / bulk:.0f} rows/s "
+        f"status={response.status_code} created={result.get('created')} "
+        f"failed={result.get('failed')}"
+    )
+    expected = args.single + args.rows
+    if response.status_code != 200 or result.get("failed") or total != expected:
+        print(f"FAILED: leaderboard evaluation_count={total}, expected {expected}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+评测详情的响应序列化对比 (不需要数据库)
+
+构造一个带有大量样本 (sample_results) 的评测, 在同一个FastAPI应用上挂两个接口, 用TestClient测量延迟:
+- validated: 迁移前的做法, 由ORM对象构造EvaluationDetail, FastAPI再按response_model校验,
+  jsonable_encoder转换后用标准库json编码
+- trusted: TrustedJSONResponse + trusted_payload, 不校验, orjson直接编码
+
+两者的响应解析后应完全一致, 不一致时以非0退出。
+
+用法: python -m scripts.bench_json_response [--samples 5000] [--requests 50]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.json_response import TrustedJSONResponse, trusted_payload
+from app.schemas.evaluation import Evaluation, EvaluationDetail
+
+
+def make_evaluation() -> SimpleNamespace:
+    """模拟从数据库读出的评测 (ORM对象的属性)"""
+    now = datetime.utcnow()
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        experiment_id=uuid.uuid4(),
+        track="spoken",
+        metrics={
+            "bleu": 0.412,
+            "rouge_l": 0.583,
+            "ribes": 0.791,
+            "gpt_eval_2": {"mqm_score": 87.5, "error_distribution": {"accuracy": 3}},
+        },
+        error_analysis={
+            "top_errors": [{"type": "omission", "count": 12}],
+            "error_type_distribution": {"omission": 12, "mistranslation": 7},
+        },
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def make_samples(samples: int) -> List[dict]:
+    return [
+        {
+            "index": i,
+            "source": f"会議の議事録 {i}: 来週までに資料を準備してください。",
+            "reference": f"Minutes {i}: please prepare the materials by next week.",
+            "hypothesis": f"Minutes {i}: prepare the documents until next week.",
+            "bleu": 0.35 + (i % 50) / 100,
+            "errors": [{"type": "mistranslation", "span": [2, 4]}] if i % 3 == 0 else [],
+        }
+        for i in range(samples)
+    ]
+
+
+def build_app(evaluation: SimpleNamespace, samples: List[dict]) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+    extra = {
+        "experiment_name": "bench-experiment",
+        "dataset_name": "bench-dataset",
+        "model_name": "bench-model",
+        "sample_results": samples,
+    }
+
+    @app.get("/validated", response_model=EvaluationDetail)
+    async def validated():
+        return EvaluationDetail(**Evaluation.model_validate(evaluation).model_dump(), **extra)
+
+    @app.get("/trusted", response_model=EvaluationDetail)
+    async def trusted():
+        return TrustedJSONResponse(trusted_payload(EvaluationDetail, evaluation, **extra))
+
+    return app
+
+
+def measure(client: TestClient, path: str, requests: int) -> dict:
+    client.get(path)  # 预热
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "bytes": len(response.content),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=5000, help="sample_results的条数")
+    parser.add_argument("--requests", type=int, default=50, help="每个接口的请求数")
+    args = parser.parse_args()
+
+    evaluation = make_evaluation()
+    app = build_app(evaluation, make_samples(args.samples))
+    with TestClient(app) as client:
+        expected = client.get("/validated").json()
+        actual = client.get("/trusted").json()
+        if expected != actual:
+            diff = sorted(
+                k for k in expected.keys() | actual.keys() if expected.get(k) != actual.get(k)
+            )
+            print(f"responses differ: {diff}")
+            return 1
+
+        results = {
+            path: measure(client, f"/{path}", args.requests) for path in ("validated", "trusted")
+        }
+
+    for path, result in results.items():
+        print(
+            f"{path:>10}  p50={result['p50']:.1f}ms p99={result['p99']:.1f}ms "
+            f"size={result['bytes'] / 1024:.0f}KiB"
+        )
+    speedup = results["validated"]["p50"] / results["trusted"]["p50"]
+    print(f"validated/trusted p50: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+JSONB过滤条件的索引使用检查 (需要DATABASE_URL指向已初始化的PostgreSQL)
+
+对各列表接口的阈值/范围过滤, 用服务层生成与接口相同的查询, 执行EXPLAIN (FORMAT JSON),
+确认查询计划使用了对应的表达式索引/GIN索引。
+表中数据很少时计划器会选择顺序扫描, 因此在事务内设置enable_seqscan=off:
+这里检查的是查询条件能否匹配索引 (表达式是否一致), 而不是成本估计。
+
+用法: python -m scripts.check_jsonb_indexes
+"""
+
+import sys
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.services.base import _Explain
+from app.services.dataset_service import DatasetService
+from app.services.evaluation_service import EvaluationService
+from app.services.experiment_service import ExperimentService
+
+# (说明, 查询, 期望使用的索引)
+CASES = [
+    (
+        "evaluations bleu >= 0.3",
+        EvaluationService(None).evaluations_query(metric="bleu", metric_min=0.3),
+        "ix_evaluations_metrics_bleu",
+    ),
+    (
+        "evaluations 0.4 <= rouge_l <= 0.6",
+        EvaluationService(None).evaluations_query(metric="rouge_l", metric_min=0.4, metric_max=0.6),
+        "ix_evaluations_metrics_rouge_l",
+    ),
+    (
+        "datasets quality_gate_result.status = passed",
+        DatasetService(None).datasets_query(quality_gate_status="passed"),
+        "ix_datasets_quality_gate_result",
+    ),
+    (
+        "experiments 1e-5 <= learning_rate <= 1e-4",
+        ExperimentService(None).experiments_query(learning_rate_min=1e-5, learning_rate_max=1e-4),
+        "ix_experiments_learning_rate",
+    ),
+]
+
+
+def index_names(plan: Dict[str, Any]) -> Iterator[str]:
+    """查询计划树中使用的索引名"""
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from index_names(child)
+
+
+def main() -> int:
+    failed = 0
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for description, statement, expected in CASES:
+            plan = conn.execute(_Explain(statement)).scalar()[0]["Plan"]
+            used = sorted(set(index_names(plan)))
+            ok = expected in used
+            failed += not ok
+            print(f"{'OK' if ok else 'FAILED':>6}  {description}: {', '.join(used) or 'no index'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
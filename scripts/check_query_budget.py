@@ -0,0 +1,182 @@
+"""
+详情接口的SQL语句数检查 (需要DATABASE_URL指向已初始化的PostgreSQL)
+
+写入一组关联数据 (数据集及其派生版本、基座模型及适配器、Prompt契约、实验、评测、报告),
+通过TestClient请求各详情接口, 统计每个请求在异步引擎上执行的语句数,
+超过预算时输出执行的语句并以非0退出 (关联被逐个延迟加载时语句数随关联数增长)。
+运行期间关闭HTTP响应缓存 (命中时不执行SQL)。
+结束时删除写入的数据。
+
+用法: python -m scripts.check_query_budget [-v]
+"""
+
+import argparse
+import sys
+from typing import List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from app.config import settings
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import (
+    Dataset,
+    Evaluation,
+    Experiment,
+    Model,
+    PromptContract,
+    Report,
+)
+
+PREFIX = "/api/v1"
+
+# 接口 -> 语句数上限
+BUDGETS = {
+    # 实验 (JOIN 数据集/基座模型/适配器) + 评测
+    "experiment": 2,
+    # 模型 + Prompt契约 + 适配器 + 评测汇总 (2)
+    "model": 5,
+    # 数据集 (JOIN 父数据集) + 派生版本 + 使用历史
+    "dataset": 3,
+    # 评测 (JOIN 实验/数据集/模型)
+    "evaluation": 1,
+    # 报告 + 指标汇总 (2)
+    "report": 3,
+}
+
+
+class StatementCounter:
+    """记录异步引擎执行的语句"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self) -> None:
+        self.statements = []
+
+
+def seed(db) -> dict:
+    """写入一组关联数据, 返回写入的对象"""
+    parent = Dataset(
+        name="budget-parent", type="human", language_direction="ja-en", scene="meeting"
+    )
+    db.add(parent)
+    db.flush()
+    datasets = [
+        Dataset(
+            name=f"budget-v{version}",
+            version=version,
+            type="human",
+            language_direction="ja-en",
+            scene="meeting",
+            parent_id=parent.id,
+        )
+        for version in (2, 3, 4)
+    ]
+    base = Model(name="budget-base", type="base", config={})
+    db.add_all([*datasets, base])
+    db.flush()
+    adapters = [
+        Model(name=f"budget-adapter-{i}", type="adapter", base_model_id=base.id, config={})
+        for i in range(3)
+    ]
+    contracts = [
+        PromptContract(name="budget", version=v, template="{source}", model_id=base.id)
+        for v in (1, 2, 3)
+    ]
+    db.add_all([*adapters, *contracts])
+    db.flush()
+    experiment = Experiment(
+        name="budget-experiment",
+        direction="ja-en",
+        dataset_id=parent.id,
+        base_model_id=base.id,
+        adapter_id=adapters[0].id,
+        config={},
+        status="completed",
+    )
+    db.add(experiment)
+    db.flush()
+    evaluations = [
+        Evaluation(experiment_id=experiment.id, track=track, metrics={"bleu": 0.3 + i / 10})
+        for i, track in enumerate(("spoken", "written", "spoken", "written"))
+    ]
+    report = Report(experiment_id=experiment.id, title="budget", type="performance", tags=[])
+    db.add_all([*evaluations, report])
+    db.commit()
+    return {
+        "parent": parent,
+        "datasets": datasets,
+        "base": base,
+        "adapters": adapters,
+        "contracts": contracts,
+        "experiment": experiment,
+        "evaluations": evaluations,
+        "report": report,
+    }
+
+
+def cleanup(db, data: dict) -> None:
+    """删除seed写入的数据 (排行榜行随模型级联删除)"""
+    experiment_id = data["experiment"].id
+    db.execute(delete(Report).where(Report.experiment_id == experiment_id))
+    db.execute(delete(Evaluation).where(Evaluation.experiment_id == experiment_id))
+    db.execute(delete(Experiment).where(Experiment.id == experiment_id))
+    db.execute(delete(PromptContract).where(PromptContract.model_id == data["base"].id))
+    db.execute(delete(Model).where(Model.id.in_([m.id for m in data["adapters"]])))
+    db.execute(delete(Model).where(Model.id == data["base"].id))
+    db.execute(delete(Dataset).where(Dataset.id.in_([d.id for d in data["datasets"]])))
+    db.execute(delete(Dataset).where(Dataset.id == data["parent"].id))
+    db.commit()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出每个请求的语句")
+    args = parser.parse_args()
+
+    # 缓存命中时不执行SQL, 统计的必须是实际查询
+    settings.RESPONSE_CACHE_ENABLED = False
+
+    db = SessionLocal()
+    data = seed(db)
+    urls = {
+        "experiment": f"{PREFIX}/experiments/{data['experiment'].id}",
+        "model": f"{PREFIX}/models/{data['base'].id}",
+        "dataset": f"{PREFIX}/datasets/{data['parent'].id}",
+        "evaluation": f"{PREFIX}/evaluations/{data['evaluations'][0].id}",
+        "report": f"{PREFIX}/reports/{data['report'].id}",
+    }
+
+    failed = 0
+    counter = StatementCounter()
+    try:
+        with TestClient(app) as client:
+            # 预热: 首次连接时方言的初始化查询不计入
+            client.get(urls["evaluation"])
+            for name, url in urls.items():
+                counter.reset()
+                response = client.get(url)
+                count, budget = len(counter.statements), BUDGETS[name]
+                ok = response.status_code == 200 and count <= budget
+                failed += not ok
+                print(
+                    f"{'OK' if ok else 'FAILED':>6}  {name:<10} status={response.status_code} "
+                    f"statements={count} budget={budget}"
+                )
+                if args.verbose or not ok:
+                    for statement in counter.statements:
+                        print("        " + " ".join(statement.split())[:160])
+    finally:
+        cleanup(db, data)
+        db.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,11 @@
 数据库初始化脚本
 """
 
+from sqlalchemy import text
+
 from app.database import engine
 from app.models import Base
+from app.models.leaderboard import refresh_leaderboard
 import structlog
 
 logger = structlog.get_logger()
@@ -13,9 +16,17 @@ def init_db():
     """创建所有数据库表"""
     logger.info("Initializing database...")
 
+    # 名称/标题部分匹配搜索的GIN索引 (gin_trgm_ops) 需要pg_trgm扩展
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
     # 创建所有表
     Base.metadata.create_all(bind=engine)
 
+    # 排行榜汇总表由现有评测重建 (之后由评测写入时增量维护), 重复执行结果相同
+    with engine.begin() as conn:
+        refresh_leaderboard(conn)
+
     logger.info("Database initialized successfully!")
 
 
@@ -0,0 +1,99 @@
+"""
+ASHA剪枝模拟 (不需要数据库/Redis)
+
+用合成的loss曲线模拟一个sweep: max_parallel个子实验同时运行, 每个子实验到达rung时
+用app.training.pruning的规则判断是否剪枝, 输出与全部跑完相比的step数以及最优子实验是否保留。
+
+结果与随机种子有关: 剪枝是启发式的, 曲线在早期交叉时可能剪掉最终最优的组合,
+因此以保留下来的最优子实验与真实最优的差距 (regret) 衡量。
+
+用法: python -m scripts.simulate_sweep [--trials 27] [--steps 1350] [--parallel 4] [--runs 20]
+"""
+
+import argparse
+import math
+import random
+import sys
+
+from app.training.pruning import rung_step, should_prune
+
+
+def make_curve(rng: random.Random):
+    """loss(t) = floor + scale * exp(-t / tau) + 噪声, floor决定最终效果"""
+    floor = rng.uniform(0.3, 1.2)
+    scale = rng.uniform(1.0, 1.5)
+    tau = rng.uniform(80, 200)
+    return floor, lambda t: floor + scale * math.exp(-t / tau) + rng.gauss(0, 0.05)
+
+
+def simulate(args, seed: int) -> dict:
+    """模拟一次sweep, 返回执行的step数与regret"""
+    rng = random.Random(seed)
+    curves = [make_curve(rng) for _ in range(args.trials)]
+    best_trial = min(range(args.trials), key=lambda i: curves[i][0])
+
+    rungs = {}  # rung -> {trial: value}
+    pending = list(range(args.trials))
+    running = {}  # trial -> {"step", "rung", "window"}
+    finished = []
+    total_steps = 0
+
+    while pending or running:
+        while pending and len(running) < args.parallel:
+            running[pending.pop(0)] = {"step": 0, "rung": 0, "window": []}
+        for trial, state in list(running.items()):
+            state["step"] += 1
+            total_steps += 1
+            state["window"].append(curves[trial][1](state["step"]))
+            rung = state["rung"]
+            if state["step"] >= rung_step(rung, args.min_steps, args.reduction_factor):
+                value = sum(state["window"]) / len(state["window"])
+                state["window"] = []
+                state["rung"] += 1
+                rungs.setdefault(rung, {})[trial] = value
+                if should_prune(value, list(rungs[rung].values()), args.reduction_factor):
+                    del running[trial]
+                    continue
+            if state["step"] >= args.steps:
+                finished.append(trial)
+                del running[trial]
+
+    found = min(finished, key=lambda i: curves[i][0])
+    return {
+        "steps": total_steps,
+        "completed": len(finished),
+        "rungs": {rung: len(values) for rung, values in sorted(rungs.items())},
+        "regret": curves[found][0] - curves[best_trial][0],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--steps", type=int, default=1350)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--min-steps", type=int, default=50)
+    parser.add_argument("--reduction-factor", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    full_steps = args.trials * args.steps
+    results = [simulate(args, seed) for seed in range(args.runs)]
+    for seed, r in enumerate(results):
+        print(
+            f"seed={seed} steps={r['steps']} ({r['steps'] / full_steps:.1%}) "
+            f"completed={r['completed']} rungs={r['rungs']} regret={r['regret']:.3f}"
+        )
+
+    fraction = sum(r["steps"] for r in results) / (full_steps * len(results))
+    near_optimal = sum(r["regret"] <= 0.05 for r in results) / len(results)
+    print(f"mean compute: {fraction:.1%} of running every trial to completion")
+    print(f"runs within 0.05 of the best final loss: {near_optimal:.0%}")
+
+    ok = fraction < 0.5 and near_optimal >= 0.8
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())